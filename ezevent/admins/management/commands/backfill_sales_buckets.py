@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from promoter import sales
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the hourly sales buckets from approved purchases'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Purchase ids per chunk')
+
+    def handle(self, *args, **options):
+        processed = sales.backfill(
+            chunk_size=options['chunk_size'],
+            progress=lambda done: self.stdout.write(f'  {done} purchases...')
+        )
+        self.stdout.write(self.style.SUCCESS(f'Bucketed {processed} approved purchases.'))
@@ -0,0 +1,92 @@
+import datetime
+import timeit
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from ezevent.renderers import ORJSONRenderer, orjson
+
+
+def ticket_details_rows(count):
+    """Rows shaped like TicketDetailsView output"""
+    now = timezone.now()
+    return [{
+        'ticket_id': i,
+        'attendee': {'id': i, 'name': f'Attendee {i}', 'email': f'attendee{i}@example.com'},
+        'event': {'id': i % 50, 'title': f'Event {i % 50}'},
+        'ticket_type': 'Regular',
+        'entry_time': now - datetime.timedelta(hours=3),
+        'exit_time': now if i % 3 else None,
+        'duration': '3h 0m' if i % 3 else 'N/A',
+        'status': 'Completed' if i % 3 else 'Still Inside',
+    } for i in range(count)]
+
+
+def user_rows(count):
+    """Rows shaped like the admin user listings (UserSerializer)"""
+    now = timezone.now()
+    return [{
+        'id': i,
+        'email': f'user{i}@example.com',
+        'firstname': 'First',
+        'lastname': f'Last {i}',
+        'contact': '0700000000',
+        'profile_pic': f'https://storage.example.com/profilePics/{i}.png',
+        'profile_pic_variants': {'thumbnail': f'https://storage.example.com/profilePics/{i}_thumbnail.webp'},
+        'created_at': now,
+        'role': 'client',
+    } for i in range(count)]
+
+
+def catalog_rows(count):
+    """Rows shaped like the client catalog (EventListSerializer), with raw Decimals"""
+    now = timezone.now()
+    return [{
+        'id': i,
+        'title': f'Event {i}',
+        'location': 'Kampala',
+        'venue': 'Main Hall',
+        'start_date': now + datetime.timedelta(days=i % 30),
+        'end_date': now + datetime.timedelta(days=i % 30, hours=6),
+        'category': 'Music',
+        'is_featured': i % 10 == 0,
+        'profile_pic': f'https://storage.example.com/event_images/{i}.jpg',
+        'image_variants': None,
+        'ticket_types': [
+            {'id': i * 2, 'name': 'Regular', 'price': Decimal('50000.00'), 'remaining': 120},
+            {'id': i * 2 + 1, 'name': 'VIP', 'price': Decimal('150000.00'), 'remaining': 12},
+        ],
+    } for i in range(count)]
+
+
+PAYLOADS = {
+    'ticket_details': ticket_details_rows,
+    'users': user_rows,
+    'catalog': catalog_rows,
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare the stdlib and orjson API renderers on payloads shaped like our list views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Rows per payload')
+        parser.add_argument('--repeat', type=int, default=20, help='Renders per measurement')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed; ORJSONRenderer falls back to the stdlib'))
+
+        renderers = {'stdlib': JSONRenderer(), 'orjson': ORJSONRenderer()}
+        for name, build in PAYLOADS.items():
+            data = build(options['rows'])
+            timings = {}
+            for label, renderer in renderers.items():
+                seconds = min(timeit.repeat(lambda: renderer.render(data), number=options['repeat'], repeat=3))
+                timings[label] = seconds / options['repeat'] * 1000
+            size = len(renderers['orjson'].render(data))
+            self.stdout.write(
+                f"{name:<15} {options['rows']} rows, {size / 1024:.0f} KiB: "
+                f"stdlib {timings['stdlib']:.2f} ms, orjson {timings['orjson']:.2f} ms "
+                f"({timings['stdlib'] / timings['orjson']:.1f}x)"
+            )
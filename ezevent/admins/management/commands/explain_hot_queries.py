@@ -0,0 +1,151 @@
+import re
+import uuid
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from auths.auth_views.admin_views import search_users
+from auths.models import Users
+from client.models import Attendee, Purchase, TicketPDF
+from promoter.models import Event, TicketType
+
+# Postgres: "Seq Scan on promoter_event"; SQLite: "SCAN promoter_event" (an index scan reads "... USING INDEX")
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)(?! USING)\s*$'),
+}
+# Postgres: "Index Scan using ...", "Bitmap Index Scan on ..."; SQLite: "SEARCH promoter_event USING INDEX ..."
+INDEX_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Index (?:Only )?Scan'),
+    'sqlite': re.compile(r'USING (?:COVERING INDEX|INDEX|INTEGER PRIMARY KEY)'),
+}
+
+
+def seed(events, promoters=20):
+    """Bulk rows shaped like production, mostly outside the hot filters so indexes pay off"""
+    now = timezone.now()
+    tag = uuid.uuid4().hex[:8]
+    # As many users as events, so the planner sees a table worth searching through an index
+    owners = Users.objects.bulk_create([
+        Users(email=f'explain-{tag}-{i}@example.com', firstname='Explain', lastname=str(i))
+        for i in range(max(events, promoters))
+    ])[:promoters]
+
+    # One in ten events is a published, upcoming one; the rest are drafts or already over
+    created = Event.objects.bulk_create([
+        Event(
+            promoter=owners[i % promoters],
+            title=f'Event {i}', description='Seeded for explain_hot_queries',
+            location='Kampala', venue='Main Hall', category='Music',
+            start_date=now + datetime.timedelta(days=i % 90 - 60),
+            end_date=now + datetime.timedelta(days=i % 90 - 60, hours=6),
+            status='published' if i % 10 == 0 else ('draft' if i % 2 else 'completed'),
+            max_capacity=500,
+        ) for i in range(events)
+    ])
+
+    ticket_types = TicketType.objects.bulk_create([
+        TicketType(
+            event=event, name=name, price=50000, quantity=100, remaining=100,
+            sale_start_date=now - datetime.timedelta(days=30),
+            sale_end_date=now + datetime.timedelta(days=30),
+            is_active=name != 'Early bird',
+        ) for event in created for name in ('Regular', 'VIP', 'Early bird')
+    ])
+
+    purchases = Purchase.objects.bulk_create([
+        Purchase(
+            ticket_type=ticket_type, quantity=1, total_amount=50000,
+            payment_status='pending' if i % 20 == 0 else 'completed',
+            is_approved_by_promoter=i % 20 != 0,
+            payment_method='mtn', transaction_reference=f'{tag}-{i}',
+            purchaser_email=f'buyer{i}@example.com', purchaser_phone='0700000000',
+            payment_screenshot='https://storage.example.com/screenshot.png',
+        ) for i, ticket_type in enumerate(ticket_types)
+    ])
+
+    attendees = Attendee.objects.bulk_create([
+        Attendee(first_name='Guest', last_name=str(i), email=f'guest{i}@example.com', phone='0700000000')
+        for i in range(len(purchases))
+    ])
+    TicketPDF.objects.bulk_create([
+        TicketPDF(purchase=purchase, attendee=attendee, exit_reason='normal')
+        for purchase, attendee in zip(purchases, attendees)
+    ])
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return owners[0], created[0], purchases[0], attendees[0]
+
+
+def hot_queries(promoter, event, purchase, attendee):
+    """The querysets behind the busiest endpoints, as the views build them"""
+    now = timezone.now()
+    queries = {
+        'catalog (AvailableEventsView)': Event.objects.filter(
+            status='published', end_date__gt=now
+        ).order_by('start_date', 'id')[:50],
+        'promoter events (ListEventsView)': Event.objects.filter(
+            promoter=promoter
+        ).order_by('-start_date', '-id')[:50],
+        'on-sale ticket types (EventTicketsView)': TicketType.objects.filter(
+            event_id=event.id, is_active=True, remaining__gt=0,
+            sale_start_date__lte=now, sale_end_date__gte=now
+        ),
+        'pending payments (PendingPaymentsListView)': Purchase.objects.filter(
+            ticket_type__event__in=Event.objects.filter(promoter=promoter),
+            payment_status='pending', payment_screenshot__isnull=False, is_approved_by_promoter=False
+        ).order_by('-purchase_date', '-id')[:50],
+        'payment reference lookup': Purchase.objects.filter(
+            transaction_reference=purchase.transaction_reference
+        ),
+        'ticket scan (ScanTicketView)': TicketPDF.objects.filter(
+            purchase_id=purchase.id, attendee_id=attendee.id
+        ),
+    }
+    # SQLite runs istartswith as a case-insensitive LIKE on the bare column, which no
+    # expression index serves; on Postgres the text_pattern_ops indexes on Users do
+    if connection.vendor == 'postgresql':
+        queries['user search (ListUsersView)'] = search_users(Users.objects.all(), promoter.email)
+    return queries
+
+
+def explain(queryset):
+    """The queryset's plan, the tables it scans sequentially and whether it reads any index"""
+    plan = queryset.explain()
+    scanned = sorted({
+        match for line in plan.splitlines() for match in SEQ_SCAN_PATTERNS[connection.vendor].findall(line)
+    })
+    return plan, scanned, bool(INDEX_SCAN_PATTERNS[connection.vendor].search(plan))
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot API querysets over seeded data and fail on sequential scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=2000,
+                            help='Events to seed (three ticket types and purchases each); rolled back afterwards')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in SEQ_SCAN_PATTERNS:
+            raise CommandError(f'No plan checks for the {connection.vendor} backend')
+
+        failures = []
+        with transaction.atomic():
+            queries = hot_queries(*seed(options['events']))
+            for name, queryset in queries.items():
+                plan, scanned, _ = explain(queryset)
+                if options['verbose_plans']:
+                    self.stdout.write(f'{name}:\n{plan}\n')
+                if scanned:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'SEQ SCAN  {name}: {", ".join(scanned)}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'ok        {name}'))
+            # The seeded rows are only there for the planner
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f'{len(failures)} of {len(queries)} hot queries use a sequential scan')
+        self.stdout.write(self.style.SUCCESS(f'All {len(queries)} hot queries use indexes.'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from promoter.tickets import recover_issues
+
+
+class Command(BaseCommand):
+    help = 'Issue tickets for approved purchases that never got them (e.g. issuance lost to a restart)'
+
+    def handle(self, *args, **kwargs):
+        issued = recover_issues()
+        self.stdout.write(self.style.SUCCESS(f'Issued tickets for {issued} purchases.'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from ezevent.images import reprocess_missing_variants
+
+
+class Command(BaseCommand):
+    help = 'Build variants for stored pictures that never got them (e.g. a job lost to a restart)'
+
+    def handle(self, *args, **kwargs):
+        processed = reprocess_missing_variants()
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} pictures.'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from promoter.facets import rebuild
+from ezevent.response_cache import CATALOG, bump_versions
+
+
+class Command(BaseCommand):
+    help = 'Recompute the event facet counts from the events table'
+
+    def handle(self, *args, **kwargs):
+        rows = rebuild()
+        bump_versions(CATALOG)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} facet rows.'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from promoter import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the EventStats/TicketTypeStats rollups from purchases and tickets, or check them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_ids', nargs='*', type=int, help='Only these events (default: all)')
+        parser.add_argument('--verify', action='store_true',
+                            help='Compare the rollups with the raw rows instead of rewriting them')
+
+    def handle(self, *args, **options):
+        event_ids = options['event_ids'] or None
+
+        if not options['verify']:
+            events = stats.rebuild(event_ids)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {events} events.'))
+            return
+
+        mismatches = stats.verify(event_ids)
+        for label, counter, stored, actual in mismatches:
+            self.stdout.write(self.style.ERROR(f'{label}: {counter} is {stored}, expected {actual}'))
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} stats values have drifted; run rebuild_event_stats to fix them')
+        self.stdout.write(self.style.SUCCESS('Event stats match purchases and tickets.'))
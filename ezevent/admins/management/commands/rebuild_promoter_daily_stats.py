@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from promoter.dashboard import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-promoter daily dashboard aggregates from events and ticket types'
+
+    def handle(self, *args, **kwargs):
+        rows = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} daily rows.'))
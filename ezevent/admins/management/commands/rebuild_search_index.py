@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from promoter.search import rebuild_index
+from ezevent.response_cache import CATALOG, bump_versions
+
+
+class Command(BaseCommand):
+    help = 'Re-index every event for search (e.g. after changing events with QuerySet.update())'
+
+    def handle(self, *args, **kwargs):
+        rows = rebuild_index()
+        bump_versions(CATALOG)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {rows} events.'))
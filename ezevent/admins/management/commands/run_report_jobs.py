@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from promoter.reports import recover_jobs
+
+
+class Command(BaseCommand):
+    help = 'Render report jobs that were queued but never finished (e.g. lost to a restart)'
+
+    def handle(self, *args, **kwargs):
+        jobs = recover_jobs()
+        self.stdout.write(self.style.SUCCESS(f'Ran {jobs} pending report jobs.'))
@@ -1,3 +1,20 @@
+from unittest import skipUnless
+from django.db import connection
 from django.test import TestCase
+from admins.management.commands.explain_hot_queries import explain, hot_queries, seed
 
-# Create your tests here.
+
+@skipUnless(connection.vendor == 'postgresql', 'Plans are only checked against the production database')
+class HotQueryPlanTests(TestCase):
+    """The busiest endpoints' queries are served by the hot-path indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.queries = hot_queries(*seed(2000))
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in self.queries.items():
+            with self.subTest(name):
+                plan, scanned, indexed = explain(queryset)
+                self.assertEqual(scanned, [], plan)
+                self.assertTrue(indexed, plan)
@@ -4,6 +4,8 @@ from django.core.mail import EmailMessage
 from admins.models import  SignupToken
 from auths.models import UserRole, Role, Users
 from auths.serializers import UserSerializer
+from django.db.models import OuterRef, Q, Subquery
+from ezevent.pagination import KeysetPagination
 import random
 import string
 from rest_framework import status
@@ -102,24 +104,52 @@ def send_signup_token_email(email, token, role_name):
     email_message.content_subtype = 'html'  
     email_message.send(fail_silently=False)
 
+def with_role_name(users):
+    """Annotating each user's first role so the serializer needs no per-row lookup"""
+    first_role = UserRole.objects.filter(user=OuterRef('pk')).order_by('id').values('role__name')[:1]
+    return users.annotate(role_name=Subquery(first_role))
+
+def search_users(users, term):
+    """Case-insensitive prefix match on email and names, served by the text_pattern_ops indexes on Users"""
+    term = (term or '').strip()
+    if not term:
+        return users
+    return users.filter(
+        Q(email__istartswith=term) | Q(firstname__istartswith=term) | Q(lastname__istartswith=term)
+    )
+
+def paginated_users(request, view, users):
+    """One keyset page of users, keeping the listings' {'success', 'data'} shape"""
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(users, request, view=view)
+    serializer = UserSerializer(page, many=True)
+    return Response({
+        'success': True,
+        'data': serializer.data,
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+    }, status=status.HTTP_200_OK)
+
 class ListPromotersView(APIView):
     permission_classes = [IsAdminOrHasRole]
     allowed_roles = ['admin']
+    keyset_ordering = '-id'
 
     def get(self, request):
         promoter_role = get_object_or_404(Role, name = "promoter")
         users = Users.objects.filter(userrole__role=promoter_role).exclude(is_superuser=True)
-        serializer = UserSerializer(users, many=True)
-        return Response({'success': True, "data": serializer.data}, status=status.HTTP_200_OK)
+        users = search_users(with_role_name(users), request.query_params.get('search'))
+        return paginated_users(request, self, users)
 
 class ListUsersView(APIView):
     permission_classes = [IsAdminOrHasRole]
     allowed_roles = ['admin']
+    keyset_ordering = '-id'
 
     def get(self, request):
         users = Users.objects.exclude(is_superuser=True)
-        serializer = UserSerializer(users, many=True)
-        return Response({'success': True, "data": serializer.data}, status=status.HTTP_200_OK)
+        users = search_users(with_role_name(users), request.query_params.get('search'))
+        return paginated_users(request, self, users)
 
 # deleting a user
 class DeleteUserView(APIView):
@@ -3,17 +3,11 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import generics, status
 from django.core.files.uploadedfile import InMemoryUploadedFile
-import os
-import uuid
 from datetime import datetime
-from firebase_admin import storage
 import jwt
 import random
 import string
-import os
-import uuid
 from datetime import datetime
-from firebase_admin import storage
 
 from django.utils.timezone import now
 from django.middleware import csrf
@@ -35,6 +29,8 @@ from rest_framework_simplejwt import views as jwt_views, serializers as jwt_seri
 from rest_framework.views import APIView
 from auths.permissions import IsAdminOrHasRole
 from .admin_views import send_signup_token_email
+from ezevent.storage import get_storage, unique_path
+from ezevent.images import schedule_variants
 
 @api_view(['GET'])
 @authentication_classes([])
@@ -356,27 +352,16 @@ class UserProfileUpdateView(generics.UpdateAPIView):
         
         data = request.data.copy()
         
+        profile_pic_path = None
         if profile_pic_file:
             try:
-                file_content = profile_pic_file.read()
-                file_name = profile_pic_file.name
-                file_ext = os.path.splitext(file_name)[1]
-                
-                timestamp = int(datetime.now().timestamp() * 1000)
-                unique_filename = f"{timestamp}_{uuid.uuid4().hex}{file_ext}"
-                
-                firebase_path = f"profilePics/{unique_filename}"
-                bucket = storage.bucket()
-                blob = bucket.blob(firebase_path)
-                
-                blob.upload_from_string(
-                    file_content,
+                profile_pic_path = unique_path('profilePics', profile_pic_file.name)
+                profile_pic_url = get_storage().upload_file(
+                    profile_pic_file,
+                    profile_pic_path,
                     content_type=profile_pic_file.content_type
                 )
                 
-                blob.make_public()
-                profile_pic_url = blob.public_url
-                
                 data['profile_pic'] = profile_pic_url
                 
             except Exception as e:
@@ -388,6 +373,8 @@ class UserProfileUpdateView(generics.UpdateAPIView):
         serializer = self.get_serializer(user, data=data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            if profile_pic_path:
+                schedule_variants(Users, user.pk, 'profile_pic', 'profile_pic_variants', profile_pic_url, profile_pic_path)
             return Response({
                 "status": "success",
                 "message": "Profile updated successfully",
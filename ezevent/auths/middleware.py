@@ -24,6 +24,8 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
         '/api/google-oauth2/login/raw/redirect/',
         '/api/google-oauth2/login/raw/callback/',
         '/auth/update_profile',
+        '/uploads/local/',
+        '/client/payments/',
     ]
 
     ADMIN_URL_PREFIX = '/admin/'
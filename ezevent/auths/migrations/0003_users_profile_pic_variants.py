@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auths', '0002_users_is_suspended'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='users',
+            name='profile_pic_variants',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
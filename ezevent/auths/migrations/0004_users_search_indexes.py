@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:55
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('auths', '0003_users_profile_pic_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='users',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='users_email_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='users',
+            index=models.Index(django.db.models.functions.text.Upper('firstname'), name='users_firstname_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='users',
+            index=models.Index(django.db.models.functions.text.Upper('lastname'), name='users_lastname_upper_idx'),
+        ),
+    ]
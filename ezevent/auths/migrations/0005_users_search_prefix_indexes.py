@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:34
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+from ezevent.db_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('auths', '0004_users_search_indexes'),
+    ]
+
+    # The pattern indexes are built before the old ones are dropped, so searches always have one
+    operations = [
+        AddIndexConcurrently(
+            model_name='users',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='text_pattern_ops'), name='users_email_prefix_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='users',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('firstname'), name='text_pattern_ops'), name='users_firstname_prefix_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='users',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('lastname'), name='text_pattern_ops'), name='users_lastname_prefix_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='users',
+            name='users_email_upper_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='users',
+            name='users_firstname_upper_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='users',
+            name='users_lastname_upper_idx',
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import UserManager,AbstractBaseUser,PermissionsMixin
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils import timezone
 import random
 class CustomUserManager(UserManager):
@@ -40,6 +42,7 @@ class Users(AbstractBaseUser, PermissionsMixin):
     contact = models.CharField(max_length=15, blank=True)
     password = models.CharField(max_length=100)
     profile_pic = models.CharField(max_length=500, default="https://firebasestorage.googleapis.com/v0/b/happy-hoe.appspot.com/o/dev%2FprofilePic%2F1724404221671_default-user-profile.png?alt=media&token=0793e28f-0230-46ef-abc0-2ea73ebd6fd4", null=True)
+    profile_pic_variants = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_suspended = models.BooleanField(default=False)
     
@@ -59,6 +62,13 @@ class Users(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # case-insensitive prefix search in the admin user listings; istartswith is
+            # UPPER(col) LIKE 'TERM%', which needs text_pattern_ops outside the C collation
+            models.Index(OpClass(Upper('email'), name='text_pattern_ops'), name='users_email_prefix_idx'),
+            models.Index(OpClass(Upper('firstname'), name='text_pattern_ops'), name='users_firstname_prefix_idx'),
+            models.Index(OpClass(Upper('lastname'), name='text_pattern_ops'), name='users_lastname_prefix_idx'),
+        ]
 
     def get_full_name(self):
         return f'{self.firstname} {self.lastname}'
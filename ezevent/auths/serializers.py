@@ -26,12 +26,13 @@ class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(max_length=100, write_only=True)
     contact = serializers.CharField(max_length=15, allow_blank=True, required=False)
     profile_pic = serializers.CharField(max_length=500, allow_blank=True, required=False)
+    profile_pic_variants = serializers.JSONField(read_only=True)
     created_at = serializers.DateTimeField(read_only=True)
     role = serializers.CharField(source='userrole.role.name', read_only=True)
 
     class Meta:
         model = Users
-        fields = ['id', 'email', 'firstname', 'lastname', 'contact', 'profile_pic', 'password', 'created_at', 'role']
+        fields = ['id', 'email', 'firstname', 'lastname', 'contact', 'profile_pic', 'profile_pic_variants', 'password', 'created_at', 'role']
         extra_kwargs = {'password': {'write_only': True}}
 
     def create(self, validated_data):
@@ -65,9 +66,14 @@ class UserSerializer(serializers.ModelSerializer):
     
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        user_role = UserRole.objects.filter(user=instance).first()
+        # Listings annotate role_name in SQL (see with_role_name); single users still look it up
+        if hasattr(instance, 'role_name'):
+            role_name = instance.role_name
+        else:
+            user_role = UserRole.objects.filter(user=instance).select_related('role').first()
+            role_name = user_role.role.name if user_role else None
         # Assigning "admin" if role is None
-        representation['role'] = user_role.role.name if user_role else "admin"
+        representation['role'] = role_name or "admin"
         return representation
 
 class CookieTokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
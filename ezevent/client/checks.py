@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from ezevent.checks import SHARED_CACHE_HINT, uses_atomic_cache, uses_shared_cache
+
+
+@register(Tags.caches)
+def check_waiting_room_cache(app_configs, **kwargs):
+    """Queue positions and single-use passes must be seen by every worker"""
+    if not settings.WAITING_ROOM['ENABLED'] or uses_atomic_cache():
+        return []
+    return [Error(
+        'WAITING_ROOM is enabled but the default cache has no atomic add()/incr() across processes, '
+        'so workers would hand out the same queue positions and accept a pass more than once.',
+        hint=SHARED_CACHE_HINT,
+        id='client.E001',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def check_response_cache(app_configs, **kwargs):
+    """Version keys bumped by one worker should invalidate the responses cached by the others"""
+    if uses_shared_cache():
+        return []
+    return [Warning(
+        'The default cache is per process, so a change seen by one worker leaves the others serving '
+        'cached catalog and event responses until they expire (at most their cache timeout).',
+        hint=SHARED_CACHE_HINT + ' FileBasedCache is enough for workers on a single host.',
+        id='client.W002',
+    )]
@@ -10,15 +10,18 @@ class Migration(migrations.Migration):
         ('client', '0004_auto_20250305_2246'),
     ]
 
+    # 0003 already added both columns; re-adding them fails on a fresh database
     operations = [
-        migrations.AddField(
-            model_name='ticketpdf',
-            name='exit_time',
-            field=models.DateTimeField(blank=True, null=True),
-        ),
-        migrations.AddField(
-            model_name='ticketpdf',
-            name='time_spent',
-            field=models.DurationField(blank=True, null=True),
-        ),
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AddField(
+                model_name='ticketpdf',
+                name='exit_time',
+                field=models.DateTimeField(blank=True, null=True),
+            ),
+            migrations.AddField(
+                model_name='ticketpdf',
+                name='time_spent',
+                field=models.DurationField(blank=True, null=True),
+            ),
+        ]),
     ]
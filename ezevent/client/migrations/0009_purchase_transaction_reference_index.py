@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0008_alter_purchase_payment_screenshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='purchase',
+            name='transaction_reference',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0009_purchase_transaction_reference_index'),
+        ('promoter', '0004_event_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['user', '-purchase_date'], name='purchase_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['purchaser_email', '-purchase_date'], name='purchase_email_date_idx'),
+        ),
+    ]
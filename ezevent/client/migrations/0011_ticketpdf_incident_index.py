@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0010_purchase_wallet_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticketpdf',
+            index=models.Index(condition=models.Q(('exit_reason__in', ['injured', 'emergency'])), fields=['exit_reason', 'exit_time'], name='ticketpdf_incident_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:07
+
+from django.conf import settings
+from django.db import migrations, models
+from ezevent.db_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('client', '0011_ticketpdf_incident_index'),
+        ('promoter', '0008_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='purchase',
+            index=models.Index(fields=['ticket_type', 'payment_status', 'is_approved_by_promoter', 'purchase_date'], name='purchase_pending_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='ticketpdf',
+            index=models.Index(fields=['purchase', 'attendee'], name='ticketpdf_scan_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:45
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Coalesce, Now
+
+
+def mark_issued(apps, schema_editor):
+    # Purchases that already have tickets are done; approved ones without are left for issue_pending_tickets
+    Purchase = apps.get_model('client', 'Purchase')
+    TicketPDF = apps.get_model('client', 'TicketPDF')
+    Purchase.objects.filter(
+        Exists(TicketPDF.objects.filter(purchase=OuterRef('pk')))
+    ).update(tickets_issued_at=Coalesce('approval_date', Now()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0012_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchase',
+            name='tickets_issue_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='tickets_issued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_issued, migrations.RunPython.noop),
+    ]
@@ -13,6 +13,17 @@ class Attendee(models.Model):
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+class PurchaseQuerySet(models.QuerySet):
+    def owned_by(self, user):
+        """Purchases the user made, or that were made with their email"""
+        return self.filter(models.Q(user=user) | models.Q(purchaser_email=user.email))
+
+    def with_details(self):
+        """Loading everything PurchaseSerializer reads, so listing stays at a fixed query count"""
+        return self.select_related('ticket_type', 'ticket_type__event').prefetch_related(
+            models.Prefetch('attendees', queryset=PurchaseAttendee.objects.select_related('attendee'))
+        )
+
 class Purchase(models.Model):
     PAYMENT_STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -33,7 +44,7 @@ class Purchase(models.Model):
     purchase_date = models.DateTimeField(auto_now_add=True)
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='pending')
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES)
-    transaction_reference = models.CharField(max_length=100, blank=True, null=True)
+    transaction_reference = models.CharField(max_length=100, blank=True, null=True, db_index=True)
     purchaser_email = models.EmailField()
     purchaser_phone = models.CharField(max_length=20)
     payment_screenshot = models.CharField(max_length=500, null=True, blank=True)
@@ -42,6 +53,21 @@ class Purchase(models.Model):
     qr_code = models.ImageField(upload_to='qr_codes/', null=True, blank=True)
     # ticket_pdf = models.FileField(upload_to='tickets/', null=True, blank=True)
     ticket_pdf_url = models.URLField(max_length=500, null=True, blank=True)
+    # Ticket issuance after approval (promoter.tickets): claimed, then done with the tickets saved
+    tickets_issue_started_at = models.DateTimeField(null=True, blank=True)
+    tickets_issued_at = models.DateTimeField(null=True, blank=True)
+
+    objects = PurchaseQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-purchase_date'], name='purchase_user_date_idx'),
+            models.Index(fields=['purchaser_email', '-purchase_date'], name='purchase_email_date_idx'),
+            models.Index(
+                fields=['ticket_type', 'payment_status', 'is_approved_by_promoter', 'purchase_date'],
+                name='purchase_pending_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"Purchase #{self.id} - {self.ticket_type.event.title}"
@@ -68,6 +94,20 @@ class TicketPDF(models.Model):
         ('emergency', 'Emergency'),
     ], default='normal')
     injury_notes = models.TextField(blank=True, null=True)
+
+    INCIDENT_REASONS = ('injured', 'emergency')
+
+    class Meta:
+        indexes = [
+            # Ticket scans look tickets up by the (purchase, attendee) pair in the QR code
+            models.Index(fields=['purchase', 'attendee'], name='ticketpdf_scan_idx'),
+            # Only incident rows are indexed, so the index stays tiny next to normal exits
+            models.Index(
+                fields=['exit_reason', 'exit_time'],
+                condition=models.Q(exit_reason__in=['injured', 'emergency']),
+                name='ticketpdf_incident_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"Ticket for {self.attendee.first_name} {self.attendee.last_name}"
@@ -0,0 +1,223 @@
+"""Mobile-money providers for initiating payments and verifying their callbacks.
+
+initiate() asks the provider to push a payment prompt to the purchaser's
+phone, tagged with a reference of ours that comes back in the callback.
+Each provider signs its callbacks with a shared secret (HMAC-SHA256 over the
+raw request body, hex encoded in the X-Callback-Signature header), and
+parse_callback() reads the fields each provider puts in a different place.
+When MOBILE_MONEY['USE_STUB'] is set, both MTN and Airtel are served by
+StubProvider, which calls nobody and can build signed callbacks for tests.
+"""
+import hmac
+import json
+import re
+import uuid
+import hashlib
+from decimal import Decimal, InvalidOperation
+import requests
+from django.conf import settings
+
+SIGNATURE_HEADER = 'X-Callback-Signature'
+# Seconds to wait on a provider API before giving up
+REQUEST_TIMEOUT = 15
+
+
+class CallbackError(Exception):
+    """A callback that is malformed or carries unexpected values"""
+
+
+class PaymentError(Exception):
+    """The provider refused or failed to start a collection"""
+
+
+def msisdn(phone):
+    """A phone number in international form without the plus, e.g. 0772123456 -> 256772123456"""
+    digits = re.sub(r'\D', '', phone or '')
+    if digits.startswith('0'):
+        digits = settings.MOBILE_MONEY['COUNTRY_CODE'] + digits[1:]
+    return digits
+
+
+def _lookup(payload, path):
+    for key in path:
+        if not isinstance(payload, dict):
+            return None
+        payload = payload.get(key)
+    return payload
+
+
+class PaymentProvider:
+    code = None
+    reference_prefix = None
+    display_name = None
+    # Where our reference, the status and the amount sit in a callback payload
+    reference_path = None
+    status_path = None
+    amount_path = None
+    # Provider statuses mapped to ours ('completed' or 'failed'); anything else is rejected
+    statuses = {}
+
+    def __init__(self, config):
+        self.config = config
+
+    def new_reference(self):
+        return f"{self.reference_prefix}-{uuid.uuid4().hex[:8].upper()}"
+
+    def initiate(self, purchase):
+        """Starting a collection for the purchase, returning its reference and payment URL"""
+        transaction_reference = self.new_reference()
+        self.request_payment(purchase, transaction_reference)
+        return {
+            'transaction_reference': transaction_reference,
+            'payment_url': self.config['PAYMENT_URL'].format(reference=transaction_reference),
+        }
+
+    def request_payment(self, purchase, transaction_reference):
+        """Asking the provider to collect the purchase's amount; raises PaymentError"""
+
+    def _post(self, url, **kwargs):
+        try:
+            response = requests.post(url, timeout=REQUEST_TIMEOUT, **kwargs)
+        except requests.RequestException as e:
+            raise PaymentError(f'{self.display_name} is unreachable: {e}')
+        if response.status_code >= 400:
+            raise PaymentError(f'{self.display_name} refused the request ({response.status_code})')
+        return response
+
+    def sign(self, body):
+        secret = (self.config.get('CALLBACK_SECRET') or '').encode()
+        return hmac.new(secret, body, hashlib.sha256).hexdigest()
+
+    def verify_signature(self, body, signature):
+        if not self.config.get('CALLBACK_SECRET') or not signature:
+            return False
+        return hmac.compare_digest(self.sign(body), signature)
+
+    def parse_callback(self, payload):
+        """Returning {'transaction_reference', 'status', 'amount'}; status is 'completed' or 'failed'"""
+        reference = _lookup(payload, self.reference_path)
+        if not isinstance(reference, str) or not reference.strip():
+            raise CallbackError('Missing transaction reference')
+        status = _lookup(payload, self.status_path)
+        if status not in self.statuses:
+            raise CallbackError(f'Unexpected status: {status}')
+        return {
+            'transaction_reference': reference,
+            'status': self.statuses[status],
+            'amount': self._amount(_lookup(payload, self.amount_path)),
+        }
+
+    @staticmethod
+    def _amount(value):
+        try:
+            return Decimal(str(value))
+        except (InvalidOperation, TypeError):
+            raise CallbackError('Invalid amount')
+
+
+class MTNProvider(PaymentProvider):
+    """MTN MoMo collections; our reference travels as the request's externalId"""
+    code = 'mtn'
+    reference_prefix = 'MTN'
+    display_name = 'MTN Mobile Money'
+    reference_path = ('externalId',)
+    status_path = ('status',)
+    amount_path = ('amount',)
+    statuses = {'SUCCESSFUL': 'completed', 'FAILED': 'failed', 'REJECTED': 'failed', 'TIMEOUT': 'failed'}
+
+    def _headers(self):
+        return {'Ocp-Apim-Subscription-Key': self.config['SUBSCRIPTION_KEY']}
+
+    def request_payment(self, purchase, transaction_reference):
+        token = self._post(
+            f"{self.config['BASE_URL']}/collection/token/",
+            auth=(self.config['API_USER'], self.config['API_KEY']), headers=self._headers(),
+        ).json()['access_token']
+        self._post(
+            f"{self.config['BASE_URL']}/collection/v1_0/requesttopay",
+            headers={
+                **self._headers(),
+                'Authorization': f'Bearer {token}',
+                'X-Reference-Id': str(uuid.uuid4()),
+                'X-Target-Environment': self.config['TARGET_ENVIRONMENT'],
+                'X-Callback-Url': self.config['CALLBACK_URL'],
+            },
+            json={
+                'amount': str(purchase.total_amount),
+                'currency': settings.MOBILE_MONEY['CURRENCY'],
+                'externalId': transaction_reference,
+                'payer': {'partyIdType': 'MSISDN', 'partyId': msisdn(purchase.purchaser_phone)},
+                'payerMessage': f'Ezevent purchase {purchase.pk}',
+                'payeeNote': transaction_reference,
+            },
+        )
+
+
+class AirtelProvider(PaymentProvider):
+    """Airtel Money collections; our reference travels as the transaction id"""
+    code = 'airtel'
+    reference_prefix = 'AIR'
+    display_name = 'Airtel Money'
+    reference_path = ('transaction', 'id')
+    status_path = ('transaction', 'status_code')
+    amount_path = ('transaction', 'amount')
+    statuses = {'TS': 'completed', 'TF': 'failed'}
+
+    def request_payment(self, purchase, transaction_reference):
+        token = self._post(f"{self.config['BASE_URL']}/auth/oauth2/token", json={
+            'client_id': self.config['CLIENT_ID'],
+            'client_secret': self.config['CLIENT_SECRET'],
+            'grant_type': 'client_credentials',
+        }).json()['access_token']
+        country, currency = settings.MOBILE_MONEY['COUNTRY'], settings.MOBILE_MONEY['CURRENCY']
+        # Airtel wants the number without the country code
+        number = msisdn(purchase.purchaser_phone).removeprefix(settings.MOBILE_MONEY['COUNTRY_CODE'])
+        self._post(
+            f"{self.config['BASE_URL']}/merchant/v1/payments/",
+            headers={'Authorization': f'Bearer {token}', 'X-Country': country, 'X-Currency': currency},
+            json={
+                'reference': f'Ezevent purchase {purchase.pk}',
+                'subscriber': {'country': country, 'currency': currency, 'msisdn': number},
+                'transaction': {'amount': str(purchase.total_amount), 'country': country,
+                                'currency': currency, 'id': transaction_reference},
+            },
+        )
+
+
+class StubProvider(PaymentProvider):
+    """Local stand-in for either provider, with a flat callback payload"""
+    display_name = 'Mobile Money (stub)'
+    reference_path = ('transaction_reference',)
+    status_path = ('status',)
+    amount_path = ('amount',)
+    statuses = {'completed': 'completed', 'failed': 'failed'}
+
+    def __init__(self, config, code, reference_prefix):
+        super().__init__({**config, 'CALLBACK_SECRET': config.get('CALLBACK_SECRET') or settings.SECRET_KEY})
+        self.code = code
+        self.reference_prefix = reference_prefix
+
+    def build_callback(self, transaction_reference, status, amount):
+        """Signed callback body and headers, as the provider would send them"""
+        body = json.dumps({
+            'transaction_reference': transaction_reference,
+            'status': status,
+            'amount': str(amount),
+        }).encode()
+        return body, {SIGNATURE_HEADER: self.sign(body)}
+
+
+PROVIDERS = {
+    'mtn': MTNProvider,
+    'airtel': AirtelProvider,
+}
+
+
+def get_provider(code):
+    """Returning the configured provider for a payment method, or None"""
+    if code not in PROVIDERS:
+        return None
+    config = settings.MOBILE_MONEY['PROVIDERS'][code]
+    if settings.MOBILE_MONEY['USE_STUB']:
+        return StubProvider(config, code, PROVIDERS[code].reference_prefix)
+    return PROVIDERS[code](config)
@@ -1,11 +1,16 @@
+from django.db import transaction
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import Attendee, Purchase, PurchaseAttendee
+from .models import Attendee, Purchase, PurchaseAttendee, TicketPDF
+from ezevent.sparse import SparseFieldsMixin
+from promoter import tickets
+
 class AttendeeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Attendee
         fields = ['id', 'first_name', 'last_name', 'email', 'phone']
 
-class PurchaseSerializer(serializers.ModelSerializer):
+class PurchaseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     attendees = serializers.ListField(
         child=AttendeeSerializer(), 
         write_only=True,
@@ -27,10 +32,20 @@ class PurchaseSerializer(serializers.ModelSerializer):
             'id', 'purchase_date', 'payment_status', 'transaction_reference', 
             'attendee_details', 'is_approved_by_promoter', 'ticket_pdf_url'
         ]
+        select_related_fields = {
+            'ticket_type_name': 'ticket_type',
+            'event_title': 'ticket_type__event',
+        }
+        prefetch_related_fields = {
+            'attendee_details': Prefetch('attendees', queryset=PurchaseAttendee.objects.select_related('attendee')),
+        }
     
     def get_attendee_details(self, obj):
-        # Get the actual Attendee objects through the relationship
-        purchase_attendees = PurchaseAttendee.objects.filter(purchase=obj)
+        # Reading from the prefetch cache when the view used Purchase.objects.with_details()
+        if 'attendees' in getattr(obj, '_prefetched_objects_cache', {}):
+            purchase_attendees = obj.attendees.all()
+        else:
+            purchase_attendees = obj.attendees.select_related('attendee')
         attendees = [pa.attendee for pa in purchase_attendees]
         return AttendeeSerializer(attendees, many=True).data
     
@@ -38,6 +53,7 @@ class PurchaseSerializer(serializers.ModelSerializer):
         # Return the payment screenshot URL if it exists
         return obj.payment_screenshot if obj.payment_screenshot else None
     
+    @transaction.atomic
     def create(self, validated_data):
         # Extract attendees data before creating purchase
         attendees_data = validated_data.pop('attendees', [])
@@ -48,6 +64,11 @@ class PurchaseSerializer(serializers.ModelSerializer):
             quantity = validated_data.get('quantity', 1)
             validated_data['total_amount'] = ticket_type.price * quantity
         
+        # Taking the tickets off the stock first; the atomic block undoes it if anything below fails
+        ticket_type = validated_data.get('ticket_type')
+        if not tickets.sell(ticket_type, validated_data.get('quantity', 1)):
+            raise serializers.ValidationError("Not enough tickets available")
+
         # Create the purchase
         purchase = Purchase.objects.create(**validated_data)
         
@@ -56,15 +77,51 @@ class PurchaseSerializer(serializers.ModelSerializer):
             attendee = Attendee.objects.create(**attendee_data)
             PurchaseAttendee.objects.create(purchase=purchase, attendee=attendee)
         
-        # Update ticket availability
-        ticket_type = validated_data.get('ticket_type')
-        quantity = validated_data.get('quantity', 1)
-        if ticket_type.remaining >= quantity:
-            ticket_type.remaining -= quantity
-            ticket_type.save()
-        else:
-            # Handle insufficient tickets scenario
-            purchase.delete()
-            raise serializers.ValidationError("Not enough tickets available")
-        
-        return purchase
\ No newline at end of file
+        return purchase
+
+
+class WalletTicketSerializer(serializers.ModelSerializer):
+    status = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TicketPDF
+        fields = ['id', 'pdf_url', 'is_used', 'used_at', 'exit_time', 'status']
+
+    def get_status(self, obj):
+        return 'Completed' if obj.exit_time else ('Still Inside' if obj.is_used else 'Not Used')
+
+
+class WalletPurchaseSerializer(serializers.ModelSerializer):
+    """A purchase with its event, attendees and tickets, read from prefetched relations only"""
+    ticket_type_name = serializers.CharField(source='ticket_type.name', read_only=True)
+    event = serializers.SerializerMethodField()
+    attendees = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Purchase
+        fields = [
+            'id', 'purchase_date', 'quantity', 'total_amount', 'payment_status',
+            'payment_method', 'is_approved_by_promoter', 'approval_date',
+            'ticket_pdf_url', 'ticket_type_name', 'event', 'attendees'
+        ]
+
+    def get_event(self, obj):
+        event = obj.ticket_type.event
+        return {
+            'id': event.id,
+            'title': event.title,
+            'venue': event.venue,
+            'location': event.location,
+            'start_date': serializers.DateTimeField().to_representation(event.start_date),
+            'end_date': serializers.DateTimeField().to_representation(event.end_date),
+        }
+
+    def get_attendees(self, obj):
+        tickets = {ticket.attendee_id: ticket for ticket in obj.ticket_pdfs.all()}
+        attendees = []
+        for purchase_attendee in obj.attendees.all():
+            attendee = AttendeeSerializer(purchase_attendee.attendee).data
+            ticket = tickets.get(purchase_attendee.attendee_id)
+            attendee['ticket'] = WalletTicketSerializer(ticket).data if ticket else None
+            attendees.append(attendee)
+        return attendees
@@ -1,3 +1,605 @@
-from django.test import TestCase
+import datetime
+import decimal
+import json
+import tempfile
+import time
+import uuid
+from unittest import mock
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from auths.auth_views.auth_views import get_user_tokens
+from auths.models import Users
+from client import payments, waiting_room
+from client.models import Attendee, Purchase, PurchaseAttendee, TicketPDF
+from ezevent.renderers import ORJSONRenderer
+from promoter import tickets
+from promoter.models import Event, EventStats, TicketType
 
-# Create your tests here.
+
+def api_client(user, role='client'):
+    """A client sending the bearer token JWTAuthenticationMiddleware expects"""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_user_tokens(user, role)['access_token']}")
+    return client
+
+
+def create_purchases(ticket_type, buyer, count, attendees=3):
+    """Purchases by buyer, each with its own attendees and one ticket per attendee"""
+    purchases = []
+    for i in range(count):
+        purchase = Purchase.objects.create(
+            user=buyer, ticket_type=ticket_type, quantity=attendees, total_amount=attendees * ticket_type.price,
+            payment_method='mtn', purchaser_email=buyer.email, purchaser_phone='0700000000',
+            payment_screenshot='https://storage.example.com/screenshot.png',
+        )
+        for j in range(attendees):
+            attendee = Attendee.objects.create(
+                first_name='Guest', last_name=f'{i}-{j}', email=f'guest{i}-{j}@example.com', phone='0700000000'
+            )
+            PurchaseAttendee.objects.create(purchase=purchase, attendee=attendee)
+            TicketPDF.objects.create(purchase=purchase, attendee=attendee, pdf_url='https://storage.example.com/t.pdf')
+        purchases.append(purchase)
+    return purchases
+
+
+class PurchaseQueryCountTests(TestCase):
+    """Purchase endpoints read attendees and tickets through prefetches, whatever their number
+
+    Every request also loads the user twice, once in JWTAuthenticationMiddleware and once in
+    DRF's authentication, so the counts below include two user queries.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        cls.buyer = Users.objects.create(email='buyer@example.com', firstname='Buy', lastname='Er')
+        event = Event.objects.create(
+            promoter=cls.promoter, title='Concert', description='Live', location='Kampala', venue='Hall',
+            start_date=now + datetime.timedelta(days=7), end_date=now + datetime.timedelta(days=7, hours=5),
+            status='published', max_capacity=500,
+        )
+        cls.ticket_type = TicketType.objects.create(
+            event=event, name='Regular', price=50000, quantity=500, remaining=500,
+            sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now + datetime.timedelta(days=6),
+        )
+
+    def setUp(self):
+        self.client = api_client(self.buyer)
+
+    def test_wallet_query_count_is_independent_of_purchases(self):
+        create_purchases(self.ticket_type, self.buyer, 1)
+        # two user lookups, the two validator aggregates, purchases, attendees, tickets
+        with self.assertNumQueries(7):
+            response = self.client.get('/client/wallet')
+        self.assertEqual(len(response.json()), 1)
+
+        create_purchases(self.ticket_type, self.buyer, 9)
+        with self.assertNumQueries(7):
+            response = self.client.get('/client/wallet')
+        self.assertEqual(len(response.json()), 10)
+        self.assertEqual({len(purchase['attendees']) for purchase in response.json()}, {3})
+
+    def test_unchanged_wallet_is_answered_from_aggregates(self):
+        purchase = create_purchases(self.ticket_type, self.buyer, 2)[0]
+        etag = self.client.get('/client/wallet')['ETag']
+        # two user lookups and the two aggregates; nothing is loaded or serialized
+        with self.assertNumQueries(4):
+            response = self.client.get('/client/wallet', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        TicketPDF.objects.filter(purchase=purchase).update(is_used=True, used_at=timezone.now())
+        self.assertEqual(self.client.get('/client/wallet', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_wallet_ignores_email_parameter(self):
+        create_purchases(self.ticket_type, self.buyer, 1)
+        response = api_client(self.promoter).get('/client/wallet', {'email': self.buyer.email})
+        self.assertEqual(response.json(), [])
+
+    def test_purchase_detail_query_count_is_independent_of_attendees(self):
+        single = create_purchases(self.ticket_type, self.buyer, 1, attendees=1)[0]
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/client/purchase/{single.pk}')
+        self.assertEqual(len(response.json()['attendee_details']), 1)
+
+        group = create_purchases(self.ticket_type, self.buyer, 1, attendees=8)[0]
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/client/purchase/{group.pk}')
+        self.assertEqual(len(response.json()['attendee_details']), 8)
+
+    @mock.patch('client.views.save_deduplicated', return_value='https://storage.example.com/proof.png')
+    def test_payment_proof_only_for_own_unapproved_purchases(self, save_deduplicated):
+        own, approved = create_purchases(self.ticket_type, self.buyer, 2, attendees=1)
+        Purchase.objects.filter(pk=approved.pk).update(is_approved_by_promoter=True)
+
+        def submit(client, purchase):
+            screenshot = SimpleUploadedFile('proof.png', b'png', content_type='image/png')
+            return client.put(f'/client/purchase/{purchase.pk}/submit-payment', {'payment_screenshot': screenshot})
+
+        self.assertEqual(submit(api_client(self.promoter), own).status_code, 404)
+        self.assertEqual(submit(self.client, approved).status_code, 404)
+        save_deduplicated.assert_not_called()
+
+        self.assertEqual(submit(self.client, own).status_code, 200)
+        own.refresh_from_db()
+        self.assertEqual(own.payment_screenshot, 'https://storage.example.com/proof.png')
+
+
+def follow_next(client, url, pages):
+    """The URL of the page `pages` pages after url, found by following `next` links"""
+    for _ in range(pages):
+        url = client.get(url).json()['next']
+    return url
+
+
+class CatalogKeysetPaginationTests(TestCase):
+    """A deep catalog page costs the same queries as the first one
+
+    10,000 events rather than a production-sized 100,000 keep the suite quick;
+    the query count and the absence of OFFSET do not depend on the row count.
+    """
+    EVENTS = 10000
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        cls.buyer = Users.objects.create(email='buyer@example.com', firstname='Buy', lastname='Er')
+        events = Event.objects.bulk_create([
+            Event(
+                promoter=promoter, title=f'Event {i}', description='Live', location='Kampala', venue='Hall',
+                start_date=now + datetime.timedelta(minutes=i), end_date=now + datetime.timedelta(days=1, minutes=i),
+                status='published', max_capacity=500,
+            ) for i in range(cls.EVENTS)
+        ], batch_size=1000)
+        TicketType.objects.bulk_create([
+            TicketType(
+                event=event, name='Regular', price=50000, quantity=500, remaining=500,
+                sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now + datetime.timedelta(hours=12),
+            ) for event in events
+        ], batch_size=1000)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_deep_page_query_count_matches_first_page(self):
+        client = api_client(self.buyer)
+        # two user lookups, the ETag state of events and on-sale ticket types, the page, its ticket types
+        with self.assertNumQueries(6):
+            response = client.get('/client/events/available?page_size=200')
+        self.assertEqual(response.json()['results'][0]['title'], 'Event 0')
+
+        deep = follow_next(client, '/client/events/available?page_size=200', 40)
+        with self.assertNumQueries(6) as captured:
+            response = client.get(deep)
+        # the cursor seeks on (start_date, id) instead of skipping rows
+        self.assertFalse([query for query in captured.captured_queries if 'OFFSET' in query['sql']])
+        self.assertEqual(response.json()['results'][0]['title'], 'Event 8000')
+
+
+class TiedKeysetPaginationTests(TestCase):
+    """Events sharing a start date page by id, without OFFSET"""
+    EVENTS = 25
+
+    @classmethod
+    def setUpTestData(cls):
+        start = timezone.now() + datetime.timedelta(days=7)
+        promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        cls.buyer = Users.objects.create(email='buyer@example.com', firstname='Buy', lastname='Er')
+        cls.events = Event.objects.bulk_create([
+            Event(
+                promoter=promoter, title=f'Event {i}', description='Live', location='Kampala', venue='Hall',
+                start_date=start, end_date=start + datetime.timedelta(hours=5), status='published', max_capacity=500,
+            ) for i in range(cls.EVENTS)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = api_client(self.buyer)
+
+    def test_pages_of_tied_rows(self):
+        pages = []
+        url = '/client/events/available?page_size=10'
+        while url:
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(url).json()
+            self.assertFalse([query for query in captured.captured_queries if 'OFFSET' in query['sql']])
+            pages.append([event['id'] for event in response['results']])
+            url = response['next']
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(sum(pages, []), sorted(event.pk for event in self.events))
+
+        last = follow_next(self.client, '/client/events/available?page_size=10', 2)
+        previous = self.client.get(self.client.get(last).json()['previous']).json()
+        self.assertEqual([event['id'] for event in previous['results']], pages[1])
+
+
+class SparseFieldsTests(TestCase):
+    """?fields= and ?expand= narrow both the response and the SQL behind it"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        cls.buyer = Users.objects.create(email='buyer@example.com', firstname='Buy', lastname='Er')
+        cls.event = Event.objects.create(
+            promoter=promoter, title='Concert', description='A very long description', location='Kampala',
+            venue='Hall', start_date=now + datetime.timedelta(days=7),
+            end_date=now + datetime.timedelta(days=7, hours=5), status='published', max_capacity=500,
+        )
+        cls.ticket_type = TicketType.objects.create(
+            event=cls.event, name='Regular', price=50000, quantity=500, remaining=500,
+            sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now + datetime.timedelta(days=6),
+        )
+        cls.purchase = create_purchases(cls.ticket_type, cls.buyer, 1, attendees=1)[0]
+
+    def setUp(self):
+        cache.clear()
+        self.client = api_client(self.buyer)
+
+    def prefetches_ticket_types(self, captured):
+        # the catalog prefetches on-sale ticket types cheapest first
+        return [query for query in captured.captured_queries if 'ORDER BY "promoter_tickettype"."price"' in query['sql']]
+
+    def test_fields_limit_the_response_and_the_columns(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/client/events/available', {'fields': 'id,title,nonexistent'})
+        self.assertEqual(response.json()['results'], [{'id': self.event.pk, 'title': 'Concert'}])
+        page_sql = [
+            query['sql'] for query in captured.captured_queries
+            if 'FROM "promoter_event"' in query['sql'] and 'ORDER BY' in query['sql']
+        ]
+        self.assertEqual(len(page_sql), 1)
+        self.assertNotIn('"description"', page_sql[0])
+        # ticket types were not asked for, so they are not prefetched
+        self.assertFalse(self.prefetches_ticket_types(captured))
+
+    def test_expand_adds_nested_fields(self):
+        response = self.client.get('/client/events/available', {'fields': 'id', 'expand': 'ticket_types'})
+        event = response.json()['results'][0]
+        self.assertEqual(set(event), {'id', 'ticket_types'})
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get('/client/events/available', {'fields': 'id', 'expand': 'ticket_types', 'page_size': 5})
+        self.assertTrue(self.prefetches_ticket_types(captured))
+        self.assertEqual([ticket_type['id'] for ticket_type in event['ticket_types']], [self.ticket_type.pk])
+
+    def test_select_related_field_only_joins_when_asked(self):
+        url = f'/client/purchase/{self.purchase.pk}'
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, {'fields': 'id,event_title'})
+        self.assertEqual(response.json(), {'id': self.purchase.pk, 'event_title': 'Concert'})
+        self.assertTrue([query for query in captured.captured_queries if 'promoter_event' in query['sql']])
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, {'fields': 'id,quantity'})
+        self.assertEqual(response.json(), {'id': self.purchase.pk, 'quantity': 1})
+        self.assertFalse([query for query in captured.captured_queries if 'promoter_event' in query['sql']])
+
+    def test_without_fields_the_response_is_complete(self):
+        event = self.client.get('/client/events/available').json()['results'][0]
+        self.assertIn('ticket_types', event)
+        self.assertIn('venue', event)
+
+
+class JSONRendererTests(TestCase):
+    """The orjson renderer and parser agree with DRF's stdlib ones"""
+
+    def test_output_matches_drf(self):
+        data = {
+            'when': datetime.datetime(2026, 3, 2, 10, 15, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2026, 3, 2),
+            'amount': decimal.Decimal('50000.50'),
+            'duration': datetime.timedelta(minutes=90),
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'label': gettext_lazy('Invalid cursor'),
+            'nested': [{'count': 3, 'ratio': 0.5, 'missing': None}],
+            'unicode': 'Kampala — Kololo',
+        }
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+    def test_querysets_become_lists(self):
+        Users.objects.create(email='buyer@example.com', firstname='Buy', lastname='Er')
+        rendered = ORJSONRenderer().render({'emails': Users.objects.values_list('email', flat=True)})
+        self.assertEqual(json.loads(rendered), {'emails': ['buyer@example.com']})
+
+    def test_malformed_body_is_a_400(self):
+        client = api_client(Users.objects.create(email='buyer@example.com', firstname='Buy', lastname='Er'))
+        response = client.post('/client/purchase/create', '{"quantity": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON parse error', response.json()['detail'])
+
+
+class ConditionalGetTests(TestCase):
+    """Unchanged resources are answered with 304; shared cached ones share their ETag"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        cls.other_promoter = Users.objects.create(email='other@example.com', firstname='Oth', lastname='Er')
+        cls.buyers = [
+            Users.objects.create(email=f'buyer{i}@example.com', firstname='Buy', lastname='Er') for i in range(2)
+        ]
+        cls.event = Event.objects.create(
+            promoter=cls.promoter, title='Concert', description='Live', location='Kampala', venue='Hall',
+            start_date=now + datetime.timedelta(days=7), end_date=now + datetime.timedelta(days=7, hours=5),
+            status='published', max_capacity=500,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_catalog_etag_is_shared(self):
+        first, second = (api_client(buyer) for buyer in self.buyers)
+        response = first.get('/client/events/available')
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        # served from the cache entry the first buyer filled
+        self.assertEqual(second.get('/client/events/available', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(second.get('/client/events/available')['ETag'], etag)
+        # and rebuilt by the other buyer, the entry carries the same tag
+        cache.clear()
+        self.assertEqual(second.get('/client/events/available')['ETag'], etag)
+
+        self.event.title = 'Concert (moved)'
+        self.event.save()
+        response = second.get('/client/events/available', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_private_etag_is_per_user(self):
+        client = api_client(self.promoter, 'promoter')
+        response = client.get('/promoter/list_events')
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertEqual(client.get('/promoter/list_events', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        other = api_client(self.other_promoter, 'promoter')
+        self.assertEqual(other.get('/promoter/list_events', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_fields_and_cursors_get_their_own_etag(self):
+        client = api_client(self.promoter, 'promoter')
+        etag = client.get(f'/promoter/event_detail/{self.event.pk}/')['ETag']
+        response = client.get(f'/promoter/event_detail/{self.event.pk}/?fields=id,title', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        # a missing event skips the check and 404s as usual
+        response = client.get('/promoter/event_detail/0/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(MOBILE_MONEY={**settings.MOBILE_MONEY, 'USE_STUB': True})
+class PaymentCallbackTests(TestCase):
+    """Signed provider callbacks approve a purchase once and queue its tickets"""
+    URL = '/client/payments/mtn/callback'
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        event = Event.objects.create(
+            promoter=promoter, title='Concert', description='Live', location='Kampala', venue='Hall',
+            start_date=now + datetime.timedelta(days=7), end_date=now + datetime.timedelta(days=7, hours=5),
+            status='published', max_capacity=500,
+        )
+        cls.ticket_type = TicketType.objects.create(
+            event=event, name='Regular', price=50000, quantity=500, remaining=500,
+            sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now + datetime.timedelta(days=6),
+        )
+        cls.purchase = Purchase.objects.create(
+            ticket_type=cls.ticket_type, quantity=1, total_amount=50000, payment_method='mtn',
+            transaction_reference='MTN-0001', purchaser_email='buyer@example.com', purchaser_phone='0772000000',
+        )
+        # never initiated, so it has no reference a callback could name
+        cls.uninitiated = Purchase.objects.create(
+            ticket_type=cls.ticket_type, quantity=1, total_amount=50000, payment_method='mtn',
+            purchaser_email='other@example.com', purchaser_phone='0772000001',
+        )
+
+    def post_callback(self, body, headers):
+        with self.captureOnCommitCallbacks() as queued:
+            response = self.client.post(self.URL, body, content_type='application/json', headers=headers)
+        return response, queued
+
+    def callback(self, reference='MTN-0001', status='completed', amount=50000):
+        return payments.get_provider('mtn').build_callback(reference, status, amount)
+
+    def test_valid_callback_approves_and_queues_tickets(self):
+        response, queued = self.post_callback(*self.callback())
+        self.assertEqual(response.status_code, 200)
+        self.purchase.refresh_from_db()
+        self.assertTrue(self.purchase.is_approved_by_promoter)
+        self.assertEqual(self.purchase.payment_status, 'completed')
+        self.assertEqual(len(queued), 1)
+
+    def test_replayed_callback_counts_once(self):
+        self.post_callback(*self.callback())
+        approved_at = Purchase.objects.get(pk=self.purchase.pk).approval_date
+        response, _ = self.post_callback(*self.callback())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Purchase.objects.get(pk=self.purchase.pk).approval_date, approved_at)
+        self.assertEqual(EventStats.objects.get(pk=self.ticket_type.event_id).revenue, 50000)
+
+    def test_bad_signature_is_rejected(self):
+        body, headers = self.callback()
+        response, queued = self.post_callback(body, {payments.SIGNATURE_HEADER: 'f' * 64})
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Purchase.objects.get(pk=self.purchase.pk).is_approved_by_promoter)
+        self.assertEqual(queued, [])
+
+    def test_missing_reference_is_rejected(self):
+        for reference in (None, ''):
+            response, queued = self.post_callback(*self.callback(reference=reference))
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(queued, [])
+        self.assertFalse(Purchase.objects.get(pk=self.uninitiated.pk).is_approved_by_promoter)
+
+
+@override_settings(MEDIA_ROOT=tempfile.gettempdir())
+class TicketIssuanceRecoveryTests(TestCase):
+    """Approved purchases left without tickets are claimed once and issued by recover_issues()"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        event = Event.objects.create(
+            promoter=promoter, title='Concert', description='Live', location='Kampala', venue='Hall',
+            start_date=now + datetime.timedelta(days=7), end_date=now + datetime.timedelta(days=7, hours=5),
+            status='published', max_capacity=500,
+        )
+        ticket_type = TicketType.objects.create(
+            event=event, name='Regular', price=50000, quantity=500, remaining=500,
+            sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now + datetime.timedelta(days=6),
+        )
+        cls.purchase = create_purchases(ticket_type, promoter, 1, attendees=0)[0]
+        cls.attendee = Attendee.objects.create(first_name='Guest', last_name='One', email='g@example.com', phone='0')
+        PurchaseAttendee.objects.create(purchase=cls.purchase, attendee=cls.attendee)
+        tickets.approve_purchase(cls.purchase.pk)
+
+    def test_claim_is_exclusive_until_stale(self):
+        self.assertIsNotNone(tickets.claim_issue(self.purchase.pk))
+        self.assertIsNone(tickets.claim_issue(self.purchase.pk))
+        self.assertFalse(tickets.pending_issues().exists())
+
+        Purchase.objects.filter(pk=self.purchase.pk).update(
+            tickets_issue_started_at=timezone.now() - tickets.ISSUE_STALE_AFTER - datetime.timedelta(minutes=1)
+        )
+        self.assertTrue(tickets.pending_issues().exists())
+        self.assertIsNotNone(tickets.claim_issue(self.purchase.pk))
+
+    @mock.patch('promoter.tickets.send_payment_approval_email')
+    @mock.patch('promoter.tickets.get_storage')
+    def test_recover_issues_owed_tickets_once(self, get_storage, send_email):
+        get_storage.return_value.upload_bytes.return_value = 'https://storage.example.com/ticket.pdf'
+        self.assertEqual(tickets.recover_issues(), 1)
+        self.assertEqual(tickets.recover_issues(), 0)
+        self.assertEqual(TicketPDF.objects.filter(purchase=self.purchase).count(), 1)
+        self.assertIsNotNone(Purchase.objects.get(pk=self.purchase.pk).tickets_issued_at)
+        send_email.assert_called_once()
+
+    @mock.patch('promoter.tickets.get_storage')
+    def test_failed_issue_is_released(self, get_storage):
+        get_storage.return_value.upload_bytes.side_effect = OSError('storage down')
+        with self.assertLogs('promoter.tickets', 'ERROR'):
+            self.assertEqual(tickets.recover_issues(), 0)
+        purchase = Purchase.objects.get(pk=self.purchase.pk)
+        self.assertIsNone(purchase.tickets_issue_started_at)
+        self.assertFalse(purchase.ticket_pdfs.exists())
+
+
+@override_settings(WAITING_ROOM={**settings.WAITING_ROOM, 'ENABLED': True, 'ADMIT_RATE': 1})
+class WaitingRoomTests(TestCase):
+    """Gated events queue buyers; passes are checked and spent before any purchase work"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        cls.buyer = Users.objects.create(email='buyer@example.com', firstname='Buy', lastname='Er')
+        cls.ticket_types = {}
+        for title, gated in (('Stadium', True), ('Open mic', False)):
+            event = Event.objects.create(
+                promoter=cls.promoter, title=title, description='Live', location='Kampala', venue='Hall',
+                start_date=now + datetime.timedelta(days=7), end_date=now + datetime.timedelta(days=7, hours=5),
+                status='published', max_capacity=500, waiting_room=gated,
+            )
+            cls.ticket_types[gated] = TicketType.objects.create(
+                event=event, name='Regular', price=50000, quantity=500, remaining=500,
+                sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now + datetime.timedelta(days=6),
+            )
+        cls.gated = cls.ticket_types[True]
+        cls.open = cls.ticket_types[False]
+
+    def setUp(self):
+        cache.clear()
+        self.client = api_client(self.buyer)
+
+    def admission_pass(self, event_id):
+        queue_token = self.client.post(f'/client/events/{event_id}/queue').json()['queue_token']
+        return self.client.get(f'/client/events/{event_id}/queue', {'token': queue_token}).json()['admission_pass']
+
+    def purchase(self, ticket_type, **headers):
+        return self.client.post('/client/purchase/create', {
+            'ticket_type': ticket_type.pk, 'quantity': 1, 'total_amount': ticket_type.price,
+            'payment_method': 'mtn', 'purchaser_email': self.buyer.email, 'purchaser_phone': '0700000000',
+        }, format='json', **headers)
+
+    @mock.patch('client.waiting_room.time.time', return_value=1_000_000)
+    def test_pass_is_issued_in_queue_order(self, _):
+        event_id = self.gated.event_id
+        tokens = [self.client.post(f'/client/events/{event_id}/queue').json()['queue_token'] for _ in range(2)]
+
+        first = self.client.get(f'/client/events/{event_id}/queue', {'token': tokens[0]}).json()
+        second = self.client.get(f'/client/events/{event_id}/queue', {'token': tokens[1]}).json()
+
+        self.assertTrue(first['admitted'])
+        self.assertEqual(waiting_room.verify_pass(first['admission_pass'])['event_id'], event_id)
+        self.assertEqual((second['admitted'], second['ahead']), (False, 1))
+        self.assertNotIn('admission_pass', second)
+
+    def test_ungated_event_has_no_queue(self):
+        response = self.client.post(f'/client/events/{self.open.event_id}/queue')
+        self.assertEqual(response.status_code, 404)
+
+    def test_pass_expires(self):
+        admission_pass = self.admission_pass(self.gated.event_id)
+        later = time.time() + settings.WAITING_ROOM['ADMISSION_MAX_AGE'] + 1
+        with mock.patch('django.core.signing.time.time', return_value=later):
+            with self.assertRaises(signing.SignatureExpired):
+                waiting_room.verify_pass(admission_pass)
+            response = self.purchase(self.gated, HTTP_X_QUEUE_PASS=admission_pass)
+        self.assertEqual(response.status_code, 403)
+
+    def test_pass_is_single_use(self):
+        admission_pass = self.admission_pass(self.gated.event_id)
+
+        self.assertEqual(self.purchase(self.gated, HTTP_X_QUEUE_PASS=admission_pass).status_code, 201)
+        response = self.purchase(self.gated, HTTP_X_QUEUE_PASS=admission_pass)
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['error'], 'Admission pass has already been used')
+        self.assertEqual(Purchase.objects.filter(ticket_type=self.gated).count(), 1)
+
+    def test_gated_purchase_is_rejected_before_any_purchase_work(self):
+        self.assertEqual(self.purchase(self.gated).status_code, 429)
+        # the gate is cached now: only the two user lookups remain
+        with self.assertNumQueries(2):
+            response = self.purchase(self.gated)
+        self.assertEqual(response.status_code, 429)
+
+        other_event_pass = signing.dumps({'event_id': self.open.event_id, 'position': 1}, salt=waiting_room.PASS_SALT)
+        response = self.purchase(self.gated, HTTP_X_QUEUE_PASS=other_event_pass)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Purchase.objects.exists())
+
+    def test_ungated_event_sells_without_a_pass(self):
+        self.assertEqual(self.purchase(self.open).status_code, 201)
+
+    def test_gated_ticket_listing_needs_a_pass(self):
+        url = f'/client/events/{self.gated.event_id}/tickets'
+        self.assertEqual(self.client.get(url).status_code, 429)
+
+        response = self.client.get(url, HTTP_X_QUEUE_PASS=self.admission_pass(self.gated.event_id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(f'/client/events/{self.open.event_id}/tickets').status_code, 200)
+
+    def test_saving_the_event_updates_the_cached_gate(self):
+        event = self.open.event
+        self.assertFalse(waiting_room.is_gated(event.pk))
+
+        event.waiting_room = True
+        event.save()
+
+        self.assertTrue(waiting_room.is_gated(event.pk))
@@ -5,8 +5,13 @@ urlpatterns = [
     path('events/<int:event_id>/promoter-contacts', views.GetPromoterContactsView.as_view(), name='promoter_contacts'),
     path('purchase/<int:purchase_id>/submit-payment', views.SubmitPaymentProofView.as_view(), name='submit_payment'),
     path('purchase/<int:purchase_id>', views.PurchaseDetailView.as_view(), name='purchase_detail'),
+    path('wallet', views.WalletView.as_view(), name='wallet'),
     path('events/available', views.AvailableEventsView.as_view(), name='available_events'),
+    path('events/search', views.SearchAvailableEventsView.as_view(), name='search_events'),
+    path('events/facets', views.CatalogFacetsView.as_view(), name='catalog_facets'),
     path('events/<int:event_id>/tickets', views.EventTicketsView.as_view(), name='event_tickets'),
+    path('events/<int:event_id>/queue', views.WaitingRoomView.as_view(), name='waiting_room'),
     path('purchase/create', views.CreatePurchaseView.as_view(), name='create_purchase'),
     path('purchase/<int:purchase_id>/payment', views.InitiatePaymentView.as_view(), name='initiate_payment'),
+    path('payments/<str:provider>/callback', views.PaymentCallbackView.as_view(), name='payment_callback'),
 ]
@@ -1,42 +1,118 @@
 
-from datetime import datetime
 from io import BytesIO
 from django.core.files.base import ContentFile
 from django.utils import timezone
-from .serializers import PurchaseSerializer
-from .models import Purchase
+from django.conf import settings
+from django.core import signing
+from .serializers import PurchaseSerializer, WalletPurchaseSerializer
+from . import waiting_room, payments
+from .models import Purchase, TicketPDF
 from rest_framework.response import Response
-from promoter.models import Event, TicketType
-from promoter.serializers import EventSerializer, TicketTypeSerializer
+from promoter.models import Event, EventFacet, TicketType
+from promoter.serializers import EventListSerializer, TicketTypeSerializer
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-import uuid
 import qrcode
-from ezevent.firebase_config import bucket
+from ezevent.storage import save_deduplicated
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from django.core.files.storage import default_storage
 from django.http import HttpResponse
 import qrcode
-import os
+import json
+import logging
+from django.db.models import Prefetch
+from promoter.tickets import approve_purchase, issue_tickets_for
+from promoter.search import search
+from promoter.facets import catalog_facets
+from ezevent.tasks import run_in_background
+from ezevent.sparse import SparseFieldsViewMixin
+from ezevent.conditional import ConditionalGetMixin, event_state, ticket_type_state, wallet_state
+from ezevent.response_cache import CATALOG, CachedResponseMixin, event_scope
 
-class AvailableEventsView(generics.ListAPIView):
+logger = logging.getLogger(__name__)
+
+class AvailableEventsView(CachedResponseMixin, ConditionalGetMixin, SparseFieldsViewMixin, generics.ListAPIView):
     """List all published events available for ticket purchase"""
-    serializer_class = EventSerializer
-    
-    def get_queryset(self):
-        return Event.objects.filter(
+    serializer_class = EventListSerializer
+    keyset_ordering = ('start_date', 'id')
+    # Sale windows open and close without a write, so entries are kept briefly
+    cache_timeout = 60
+
+    def get_cache_scopes(self):
+        return [CATALOG]
+
+    def get_events(self):
+        events = Event.objects.filter(
             status='published', 
             end_date__gt=timezone.now()
-        ).order_by('start_date')
+        )
+        # Filter options come from the facets endpoint
+        for dimension in EventFacet.DIMENSIONS:
+            value = self.request.query_params.get(dimension)
+            if value:
+                events = events.filter(**{dimension: value})
+        return events
 
-class EventTicketsView(generics.ListAPIView):
-    """List all available ticket types for a specific event"""
-    serializer_class = TicketTypeSerializer
+    def get_on_sale_ticket_types(self):
+        now = timezone.now()
+        return TicketType.objects.filter(
+            is_active=True,
+            remaining__gt=0,
+            sale_start_date__lte=now,
+            sale_end_date__gte=now
+        )
+
+    def get_validator_state(self):
+        events = self.get_events()
+        state = event_state(events)
+        # Sale windows open and close without a write, so the on-sale set is part of the state
+        tickets = ticket_type_state(self.get_on_sale_ticket_types().filter(event__in=events))
+        return {**state, **tickets}, state['last_modified']
     
+    def get_prefetch_related_fields(self):
+        on_sale = self.get_on_sale_ticket_types().order_by('price')
+        return {'ticket_types': Prefetch('ticket_types', queryset=on_sale)}
+
     def get_queryset(self):
+        return self.sparse_queryset(self.get_events())
+
+class CatalogFacetsView(CachedResponseMixin, generics.RetrieveAPIView):
+    """Category, venue and location counts for browsing the catalog"""
+
+    def get_cache_scopes(self):
+        return [CATALOG]
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(catalog_facets())
+
+class SearchAvailableEventsView(AvailableEventsView):
+    """Full-text search over the catalog, best matches first"""
+    keyset_ordering = ('-rank', 'id')
+
+    def get_events(self):
+        return search(super().get_events(), self.request.query_params.get('q'))
+
+class EventTicketsView(CachedResponseMixin, ConditionalGetMixin, SparseFieldsViewMixin, generics.ListAPIView):
+    """List all available ticket types for a specific event"""
+    serializer_class = TicketTypeSerializer
+    keyset_ordering = 'id'
+    cache_timeout = 60
+
+    def get_cache_scopes(self):
+        return [event_scope(self.kwargs.get('event_id'))]
+
+    def get(self, request, *args, **kwargs):
+        event_id = self.kwargs['event_id']
+        if waiting_room.is_gated(event_id):
+            error_response = admission_error(request.headers.get('X-Queue-Pass'), event_id)
+            if error_response:
+                return error_response
+        return super().get(request, *args, **kwargs)
+
+    def get_ticket_types(self):
         event_id = self.kwargs.get('event_id')
         return TicketType.objects.filter(
             event_id=event_id, 
@@ -46,34 +122,95 @@ class EventTicketsView(generics.ListAPIView):
             sale_end_date__gte=timezone.now()
         )
 
+    def get_validator_state(self):
+        return ticket_type_state(self.get_ticket_types()), None
+    
+    def get_queryset(self):
+        return self.sparse_queryset(self.get_ticket_types())
+
+class WaitingRoomView(APIView):
+    """Join the waiting room for an event's on-sale and poll queue position"""
+
+    def post(self, request, event_id):
+        if not waiting_room.is_gated(event_id):
+            return Response(
+                {'error': 'This event has no waiting room'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        queue_token, position = waiting_room.join_queue(event_id)
+        return Response({
+            'queue_token': queue_token,
+            'position': position,
+        }, status=status.HTTP_201_CREATED)
+
+    def get(self, request, event_id):
+        queue_token = request.query_params.get('token')
+        if not queue_token:
+            return Response(
+                {'error': 'Queue token is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            result = waiting_room.check_position(event_id, queue_token)
+        except signing.SignatureExpired:
+            return Response(
+                {'error': 'Queue token has expired, please rejoin the queue'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        except signing.BadSignature:
+            return Response(
+                {'error': 'Invalid queue token'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        return Response(result)
+
+def admission_error(admission_pass, event_id, consume=False):
+    """Error response unless admission_pass admits to event_id (spending it if consume)"""
+    if not admission_pass:
+        return Response(
+            {'error': 'This sale is queued, please join the waiting room first'},
+            status=status.HTTP_429_TOO_MANY_REQUESTS
+        )
+    try:
+        admission = waiting_room.verify_pass(admission_pass)
+    except signing.BadSignature:
+        return Response(
+            {'error': 'Invalid or expired admission pass'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    if admission['event_id'] != event_id:
+        return Response(
+            {'error': 'Admission pass is not valid for this event'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    if consume and not waiting_room.consume_pass(admission):
+        return Response(
+            {'error': 'Admission pass has already been used'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    return None
+
 class CreatePurchaseView(generics.CreateAPIView):
     """Create a new ticket purchase"""
     serializer_class = PurchaseSerializer
-    
+
     def create(self, request, *args, **kwargs):
+        event_id = waiting_room.gated_event(request.data.get('ticket_type'))
+        if event_id:
+            admission_pass = request.headers.get('X-Queue-Pass') or request.data.get('queue_pass')
+            error_response = admission_error(admission_pass, event_id, consume=True)
+            if error_response:
+                return error_response
+
         payment_screenshot = request.FILES.get('payment_screenshot')
         
         data = request.data.copy()
         
         if payment_screenshot:
             try:
-                file_content = payment_screenshot.read()
-                file_name = payment_screenshot.name
-                file_ext = os.path.splitext(file_name)[1]
-
-                timestamp = int(datetime.now().timestamp() * 1000)
-                unique_filename = f"{timestamp}_{uuid.uuid4().hex}{file_ext}"
-
-                firebase_path = f"payment_screenshots/{unique_filename}"
-                blob = bucket.blob(firebase_path)
-                
-                blob.upload_from_string(
-                    file_content,
-                    content_type=payment_screenshot.content_type
-                )
-                
-                blob.make_public()
-                screenshot_url = blob.public_url
+                screenshot_url = save_deduplicated(payment_screenshot, 'payment_screenshots')
                 
                 data['payment_screenshot'] = screenshot_url
                 
@@ -88,7 +225,7 @@ class CreatePurchaseView(generics.CreateAPIView):
         
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        
+
         if request.user.is_authenticated:
             self.perform_create(serializer)
         else:
@@ -117,33 +254,28 @@ class InitiatePaymentView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Here you would integrate with MTN/Airtel payment API
-            # For now, we'll simulate payment initiation
-            
-            # Example implementation:
-            if payment_method == 'mtn':
-                # Simulate MTN payment initialization
-                transaction_ref = f"MTN-{uuid.uuid4().hex[:8].upper()}"
-                purchase.payment_method = 'mtn'
-            elif payment_method == 'airtel':
-                # Simulate Airtel payment initialization
-                transaction_ref = f"AIR-{uuid.uuid4().hex[:8].upper()}"
-                purchase.payment_method = 'airtel'
-            else:
+            provider = payments.get_provider(payment_method)
+            if provider is None:
                 return Response(
                     {'error': 'Invalid payment method'}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
+
+            try:
+                payment = provider.initiate(purchase)
+            except payments.PaymentError as e:
+                return Response({'error': str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+            transaction_ref = payment['transaction_reference']
+
+            purchase.payment_method = payment_method
             purchase.transaction_reference = transaction_ref
-            purchase.save()
+            purchase.save(update_fields=['payment_method', 'transaction_reference'])
             
-            # In a real implementation, you would return payment URLs or details
             return Response({
                 'transaction_reference': transaction_ref,
                 'payment_method': payment_method,
                 'amount': purchase.total_amount,
-                'payment_url': f"https://yourdomain.com/payment/confirm/{transaction_ref}/"
+                'payment_url': payment['payment_url']
             })
             
         except Purchase.DoesNotExist:
@@ -152,39 +284,106 @@ class InitiatePaymentView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         
+class PaymentCallbackView(APIView):
+    """Provider callback that settles a mobile-money payment and issues tickets"""
+    permission_classes = []
+    authentication_classes = []
+
+    def post(self, request, provider):
+        payment_provider = payments.get_provider(provider)
+        if payment_provider is None:
+            return Response({'error': 'Unknown payment provider'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Verifying the signature over the exact bytes the provider sent
+        body = request.body
+        if not payment_provider.verify_signature(body, request.headers.get(payments.SIGNATURE_HEADER)):
+            return Response({'error': 'Invalid callback signature'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            payload = json.loads(body)
+            if not isinstance(payload, dict):
+                raise payments.CallbackError('Expected a JSON object')
+            result = payment_provider.parse_callback(payload)
+        except (ValueError, payments.CallbackError) as e:
+            return Response({'error': f'Invalid callback: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        purchase = Purchase.objects.filter(
+            transaction_reference=result['transaction_reference'],
+            payment_method=provider
+        ).only('id', 'total_amount', 'is_approved_by_promoter', 'tickets_issued_at').first()
+        if purchase is None:
+            return Response({'error': 'Unknown transaction reference'}, status=status.HTTP_404_NOT_FOUND)
+
+        if result['status'] == 'failed':
+            Purchase.objects.filter(pk=purchase.pk, is_approved_by_promoter=False).update(payment_status='failed')
+            return Response({'status': 'recorded'})
+
+        if result['amount'] != purchase.total_amount:
+            logger.warning(
+                f"Amount mismatch on {result['transaction_reference']}: "
+                f"paid {result['amount']}, expected {purchase.total_amount}"
+            )
+            return Response({'error': 'Amount does not match the purchase'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Approval and issuance are both idempotent: a retried callback re-queues issuance only
+        # while the tickets are still missing, and issue_tickets() lets just one run through
+        approve_purchase(purchase.pk)
+        if purchase.tickets_issued_at is None:
+            run_in_background(issue_tickets_for, purchase.pk, payment_provider.display_name)
+
+        return Response({'status': 'recorded'})
+
 class SubmitPaymentProofView(generics.UpdateAPIView):
     """Client submits proof of payment"""
     serializer_class = PurchaseSerializer
     lookup_url_kwarg = 'purchase_id'
     
     def get_queryset(self):
-        return Purchase.objects.all()
+        # Only the buyer's own purchases, and only while the promoter has not approved them
+        return Purchase.objects.owned_by(self.request.user).filter(is_approved_by_promoter=False).only('id')
     
     def update(self, request, *args, **kwargs):
         purchase = self.get_object()
+        payment_screenshot = request.FILES.get('payment_screenshot')
         
-        # Handle payment screenshot upload
-        if 'payment_screenshot' in request.FILES:
-            purchase.payment_screenshot = request.FILES['payment_screenshot']
-            purchase.save()
-            return Response({
-                'status': 'Payment proof submitted',
-                'message': 'Your payment is awaiting approval by the event promoter'
-            })
-        else:
+        if not payment_screenshot:
             return Response({
                 'error': 'Payment screenshot is required'
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        if payment_screenshot.content_type not in settings.UPLOAD_SESSIONS['CONTENT_TYPES']:
+            return Response({
+                'error': 'Payment screenshot must be an image'
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-class GetPromoterContactsView(generics.RetrieveAPIView):
+        try:
+            screenshot_url = save_deduplicated(payment_screenshot, 'payment_screenshots')
+        except Exception as e:
+            return Response(
+                {"error": f"Failed to upload payment screenshot: {str(e)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        Purchase.objects.filter(pk=purchase.pk).update(payment_screenshot=screenshot_url)
+
+        return Response({
+            'status': 'Payment proof submitted',
+            'message': 'Your payment is awaiting approval by the event promoter',
+            'payment_screenshot': screenshot_url
+        })
+
+
+class GetPromoterContactsView(CachedResponseMixin, generics.RetrieveAPIView):
     """Get promoter contact details for a specific event"""
+
+    def get_cache_scopes(self):
+        return [event_scope(self.kwargs.get('event_id'))]
     
     def retrieve(self, request, *args, **kwargs):
         event_id = kwargs.get('event_id')
         
         try:
-            event = Event.objects.get(id=event_id, status='published')
+            event = Event.objects.select_related('promoter').get(id=event_id, status='published')
             promoter = event.promoter
             
             # Returning only necessary contact information
@@ -199,17 +398,36 @@ class GetPromoterContactsView(generics.RetrieveAPIView):
                 'error': 'Event not found'
             }, status=status.HTTP_404_NOT_FOUND)
 
-class PurchaseDetailView(generics.RetrieveAPIView):
+class PurchaseDetailView(SparseFieldsViewMixin, generics.RetrieveAPIView):
     """Getting purchase details including QR code if approved"""
     serializer_class = PurchaseSerializer
     lookup_url_kwarg = 'purchase_id'
     
     def get_queryset(self):
         if self.request.user.is_authenticated:
-            return Purchase.objects.filter(user=self.request.user)
+            return self.sparse_queryset(Purchase.objects.filter(user=self.request.user))
         else:
             email = self.request.query_params.get('email')
             if email:
-                return Purchase.objects.filter(purchaser_email=email)
+                return self.sparse_queryset(Purchase.objects.filter(purchaser_email=email))
             return Purchase.objects.none()
-        
+
+class WalletView(ConditionalGetMixin, generics.ListAPIView):
+    """All of a client's purchases with attendees and tickets, in a fixed number of queries"""
+    serializer_class = WalletPurchaseSerializer
+    # Tickets are bearer credentials, so the wallet is only ever shown to its signed-in owner
+    permission_classes = [IsAuthenticated]
+    # The wallet is fetched whole so apps can keep it offline; it is bounded per client
+    pagination_class = None
+
+    def get_purchases(self):
+        return Purchase.objects.owned_by(self.request.user)
+
+    def get_validator_state(self):
+        # Wallets change rarely; two aggregates answer If-None-Match before anything is loaded
+        purchases = self.get_purchases()
+        tickets = TicketPDF.objects.filter(purchase__in=purchases.values('id'))
+        return wallet_state(purchases, tickets), None
+
+    def get_queryset(self):
+        return self.get_purchases().with_details().prefetch_related('ticket_pdfs').order_by('-purchase_date')
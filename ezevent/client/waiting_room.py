@@ -0,0 +1,138 @@
+"""Virtual waiting room for high-demand on-sales.
+
+Buyers join a per-event queue and get a signed token carrying their position.
+The queue head advances by at most WAITING_ROOM['ADMIT_RATE'] positions per
+second. Once a buyer's position is reached, the queue token is exchanged for
+a short-lived admission pass, which CreatePurchaseView verifies and spends
+before it touches the database or storage. All queue state lives in the cache,
+so rejecting excess load costs only a signature check.
+
+Only events with Event.waiting_room set are queued, and only while
+WAITING_ROOM['ENABLED'] is on. Whether an event (or a ticket type's event) is
+gated is cached too, and forgotten when the event is saved.
+"""
+import time
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from promoter.models import Event, TicketType
+
+QUEUE_SALT = 'client.waiting_room.queue'
+PASS_SALT = 'client.waiting_room.pass'
+KEY_TTL = 60 * 60 * 24
+GATE_TTL = 60
+
+
+def _key(event_id, name):
+    return f'waiting_room:{event_id}:{name}'
+
+
+def _incr(key, delta=1):
+    cache.add(key, 0, KEY_TTL)
+    return cache.incr(key, delta)
+
+
+def is_gated(event_id):
+    """Whether buyers for this event must come through the waiting room"""
+    if not settings.WAITING_ROOM['ENABLED']:
+        return False
+    return cache.get_or_set(
+        _key(event_id, 'gated'),
+        lambda: Event.objects.filter(pk=event_id, waiting_room=True).exists(),
+        GATE_TTL
+    )
+
+
+def gated_event(ticket_type_id):
+    """The event id if this ticket type's event is gated, else None"""
+    if not settings.WAITING_ROOM['ENABLED']:
+        return None
+    try:
+        ticket_type_id = int(ticket_type_id)
+    except (TypeError, ValueError):
+        return None
+    event_id = cache.get_or_set(
+        f'waiting_room:ticket_type:{ticket_type_id}',
+        lambda: TicketType.objects.filter(pk=ticket_type_id).values_list('event_id', flat=True).first(),
+        KEY_TTL
+    )
+    if event_id is None or not is_gated(event_id):
+        return None
+    return event_id
+
+
+def forget_gate(event_id):
+    cache.delete(_key(event_id, 'gated'))
+
+
+def join_queue(event_id):
+    """Taking the next position in the event queue and signing it"""
+    position = _incr(_key(event_id, 'tail'))
+    token = signing.dumps({'event_id': event_id, 'position': position}, salt=QUEUE_SALT)
+    return token, position
+
+
+def admitted_up_to(event_id):
+    """Returning the last admitted position, advancing the head if a second has passed.
+
+    Only the first caller in any given second wins the tick and moves the
+    head, so concurrent pollers never admit more than the configured rate.
+    The head never runs ahead of the tail, so quiet periods do not bank
+    admissions for the next rush.
+    """
+    now = int(time.time())
+    head_key = _key(event_id, 'head')
+    head = cache.get(head_key, 0)
+
+    if cache.add(_key(event_id, f'tick:{now}'), 1, 5):
+        last_tick = cache.get(_key(event_id, 'last_tick'), now - 1)
+        cache.set(_key(event_id, 'last_tick'), now, KEY_TTL)
+
+        tail = cache.get(_key(event_id, 'tail'), 0)
+        elapsed = max(now - last_tick, 1)
+        step = min(settings.WAITING_ROOM['ADMIT_RATE'] * elapsed, tail - head)
+        if step > 0:
+            head = _incr(head_key, step)
+
+    return head
+
+
+def check_position(event_id, queue_token):
+    """Reporting queue status for a token, issuing an admission pass once admitted.
+
+    Raises signing.BadSignature (or SignatureExpired) for tampered, foreign
+    or stale tokens.
+    """
+    data = signing.loads(
+        queue_token,
+        salt=QUEUE_SALT,
+        max_age=settings.WAITING_ROOM['QUEUE_TOKEN_MAX_AGE']
+    )
+    if data['event_id'] != event_id:
+        raise signing.BadSignature('Queue token belongs to another event')
+
+    head = admitted_up_to(event_id)
+    ahead = max(data['position'] - head, 0)
+    result = {
+        'position': data['position'],
+        'ahead': ahead,
+        'admitted': ahead == 0,
+    }
+    if result['admitted']:
+        result['admission_pass'] = signing.dumps(data, salt=PASS_SALT)
+    return result
+
+
+def verify_pass(admission_pass):
+    """Returning the pass payload, or raising signing.BadSignature"""
+    return signing.loads(
+        admission_pass,
+        salt=PASS_SALT,
+        max_age=settings.WAITING_ROOM['ADMISSION_MAX_AGE']
+    )
+
+
+def consume_pass(data):
+    """Marking a pass as used; returns False if it was already spent"""
+    key = _key(data['event_id'], f"used:{data['position']}")
+    return cache.add(key, 1, settings.WAITING_ROOM['ADMISSION_MAX_AGE'])
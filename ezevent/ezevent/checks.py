@@ -0,0 +1,36 @@
+"""Helpers for system checks on settings that need a cache shared by every worker.
+
+LocMemCache (the default) keeps a separate cache in each process, so
+counters and markers stored there are invisible to the other workers.
+Features that coordinate through the cache register a check against
+uses_shared_cache() or uses_atomic_cache() in their app's checks module.
+"""
+from django.conf import settings
+
+# Backends whose add() and incr() are atomic across processes and hosts
+ATOMIC_CACHE_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django_redis.cache.RedisCache',
+)
+
+# Backends every worker reads and writes, though incr() may race: the file
+# cache is shared by the workers of one host, the database cache by all hosts
+SHARED_CACHE_BACKENDS = ATOMIC_CACHE_BACKENDS + (
+    'django.core.cache.backends.filebased.FileBasedCache',
+    'django.core.cache.backends.db.DatabaseCache',
+)
+
+SHARED_CACHE_HINT = (
+    'Set CACHE_BACKEND to django.core.cache.backends.redis.RedisCache (or a Memcached backend) '
+    'and CACHE_LOCATION to its URL, e.g. redis://localhost:6379/0.'
+)
+
+
+def uses_shared_cache(alias='default'):
+    return settings.CACHES[alias]['BACKEND'] in SHARED_CACHE_BACKENDS
+
+
+def uses_atomic_cache(alias='default'):
+    return settings.CACHES[alias]['BACKEND'] in ATOMIC_CACHE_BACKENDS
@@ -0,0 +1,37 @@
+"""Migration operations shared by the apps.
+
+AddIndexConcurrently builds the index with CREATE INDEX CONCURRENTLY on
+Postgres, so large tables keep taking writes while it runs, and falls back to
+a plain AddIndex everywhere else. Postgres refuses to do that inside a
+transaction, so migrations using it must set atomic = False. Other backends
+have no operator classes, so the fallback builds the index without them.
+"""
+from django.contrib.postgres.indexes import OpClass
+from django.contrib.postgres.operations import AddIndexConcurrently as PostgresAddIndexConcurrently
+from django.db.migrations.operations import AddIndex
+
+
+def without_opclasses(index):
+    """The same index with its OpClass() expressions unwrapped, for backends other than Postgres"""
+    path, args, kwargs = index.deconstruct()
+    expressions = [
+        expression.get_source_expressions()[0] if isinstance(expression, OpClass) else expression
+        for expression in args
+    ]
+    kwargs.pop('opclasses', None)
+    return index.__class__(*expressions, **kwargs)
+
+
+class AddIndexConcurrently(PostgresAddIndexConcurrently):
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, without_opclasses(self.index))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
@@ -0,0 +1,120 @@
+"""Image normalization for event and profile pictures.
+
+Uploaded photos are decoded, rotated upright, stripped of metadata and
+re-encoded as WebP (JPEG if Pillow lacks WebP support) in a few fixed sizes.
+The variant URLs are written to the owning row as a {size: url} dict so list
+views can load thumbnails instead of the original upload.
+
+The original upload still carries its EXIF data (GPS position included), so
+it only lives until its variants exist. The picture field is then pointed at
+the metadata-free 'full' variant and the original object is deleted. Jobs
+lost before that (see ezevent/tasks.py) are redone by the
+process_pending_images command.
+"""
+import os
+import logging
+from io import BytesIO
+from django.apps import apps
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+from ezevent.storage import get_storage
+from ezevent.tasks import run_in_background
+from ezevent.response_cache import bump_event_versions
+
+logger = logging.getLogger(__name__)
+
+# variant name -> longest edge in pixels
+VARIANT_SIZES = {
+    'thumbnail': 240,
+    'card': 720,
+    'full': 1600,
+}
+
+if features.check('webp'):
+    OUTPUT_FORMAT, OUTPUT_EXT, OUTPUT_CONTENT_TYPE = 'WEBP', 'webp', 'image/webp'
+else:
+    OUTPUT_FORMAT, OUTPUT_EXT, OUTPUT_CONTENT_TYPE = 'JPEG', 'jpg', 'image/jpeg'
+
+# (model label, picture field, variants field) for every picture that gets variants
+IMAGE_FIELDS = [
+    ('promoter.Event', 'profile_pic', 'image_variants'),
+    ('auths.Users', 'profile_pic', 'profile_pic_variants'),
+]
+
+
+def build_variants(source):
+    """Returning {variant name: encoded bytes} for an image file object"""
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        keep_alpha = OUTPUT_FORMAT == 'WEBP' and image.mode in ('RGBA', 'LA', 'P')
+        image = image.convert('RGBA' if keep_alpha else 'RGB')
+
+    variants = {}
+    for name, max_edge in VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+        buffer = BytesIO()
+        # Saving a fresh image without exif/icc arguments drops all metadata
+        resized.save(buffer, format=OUTPUT_FORMAT, quality=80, optimize=True)
+        variants[name] = buffer.getvalue()
+    return variants
+
+
+def process_image(model_label, pk, url_field, variants_field, source_url, source_path):
+    storage = get_storage()
+    with storage.open(source_path) as source:
+        encoded = build_variants(source)
+
+    stem = os.path.splitext(source_path)[0]
+    variant_urls = {
+        name: storage.upload_bytes(content, f"{stem}_{name}.{OUTPUT_EXT}", content_type=OUTPUT_CONTENT_TYPE)
+        for name, content in encoded.items()
+    }
+
+    # Skipping the write if the picture was replaced while we were working
+    model = apps.get_model(model_label)
+    values = {url_field: variant_urls['full'], variants_field: variant_urls}
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        # update() skips auto_now, and conditional GETs key off updated_at
+        values['updated_at'] = timezone.now()
+    updated = model.objects.filter(pk=pk, **{url_field: source_url}).update(**values)
+    if updated and model._meta.label == 'promoter.Event':
+        # update() sends no signals, so the cached catalog is invalidated here
+        bump_event_versions(pk)
+    # Either way nothing points at the original any more, and it still has its metadata
+    storage.delete(source_path)
+
+
+def schedule_variants(model, pk, url_field, variants_field, source_url, source_path):
+    """Queueing variant generation for a freshly stored picture"""
+    run_in_background(
+        process_image,
+        model._meta.label,
+        pk,
+        url_field,
+        variants_field,
+        source_url,
+        source_path
+    )
+
+
+def reprocess_missing_variants():
+    """Processing stored pictures that never got their variants; returns how many were done"""
+    storage = get_storage()
+    processed = 0
+    for model_label, url_field, variants_field in IMAGE_FIELDS:
+        rows = apps.get_model(model_label).objects.filter(
+            **{f'{variants_field}__isnull': True, f'{url_field}__isnull': False}
+        ).values_list('pk', url_field)
+        for pk, url in rows.iterator():
+            source_path = storage.path_for(url)
+            if source_path is None:
+                # default or external pictures have nothing of ours to process
+                continue
+            try:
+                process_image(model_label, pk, url_field, variants_field, url, source_path)
+                processed += 1
+            except Exception:
+                logger.exception(f"Processing the picture of {model_label} {pk} failed")
+    return processed
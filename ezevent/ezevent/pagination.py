@@ -0,0 +1,111 @@
+import json
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination that seeks on the ordering columns instead of using OFFSET.
+
+    Views choose the columns with a `keyset_ordering` attribute; they should be
+    non-null and end in a unique column. DRF's cursor only positions on the
+    first column and skips the rows sharing its value with OFFSET, so here the
+    cursor carries the value of every ordering column and each page starts
+    with a composite seek, a > x OR (a = x AND b > y), behind an a >= x bound
+    the index can range-scan. Rows tied on the leading column (events starting
+    at the same time, say) then page as cheaply as any others.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'keyset_ordering', None)
+        if ordering is None:
+            return super().get_ordering(request, queryset, view)
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # DRF's implementation, with seek_filter() in place of its first-column filter
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(self.seek_filter(current_position, reverse))
+
+        # Positions are unique, so offset is only non-zero for orderings that are not
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def seek_filter(self, position, reverse):
+        """Rows after position in the ordering, or before it for a reverse cursor"""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        keys = []
+        for key, value in zip(self.ordering, values):
+            # (cursor reversed) XOR (column descending)
+            lookup = 'lt' if reverse != key.startswith('-') else 'gt'
+            keys.append((key.lstrip('-'), lookup, value))
+
+        after = Q()
+        for i, (column, lookup, value) in enumerate(keys):
+            tied = {earlier: earlier_value for earlier, _, earlier_value in keys[:i]}
+            after |= Q(**tied, **{f'{column}__{lookup}': value})
+        if len(keys) == 1:
+            return after
+        column, lookup, value = keys[0]
+        return Q(**{f'{column}__{lookup}e': value}) & after
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for key in ordering:
+            column = key.lstrip('-')
+            values.append(str(instance[column] if isinstance(instance, dict) else getattr(instance, column)))
+        return json.dumps(values)
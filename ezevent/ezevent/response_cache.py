@@ -0,0 +1,114 @@
+"""Versioned response cache for public, read-mostly endpoints.
+
+Every cached response is keyed by the request path and the current version
+of each scope it depends on ('catalog', 'event:<id>'). promoter/signals.py
+bumps those versions when events or ticket types change, so stale entries are
+never read again and simply expire. A ticket type sale only bumps its event;
+the catalog is bumped when what its cards show changes or a ticket type sells
+out, and otherwise shows remaining counts up to one cache timeout old. The
+versions must be seen by every worker, so several workers want a shared
+cache (client/checks.py warns otherwise). Versions start from a nanosecond clock rather than 1, so a
+version key evicted from the cache can never come back at a number that old
+entries were stored under.
+
+On a miss, only the request that wins a short cache.add() lock rebuilds the
+entry; concurrent requests for the same key wait briefly for it to appear.
+Entries are shared by every user, so the ETag stored with them must be too:
+the mixin turns off ConditionalGetMixin's per-user tags, and views whose
+responses depend on the user must not use it.
+"""
+import time
+import hashlib
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+CATALOG = 'catalog'
+VERSION_TTL = None
+LOCK_TIMEOUT = 10
+WAIT_TIMEOUT = 5
+WAIT_INTERVAL = 0.05
+
+
+def event_scope(event_id):
+    return f'event:{event_id}'
+
+
+def _version_key(scope):
+    return f'response_cache:version:{scope}'
+
+
+def get_versions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), VERSION_TTL)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*scopes):
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), VERSION_TTL)
+
+
+def bump_event_versions(event_id, catalog=True):
+    """Invalidating everything cached for one event, and the catalog unless told otherwise"""
+    if catalog:
+        bump_versions(CATALOG, event_scope(event_id))
+    else:
+        bump_versions(event_scope(event_id))
+
+
+class CachedResponseMixin:
+    """Serving GETs from the versioned cache; views list their scopes in get_cache_scopes()"""
+    cache_timeout = 300
+    etag_per_user = False
+
+    def get_cache_scopes(self):
+        """Scopes whose versions invalidate the response; None (the default) bypasses the cache"""
+        return None
+
+    def get_cache_key(self, scopes):
+        raw = repr((self.request.get_full_path(), get_versions(scopes)))
+        return 'response_cache:' + hashlib.md5(raw.encode()).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        scopes = self.get_cache_scopes()
+        if scopes is None:
+            return super().get(request, *args, **kwargs)
+
+        key = self.get_cache_key(scopes)
+        entry = cache.get(key)
+
+        if entry is None and not cache.add(f'{key}:lock', 1, LOCK_TIMEOUT):
+            # Someone else is rebuilding this entry; give them a moment
+            deadline = time.monotonic() + WAIT_TIMEOUT
+            while entry is None and time.monotonic() < deadline:
+                time.sleep(WAIT_INTERVAL)
+                entry = cache.get(key)
+
+        if entry is None:
+            try:
+                response = super().get(request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, {'data': response.data, 'etag': response.get('ETag')}, self.cache_timeout)
+            finally:
+                cache.delete(f'{key}:lock')
+            return response
+
+        if entry['etag']:
+            not_modified = get_conditional_response(request, etag=entry['etag'])
+            if not_modified is not None:
+                not_modified['ETag'] = entry['etag']
+                return not_modified
+        response = Response(entry['data'])
+        if entry['etag']:
+            response['ETag'] = entry['etag']
+            response['Cache-Control'] = 'no-cache'
+        return response
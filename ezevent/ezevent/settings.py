@@ -4,8 +4,11 @@ from urllib.parse import urlparse
 from dotenv import load_dotenv
 import dj_database_url
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 load_dotenv()
 
+BASE_DIR = Path(__file__).resolve().parent.parent
+
 SECRET_KEY = os.getenv('SECRET_KEY')
 
 DEBUG = False
@@ -20,12 +23,15 @@ INSTALLED_APPS = [
     'admins',
     'client',
     'promoter',
+    'uploads',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    # OpClass() in index expressions (auths.Users search indexes)
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'rest_framework_simplejwt.token_blacklist',
@@ -98,6 +104,22 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+# Private files (event reports) for the 'local' backend; never served directly
+PRIVATE_MEDIA_ROOT = BASE_DIR / 'private_media'
+
+# 'firebase' or 'local' (files under MEDIA_ROOT, for offline development)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'firebase')
+
+# Direct-to-storage uploads (uploads/views.py)
+UPLOAD_SESSIONS = {
+    'EXPIRES_IN': 60 * 15,
+    'FINALIZE_MAX_AGE': 60 * 60,
+    'MAX_SIZE': 10 * 1024 * 1024,
+    'CONTENT_TYPES': ['image/jpeg', 'image/png', 'image/webp', 'image/heic'],
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -111,6 +133,7 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'x-queue-pass')
 
 # CSRF_COOKIE_SECURE = False
 CSRF_COOKIE_SECURE = True
@@ -196,6 +219,74 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated', 
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'ezevent.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'ezevent.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Listings page by cursor on an indexed key; views pick it with keyset_ordering
+    'DEFAULT_PAGINATION_CLASS': 'ezevent.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+}
+
+# LocMemCache is per process, which is fine for one worker. With several, the
+# versioned response cache wants a backend they all see (FileBasedCache on one
+# host; check --deploy warns otherwise), and the waiting room needs atomic
+# counters: CACHE_BACKEND=django.core.cache.backends.redis.RedisCache and
+# CACHE_LOCATION=redis://<host>:6379/0 (or a Memcached backend). The system
+# check in client/checks.py refuses to start an enabled waiting room without.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'ezevent'),
+    }
+}
+
+# In-process background jobs (ezevent/tasks.py); EAGER runs them inline after commit
+BACKGROUND_TASKS = {
+    'WORKERS': int(os.getenv('BACKGROUND_WORKERS', 2)),
+    'EAGER': os.getenv('BACKGROUND_TASKS_EAGER', 'False') == 'True',
+}
+
+# Waiting room for high-demand on-sales (client/waiting_room.py). ENABLED is the
+# master switch; promoters then queue individual events with Event.waiting_room.
+# Enabling it requires an atomic shared cache (see CACHES).
+WAITING_ROOM = {
+    'ENABLED': os.getenv('WAITING_ROOM_ENABLED', 'False') == 'True',
+    'ADMIT_RATE': int(os.getenv('WAITING_ROOM_ADMIT_RATE', 20)),  # buyers per second, per event
+    'QUEUE_TOKEN_MAX_AGE': 60 * 60 * 2,
+    'ADMISSION_MAX_AGE': 60 * 10,
+}
+
+# Mobile-money collections and callbacks (client/payments.py)
+MOBILE_MONEY = {
+    'USE_STUB': os.getenv('MOBILE_MONEY_STUB', 'False') == 'True',
+    'COUNTRY': 'UG',
+    'COUNTRY_CODE': '256',
+    'CURRENCY': 'UGX',
+    'PROVIDERS': {
+        'mtn': {
+            'BASE_URL': os.getenv('MTN_BASE_URL', 'https://sandbox.momodeveloper.mtn.com'),
+            'TARGET_ENVIRONMENT': os.getenv('MTN_TARGET_ENVIRONMENT', 'sandbox'),
+            'SUBSCRIPTION_KEY': os.getenv('MTN_SUBSCRIPTION_KEY'),
+            'API_USER': os.getenv('MTN_API_USER'),
+            'API_KEY': os.getenv('MTN_API_KEY'),
+            'CALLBACK_URL': os.getenv('MTN_CALLBACK_URL', 'https://yourdomain.com/client/payments/mtn/callback'),
+            'CALLBACK_SECRET': os.getenv('MTN_CALLBACK_SECRET'),
+            'PAYMENT_URL': 'https://yourdomain.com/payment/confirm/{reference}/',
+        },
+        'airtel': {
+            'BASE_URL': os.getenv('AIRTEL_BASE_URL', 'https://openapiuat.airtel.africa'),
+            'CLIENT_ID': os.getenv('AIRTEL_CLIENT_ID'),
+            'CLIENT_SECRET': os.getenv('AIRTEL_CLIENT_SECRET'),
+            'CALLBACK_SECRET': os.getenv('AIRTEL_CALLBACK_SECRET'),
+            'PAYMENT_URL': 'https://yourdomain.com/payment/confirm/{reference}/',
+        },
+    },
 }
 
 EMAIL_HOST = os.getenv('EMAIL_HOST')
@@ -0,0 +1,107 @@
+"""Sparse fieldsets: `?fields=` and `?expand=` on read endpoints.
+
+`?fields=id,title` limits a response to the named fields; `?expand=` adds
+more on top of that list (typically nested or computed fields such as
+ticket_types or attendee_details). Without either parameter responses are
+unchanged.
+
+Serializers opt in with SparseFieldsMixin and describe, in Meta, which
+related lookups their nested/computed fields need:
+
+    select_related_fields = {'event_title': 'ticket_type__event'}
+    prefetch_related_fields = {'ticket_types': 'ticket_types'}
+
+Views opt in with SparseFieldsViewMixin and pass their base queryset through
+sparse_queryset(), which applies only the lookups for fields that will be
+serialized and narrows the SELECT with only() when a field list is given.
+"""
+from django.core.exceptions import FieldDoesNotExist
+
+
+def _split(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+def requested_fields(request):
+    """The set of fields a GET asks for, or None when it wants everything"""
+    if request is None or request.method != 'GET':
+        return None
+    fields = _split(request.query_params.get('fields'))
+    if not fields:
+        return None
+    return fields | _split(request.query_params.get('expand'))
+
+
+class SparseFieldsMixin:
+    """Dropping serializer fields the request did not ask for"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = requested_fields(self.context.get('request'))
+        if wanted is not None:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+class SparseFieldsViewMixin:
+    """Loading only the columns and relations the serialized fields need"""
+
+    def get_select_related_fields(self):
+        return getattr(self.get_serializer_class().Meta, 'select_related_fields', {})
+
+    def get_prefetch_related_fields(self):
+        return getattr(self.get_serializer_class().Meta, 'prefetch_related_fields', {})
+
+    def sparse_queryset(self, queryset):
+        wanted = requested_fields(self.request)
+        select_related = self.get_select_related_fields()
+        prefetch_related = self.get_prefetch_related_fields()
+
+        for name, lookup in select_related.items():
+            if wanted is None or name in wanted:
+                queryset = queryset.select_related(lookup)
+        for name, lookup in prefetch_related.items():
+            if wanted is None or name in wanted:
+                queryset = queryset.prefetch_related(lookup)
+
+        if wanted is None:
+            return queryset
+
+        columns = self._columns_for(queryset.model, wanted, select_related)
+        if columns is None:
+            return queryset
+        return queryset.only(*columns)
+
+    def _columns_for(self, model, wanted, select_related):
+        """Model columns behind the requested fields, or None if they cannot be worked out"""
+        columns = {model._meta.pk.name}
+        # cursor pagination reads its ordering keys off every row (annotations come along anyway)
+        ordering = getattr(self, 'keyset_ordering', None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        model_fields = {field.name for field in model._meta.concrete_fields}
+        columns.update(key.lstrip('-') for key in ordering if key.lstrip('-') in model_fields)
+
+        serializer_fields = self.get_serializer().fields
+        for name in wanted:
+            field = serializer_fields.get(name)
+            if field is None or field.write_only:
+                continue
+            if name in select_related:
+                columns.add(select_related[name].split('__')[0])
+                continue
+            if field.source == '*':
+                # computed from the whole object; prefetched ones only need the pk
+                if name in self.get_prefetch_related_fields():
+                    continue
+                return None
+            root = field.source.split('.')[0]
+            try:
+                model_field = model._meta.get_field(root)
+            except FieldDoesNotExist:
+                return None
+            if model_field.concrete:
+                columns.add(root)
+            elif not model_field.is_relation:
+                return None
+        return columns
@@ -0,0 +1,255 @@
+"""Storage layer for uploaded images, payment screenshots and generated files.
+
+STORAGE_BACKEND picks the backend: 'firebase' (the production bucket) or
+'local', which keeps files under MEDIA_ROOT and serves the same signed
+upload flow through uploads.views.local_upload so it can be used offline.
+
+Files holding personal data are stored with upload_private_bytes(), which
+never makes them public, and are read through short-lived URLs from
+signed_download_url(). Locally they live under PRIVATE_MEDIA_ROOT, which is
+not served, and the signed URLs point at uploads.views.local_download.
+"""
+import os
+import time
+import uuid
+import shutil
+import hashlib
+from datetime import datetime, timedelta
+from functools import lru_cache
+from urllib.parse import unquote
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+
+LOCAL_UPLOAD_SALT = 'ezevent.storage.local_upload'
+LOCAL_DOWNLOAD_SALT = 'ezevent.storage.local_download'
+CHUNK_SIZE = 64 * 1024
+
+
+def unique_path(prefix, filename):
+    """Building a collision-free object path, keeping the original extension"""
+    file_ext = os.path.splitext(filename)[1]
+    timestamp = int(datetime.now().timestamp() * 1000)
+    return f"{prefix}/{timestamp}_{uuid.uuid4().hex}{file_ext}"
+
+
+class FirebaseStorage:
+    def __init__(self):
+        from ezevent.firebase_config import bucket
+        self.bucket = bucket
+
+    def url(self, path):
+        return self.bucket.blob(path).public_url
+
+    def path_for(self, url):
+        """The object path behind one of our public URLs, or None for foreign URLs"""
+        prefix = f"https://storage.googleapis.com/{self.bucket.name}/"
+        if url and url.startswith(prefix):
+            return unquote(url[len(prefix):])
+        return None
+
+    def upload_file(self, file_obj, path, content_type=None):
+        """Streaming a file object to the bucket and returning its public URL"""
+        blob = self.bucket.blob(path)
+        blob.upload_from_file(file_obj, rewind=True, content_type=content_type)
+        blob.make_public()
+        return blob.public_url
+
+    def upload_bytes(self, content, path, content_type=None):
+        blob = self.bucket.blob(path)
+        blob.upload_from_string(content, content_type=content_type)
+        blob.make_public()
+        return blob.public_url
+
+    def upload_private_bytes(self, content, path, content_type=None):
+        self.bucket.blob(path).upload_from_string(content, content_type=content_type)
+
+    def signed_download_url(self, path, expires_in):
+        """Signed GET URL for a private object"""
+        return self.bucket.blob(path).generate_signed_url(
+            version='v4',
+            expiration=timedelta(seconds=expires_in),
+            method='GET'
+        )
+
+    def create_upload_target(self, path, content_type, expires_in):
+        """Signed PUT URL the client uploads to directly"""
+        blob = self.bucket.blob(path)
+        url = blob.generate_signed_url(
+            version='v4',
+            expiration=timedelta(seconds=expires_in),
+            method='PUT',
+            content_type=content_type
+        )
+        return {'url': url, 'method': 'PUT', 'headers': {'Content-Type': content_type}}
+
+    def stat(self, path):
+        """Size and content type of a stored object, or None if it is missing"""
+        blob = self.bucket.get_blob(path)
+        if blob is None:
+            return None
+        return {'size': blob.size, 'content_type': blob.content_type}
+
+    def exists(self, path):
+        return self.bucket.blob(path).exists()
+
+    def publish(self, path):
+        blob = self.bucket.blob(path)
+        blob.make_public()
+        return blob.public_url
+
+    def open(self, path):
+        return self.bucket.blob(path).open('rb')
+
+    def delete(self, path):
+        blob = self.bucket.get_blob(path)
+        if blob is not None:
+            blob.delete()
+
+
+class LocalStorage:
+    def __init__(self):
+        self.root = str(settings.MEDIA_ROOT)
+        self.private_root = str(settings.PRIVATE_MEDIA_ROOT)
+
+    def _full_path(self, path, root=None):
+        root = root or self.root
+        full_path = os.path.abspath(os.path.join(root, path))
+        if not full_path.startswith(os.path.abspath(root) + os.sep):
+            raise ValueError('Path escapes the storage root')
+        return full_path
+
+    def url(self, path):
+        return f"{settings.BASE_BACKEND_URL}/{settings.MEDIA_URL.strip('/')}/{path}"
+
+    def path_for(self, url):
+        prefix = self.url('')
+        if url and url.startswith(prefix):
+            return url[len(prefix):]
+        return None
+
+    def upload_file(self, file_obj, path, content_type=None):
+        full_path = self._full_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        file_obj.seek(0)
+        with open(full_path, 'wb') as destination:
+            shutil.copyfileobj(file_obj, destination, CHUNK_SIZE)
+        return self.url(path)
+
+    def upload_bytes(self, content, path, content_type=None):
+        full_path = self._full_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as destination:
+            destination.write(content)
+        return self.url(path)
+
+    def upload_private_bytes(self, content, path, content_type=None):
+        full_path = self._full_path(path, self.private_root)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as destination:
+            destination.write(content)
+
+    def signed_download_url(self, path, expires_in):
+        token = signing.dumps({'path': path, 'expires': time.time() + expires_in}, salt=LOCAL_DOWNLOAD_SALT)
+        return settings.BASE_BACKEND_URL + reverse('local_download', args=[token])
+
+    def open_download(self, token):
+        """The private file a signed download URL points at; raises BadSignature once it has expired"""
+        data = signing.loads(token, salt=LOCAL_DOWNLOAD_SALT)
+        if time.time() > data['expires']:
+            raise signing.SignatureExpired('Download URL expired')
+        return open(self._full_path(data['path'], self.private_root), 'rb')
+
+    def create_upload_target(self, path, content_type, expires_in):
+        token = signing.dumps({'path': path, 'content_type': content_type}, salt=LOCAL_UPLOAD_SALT)
+        url = settings.BASE_BACKEND_URL + reverse('local_upload', args=[token])
+        return {'url': url, 'method': 'PUT', 'headers': {'Content-Type': content_type}}
+
+    def stat(self, path):
+        full_path = self._full_path(path)
+        if not os.path.exists(full_path):
+            return None
+        content_type = None
+        if os.path.exists(full_path + '.type'):
+            with open(full_path + '.type') as type_file:
+                content_type = type_file.read()
+        return {'size': os.path.getsize(full_path), 'content_type': content_type}
+
+    def exists(self, path):
+        return os.path.exists(self._full_path(path))
+
+    def publish(self, path):
+        return self.url(path)
+
+    def open(self, path):
+        return open(self._full_path(path), 'rb')
+
+    def delete(self, path):
+        full_path = self._full_path(path)
+        for leftover in (full_path, full_path + '.type'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    def receive_upload(self, token, stream, max_size, content_type):
+        """Writing a signed local upload in chunks; the local stand-in for a signed PUT URL.
+
+        Like a signed URL, the token only accepts the Content-Type it was
+        issued for (signing.BadSignature otherwise), and it stores at most one
+        file: the target is created exclusively, so a second PUT raises
+        FileExistsError instead of replacing a file that may already have
+        been verified and attached. Returns False if the body exceeds
+        max_size, in which case nothing is kept.
+        """
+        data = signing.loads(token, salt=LOCAL_UPLOAD_SALT, max_age=settings.UPLOAD_SESSIONS['EXPIRES_IN'])
+        if content_type != data['content_type']:
+            raise signing.BadSignature('Content-Type does not match the upload URL')
+        full_path = self._full_path(data['path'])
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+        written = 0
+        with open(full_path, 'xb') as destination:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_size:
+                    break
+                destination.write(chunk)
+
+        if written > max_size:
+            os.remove(full_path)
+            return False
+
+        with open(full_path + '.type', 'w') as type_file:
+            type_file.write(data['content_type'])
+        return True
+
+BACKENDS = {
+    'firebase': FirebaseStorage,
+    'local': LocalStorage,
+}
+
+
+@lru_cache(maxsize=None)
+def get_storage():
+    return BACKENDS[settings.STORAGE_BACKEND]()
+
+
+def save_deduplicated(uploaded_file, prefix):
+    """Storing an upload under its SHA-256 so identical files are only kept once.
+
+    The file is hashed and then copied chunk by chunk; Django keeps large
+    uploads in a temporary file, so the whole body is never held in memory.
+    """
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+
+    file_ext = os.path.splitext(uploaded_file.name)[1].lower()
+    path = f"{prefix}/{digest.hexdigest()}{file_ext}"
+
+    storage = get_storage()
+    if storage.exists(path):
+        return storage.url(path)
+    return storage.upload_file(uploaded_file, path, content_type=uploaded_file.content_type)
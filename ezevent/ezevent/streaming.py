@@ -0,0 +1,120 @@
+"""Streaming large result sets without holding them in memory.
+
+Pass rows as a generator fed from QuerySet.iterator(); each row is encoded
+as it is produced and written out in chunks of CHUNK_ROWS.
+
+XLSX does not stream: it is a zip archive, which cannot be sent before it
+is complete. stream_xlsx() writes rows into an openpyxl write-only
+workbook, which keeps them in a temporary file rather than in memory, and
+sends the saved file only then, so callers cap how many rows go into one.
+
+Spreadsheet cells starting with =, +, -, @, tab or CR are prefixed with a
+quote, so user-entered text (names, notes) can never run as a formula.
+"""
+import csv
+import tempfile
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from openpyxl import Workbook
+from ezevent.renderers import ORJSONRenderer
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+CHUNK_ROWS = 500
+
+
+def wants_ndjson(request):
+    """NDJSON when asked for with ?output=ndjson or an Accept header"""
+    return (
+        request.query_params.get('output') == 'ndjson'
+        or NDJSON_CONTENT_TYPE in request.META.get('HTTP_ACCEPT', '')
+    )
+
+
+def _chunks(pieces):
+    buffer = []
+    for piece in pieces:
+        buffer.append(piece)
+        if len(buffer) >= CHUNK_ROWS:
+            yield b''.join(buffer)
+            buffer = []
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _json_array(rows, render):
+    yield b'['
+    for index, row in enumerate(rows):
+        yield (b',' if index else b'') + render(row)
+    yield b']'
+
+
+def _ndjson(rows, render):
+    for row in rows:
+        yield render(row) + b'\n'
+
+
+def stream_json(rows, ndjson=False):
+    """A chunked JSON array (or NDJSON) response over an iterable of rows"""
+    render = ORJSONRenderer().render
+    if ndjson:
+        body, content_type = _ndjson(rows, render), NDJSON_CONTENT_TYPE
+    else:
+        body, content_type = _json_array(rows, render), 'application/json'
+    return StreamingHttpResponse(_chunks(body), content_type=content_type)
+
+
+class _Echo:
+    """A file-like object for csv.writer that hands back each line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def safe_cell(value):
+    """A cell value that spreadsheet software shows as text rather than evaluates"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _safe_row(row):
+    return [safe_cell(value) for value in row]
+
+
+def _attachment(response, filename):
+    # quoted, with an RFC 5987 filename* for names that are not plain ASCII
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+def _csv_lines(header, rows):
+    writer = csv.writer(_Echo())
+    # the byte order mark makes Excel read the file as UTF-8
+    yield '\ufeff'.encode() + writer.writerow(_safe_row(header)).encode()
+    for row in rows:
+        yield writer.writerow(_safe_row(row)).encode()
+
+
+def stream_csv(header, rows, filename):
+    """A chunked CSV download of header followed by rows (sequences of cell values)"""
+    response = StreamingHttpResponse(_chunks(_csv_lines(header, rows)), content_type='text/csv; charset=utf-8')
+    return _attachment(response, filename)
+
+
+def stream_xlsx(header, rows, filename):
+    """An XLSX download of header followed by rows, built in a write-only workbook"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(_safe_row(header))
+    for row in rows:
+        sheet.append(_safe_row(row))
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    response = FileResponse(
+        output, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    return _attachment(response, filename)
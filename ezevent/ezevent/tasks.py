@@ -0,0 +1,39 @@
+"""Running slow work off the request thread.
+
+Jobs are handed to a small in-process thread pool once the surrounding
+transaction commits, so they always see the rows the request wrote. There
+is no broker in this deployment, so a job lost to a worker restart is not
+retried here. Work that must not be lost records its progress in the
+database and has a command, run on a schedule, that finishes what was left:
+run_report_jobs for report jobs, issue_pending_tickets for ticket
+issuance and process_pending_images for picture variants.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.BACKGROUND_TASKS['WORKERS'],
+    thread_name_prefix='ezevent-task'
+)
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception(f"Background task {func.__name__} failed")
+    finally:
+        # Each pool thread holds its own DB connection
+        close_old_connections()
+
+
+def run_in_background(func, *args, **kwargs):
+    """Scheduling func(*args, **kwargs) to run after the current transaction commits"""
+    if settings.BACKGROUND_TASKS['EAGER']:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+    else:
+        transaction.on_commit(lambda: executor.submit(_run, func, args, kwargs))
@@ -15,6 +15,8 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from rest_framework_simplejwt.views import TokenObtainPairView
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from auths.views import CookieTokenRefreshView
@@ -26,4 +28,5 @@ urlpatterns = [
     # path('admins/',include('admins.urls')),
     path('promoter/',include('promoter.urls')),
     path('client/',include('client.urls')),
-]
+    path('uploads/', include('uploads.urls')),
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
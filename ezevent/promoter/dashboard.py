@@ -0,0 +1,166 @@
+"""Per-promoter daily aggregates behind the analytics dashboard.
+
+Every event contributes to the PromoterDailyStats row of its promoter and
+start day: one event, plus its ticket types' sold tickets (quantity minus
+remaining) and the revenue from them. Signal handlers in promoter/signals.py
+take a snapshot of an event or ticket type before it is saved and another
+one after it is saved or deleted, and record_change() moves the difference
+between the two. Purchases take stock with a queryset update in
+promoter.tickets.sell(), which fires no signals, so it adds the sale with
+record_sale(). A date range is then answered by summing daily rows, however
+many events the promoter has.
+"""
+import datetime
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+from .models import Event, PromoterDailyStats, TicketType
+
+FIELDS = ('events', 'tickets_sold', 'revenue')
+# what ticket_type_snapshot() reads from a ticket type values() row
+TICKET_TYPE_FIELDS = ('quantity', 'remaining', 'price', 'event__promoter_id', 'event__start_date')
+
+
+def _day(start_date):
+    return timezone.localtime(start_date).date()
+
+
+def event_snapshot(event_id):
+    """The event's contribution as it currently is in the database, or None"""
+    event = Event.objects.filter(pk=event_id).values('promoter_id', 'start_date').first()
+    if event is None:
+        return None
+    totals = TicketType.objects.filter(event_id=event_id).aggregate(
+        tickets_sold=Sum(F('quantity') - F('remaining')),
+        revenue=Sum((F('quantity') - F('remaining')) * F('price')),
+    )
+    return {
+        'key': (event['promoter_id'], _day(event['start_date'])),
+        'events': 1,
+        'tickets_sold': totals['tickets_sold'] or 0,
+        'revenue': totals['revenue'] or 0,
+    }
+
+
+def deleted_event_snapshot(event):
+    # its ticket types are deleted (and subtracted) before the event itself
+    return {'key': (event.promoter_id, _day(event.start_date)), 'events': 1, 'tickets_sold': 0, 'revenue': 0}
+
+
+def ticket_type_snapshot(values):
+    """A ticket type's contribution, from a values() dict with its event's promoter and start date"""
+    if values is None:
+        return None
+    sold = values['quantity'] - values['remaining']
+    return {
+        'key': (values['event__promoter_id'], _day(values['event__start_date'])),
+        'events': 0,
+        'tickets_sold': sold,
+        'revenue': sold * values['price'],
+    }
+
+
+def stored_ticket_type(ticket_type_id):
+    return ticket_type_snapshot(TicketType.objects.filter(pk=ticket_type_id).values(*TICKET_TYPE_FIELDS).first())
+
+
+def deleted_ticket_type_snapshot(ticket_type):
+    # runs before a cascading delete removes the event, so it can still be read
+    event = Event.objects.filter(pk=ticket_type.event_id).values('promoter_id', 'start_date').first()
+    if event is None:
+        return None
+    return ticket_type_snapshot({
+        'quantity': ticket_type.quantity,
+        'remaining': ticket_type.remaining,
+        'price': ticket_type.price,
+        'event__promoter_id': event['promoter_id'],
+        'event__start_date': event['start_date'],
+    })
+
+
+def _adjust(key, deltas):
+    promoter_id, day = key
+    rows = PromoterDailyStats.objects.filter(promoter_id=promoter_id, day=day)
+    if rows.update(**{name: F(name) + delta for name, delta in deltas.items()}):
+        return
+    try:
+        with transaction.atomic():
+            rows.create(promoter_id=promoter_id, day=day, **deltas)
+    except IntegrityError:
+        # created concurrently; add to it instead
+        rows.update(**{name: F(name) + delta for name, delta in deltas.items()})
+
+
+def record_sale(ticket_type, quantity):
+    """Adding a sale made by promoter.tickets.sell(), which the signal handlers never see"""
+    event = Event.objects.filter(pk=ticket_type.event_id).values('promoter_id', 'start_date').get()
+    _adjust((event['promoter_id'], _day(event['start_date'])), {
+        'tickets_sold': quantity,
+        'revenue': quantity * ticket_type.price,
+    })
+
+
+def record_change(previous, current):
+    """Moving a contribution from its previous snapshot to its current one (either may be None)"""
+    changes = {}
+    for snapshot, sign in ((previous, -1), (current, 1)):
+        if snapshot:
+            deltas = changes.setdefault(snapshot['key'], dict.fromkeys(FIELDS, 0))
+            for name in FIELDS:
+                deltas[name] += sign * snapshot[name]
+    for key, deltas in changes.items():
+        if any(deltas.values()):
+            _adjust(key, deltas)
+
+
+def summary(promoter, start=None, end=None):
+    """Totals and per-month event counts for events starting between start and end (dates, inclusive)"""
+    rows = PromoterDailyStats.objects.filter(promoter=promoter)
+    if start:
+        rows = rows.filter(day__gte=start)
+    if end:
+        rows = rows.filter(day__lte=end)
+    months = list(
+        rows.annotate(month=TruncMonth('day')).values('month')
+        .annotate(**{name: Sum(name) for name in FIELDS})
+        .order_by('month')
+    )
+    return {
+        'total_events': sum(row['events'] for row in months),
+        'tickets_sold': sum(row['tickets_sold'] for row in months),
+        'total_revenue': sum(row['revenue'] for row in months),
+        'monthly_events': [{
+            'month': timezone.make_aware(datetime.datetime.combine(row['month'], datetime.time.min)),
+            'count': row['events'],
+        } for row in months if row['events']],
+    }
+
+
+def rebuild():
+    """Recomputing every daily row from the events and ticket types tables"""
+    totals = {}
+    events = Event.objects.annotate(day=TruncDate('start_date')).values('promoter_id', 'day').annotate(
+        events=Count('id')
+    ).order_by()
+    for row in events:
+        totals.setdefault((row['promoter_id'], row['day']), dict.fromkeys(FIELDS, 0))['events'] = row['events']
+
+    sold = F('quantity') - F('remaining')
+    ticket_types = TicketType.objects.annotate(day=TruncDate('event__start_date')).values(
+        'event__promoter_id', 'day'
+    ).annotate(
+        tickets_sold=Sum(sold), revenue=Sum(sold * F('price'))
+    ).order_by()
+    for row in ticket_types:
+        totals[(row['event__promoter_id'], row['day'])].update(
+            tickets_sold=row['tickets_sold'], revenue=row['revenue']
+        )
+
+    with transaction.atomic():
+        PromoterDailyStats.objects.all().delete()
+        PromoterDailyStats.objects.bulk_create([
+            PromoterDailyStats(promoter_id=promoter_id, day=day, **row)
+            for (promoter_id, day), row in totals.items()
+        ], batch_size=1000)
+    return len(totals)
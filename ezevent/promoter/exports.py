@@ -0,0 +1,111 @@
+"""Per-event data exports as CSV or XLSX.
+
+Each dataset is a values_list() projection read with iterator(), so CSV rows
+go from the database cursor to the response one chunk at a time whatever
+the size of the event. XLSX has to be assembled before it is sent (see
+ezevent.streaming), so it is refused above XLSX_MAX_ROWS rows in favour of
+CSV. Datetimes are written in local time without an offset, since Excel has
+no timezone-aware cells.
+"""
+from django.utils import timezone
+from django.utils.text import slugify
+from client.models import Purchase, TicketPDF
+from ezevent.streaming import stream_csv, stream_xlsx
+
+FORMATS = {
+    'csv': stream_csv,
+    'xlsx': stream_xlsx,
+}
+
+ITERATOR_CHUNK = 2000
+XLSX_MAX_ROWS = 100_000
+
+
+class ExportTooLarge(Exception):
+    """More rows than the requested format can carry"""
+
+
+def _local(moment):
+    return timezone.localtime(moment).replace(tzinfo=None) if moment else None
+
+
+def _ticket_status(is_used, exit_time):
+    return 'Completed' if exit_time else ('Still Inside' if is_used else 'Not Used')
+
+
+def attendee_tickets(event_id):
+    return TicketPDF.objects.filter(purchase__ticket_type__event_id=event_id).values_list(
+        'id', 'attendee__first_name', 'attendee__last_name', 'attendee__email', 'attendee__phone',
+        'purchase__ticket_type__name', 'purchase_id', 'purchase__purchaser_email', 'is_used', 'exit_time',
+    ).order_by('id')
+
+
+def attendee_row(values):
+    *row, is_used, exit_time = values
+    return (*row, _ticket_status(is_used, exit_time))
+
+
+def event_purchases(event_id):
+    return Purchase.objects.filter(ticket_type__event_id=event_id).values_list(
+        'id', 'purchase_date', 'ticket_type__name', 'quantity', 'total_amount',
+        'payment_method', 'payment_status', 'transaction_reference',
+        'purchaser_email', 'purchaser_phone', 'is_approved_by_promoter', 'approval_date',
+    ).order_by('id')
+
+
+def purchase_row(values):
+    pk, purchased_at, *row, approved, approved_at = values
+    return (pk, _local(purchased_at), *row, 'Yes' if approved else 'No', _local(approved_at))
+
+
+def entry_exit_scans(event_id):
+    return TicketPDF.objects.filter(
+        purchase__ticket_type__event_id=event_id, is_used=True
+    ).values_list(
+        'id', 'attendee__first_name', 'attendee__last_name', 'purchase__ticket_type__name',
+        'used_at', 'exit_time', 'exit_reason', 'injury_notes',
+    ).order_by('used_at', 'id')
+
+
+def entry_exit_row(values):
+    pk, first_name, last_name, ticket_type, used_at, exit_time, reason, notes = values
+    duration = exit_time - used_at if used_at and exit_time else None
+    return (
+        pk, f'{first_name} {last_name}', ticket_type, _local(used_at), _local(exit_time),
+        # exit_reason defaults to 'normal' before anyone has left
+        reason if exit_time else None,
+        round(duration.total_seconds() / 60) if duration else None,
+        notes,
+    )
+
+
+# name: (header, queryset of the event's rows, row formatter)
+DATASETS = {
+    'attendees': (
+        ('Ticket ID', 'First name', 'Last name', 'Email', 'Phone',
+         'Ticket type', 'Purchase ID', 'Purchaser email', 'Status'),
+        attendee_tickets, attendee_row,
+    ),
+    'purchases': (
+        ('Purchase ID', 'Purchased at', 'Ticket type', 'Quantity', 'Amount', 'Payment method',
+         'Payment status', 'Transaction reference', 'Purchaser email', 'Purchaser phone',
+         'Approved', 'Approved at'),
+        event_purchases, purchase_row,
+    ),
+    'entry_exit': (
+        ('Ticket ID', 'Attendee', 'Ticket type', 'Entry time', 'Exit time',
+         'Exit reason', 'Minutes inside', 'Injury notes'),
+        entry_exit_scans, entry_exit_row,
+    ),
+}
+
+
+def export(event, dataset, export_format):
+    """A download of one of the event's datasets; raises ExportTooLarge for an oversized XLSX"""
+    header, queryset, format_row = DATASETS[dataset]
+    values = queryset(event.id)
+    if export_format == 'xlsx' and values.count() > XLSX_MAX_ROWS:
+        raise ExportTooLarge(f'More than {XLSX_MAX_ROWS} rows; download this dataset as CSV instead')
+    rows = (format_row(row) for row in values.iterator(chunk_size=ITERATOR_CHUNK))
+    filename = f"{slugify(event.title) or 'event'}_{dataset}_{timezone.now().strftime('%Y%m%d')}.{export_format}"
+    return FORMATS[export_format](header, rows, filename)
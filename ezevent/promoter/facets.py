@@ -0,0 +1,218 @@
+"""Precomputed facet counts for browsing events by category, venue and location.
+
+Every event contributes 1 to one EventFacet row per dimension, keyed by
+promoter, status, value and start day, so promoter analytics can apply a
+start-date window. record_change() moves those contributions when an event
+is saved or deleted, so listings read small pre-aggregated rows instead of
+grouping over the events table.
+
+The catalog reads CatalogFacet instead, one row per dimension and value for
+published events that have not ended. Events end without a write, so
+CatalogFacetState.counted_from records the day up to which ended events
+have been taken out; the first catalog read of a day moves it forward with
+sweep(), which only looks at the events that ended since the last sweep.
+"""
+import datetime
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import CatalogFacet, CatalogFacetState, Event, EventFacet
+
+CATALOG_STATE = 1
+SNAPSHOT_FIELDS = ('promoter_id', 'status', 'category', 'venue', 'location', 'start_date', 'end_date')
+
+
+def snapshot(values):
+    """Facet-relevant values of an event, from an instance or a values() dict"""
+    if isinstance(values, Event):
+        values = {field: getattr(values, field) for field in SNAPSHOT_FIELDS}
+    return {
+        'promoter_id': values['promoter_id'],
+        'status': values['status'],
+        'start_day': timezone.localtime(values['start_date']).date(),
+        'end_day': timezone.localtime(values['end_date']).date(),
+        'values': {dimension: values[dimension] or '' for dimension in EventFacet.DIMENSIONS},
+    }
+
+
+def stored_snapshot(event_id):
+    """Snapshot of the event as it currently is in the database, or None"""
+    values = Event.objects.filter(pk=event_id).values(*SNAPSHOT_FIELDS).first()
+    return snapshot(values) if values else None
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def _keys(state):
+    if not state:
+        return set()
+    return {
+        (state['promoter_id'], state['status'], dimension, value, state['start_day'])
+        for dimension, value in state['values'].items()
+    }
+
+
+def _catalog_keys(state, counted_from):
+    if not state or state['status'] != 'published' or state['end_day'] < counted_from:
+        return set()
+    return set(state['values'].items())
+
+
+def _adjust(rows, fields, delta):
+    if rows.update(count=F('count') + delta) or delta < 0:
+        rows.filter(count__lte=0).delete()
+        return
+    try:
+        with transaction.atomic():
+            rows.create(count=delta, **fields)
+    except IntegrityError:
+        # created concurrently; add to it instead
+        rows.update(count=F('count') + delta)
+
+
+def _adjust_promoter(key, delta):
+    promoter_id, status, dimension, value, start_day = key
+    fields = {
+        'promoter_id': promoter_id, 'status': status, 'dimension': dimension,
+        'value': value, 'start_day': start_day,
+    }
+    _adjust(EventFacet.objects.filter(**fields), fields, delta)
+
+
+def _adjust_catalog(key, delta):
+    dimension, value = key
+    fields = {'dimension': dimension, 'value': value}
+    _adjust(CatalogFacet.objects.filter(**fields), fields, delta)
+
+
+def _move(old_keys, new_keys, adjust):
+    for key in old_keys - new_keys:
+        adjust(key, -1)
+    for key in new_keys - old_keys:
+        adjust(key, 1)
+
+
+def _locked_state():
+    return CatalogFacetState.objects.select_for_update().filter(pk=CATALOG_STATE).first()
+
+
+def record_change(previous, current):
+    """Moving an event's counts from its previous snapshot to its current one (either may be None)"""
+    _move(_keys(previous), _keys(current), _adjust_promoter)
+    with transaction.atomic():
+        # the locked state row keeps sweep() from moving counted_from while the catalog is adjusted
+        state = _locked_state()
+        if state is None:
+            # the recount already includes this change
+            rebuild_catalog()
+            return
+        _move(
+            _catalog_keys(previous, state.counted_from),
+            _catalog_keys(current, state.counted_from),
+            _adjust_catalog,
+        )
+
+
+def sweep(today=None):
+    """Taking published events that ended before today out of the catalog counts"""
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        state = _locked_state()
+        if state is None:
+            rebuild_catalog(today)
+            return
+        if state.counted_from >= today:
+            return
+        ended = Event.objects.filter(
+            status='published', end_date__gte=_midnight(state.counted_from), end_date__lt=_midnight(today)
+        )
+        for dimension in EventFacet.DIMENSIONS:
+            for row in ended.values(dimension).annotate(total=Count('id')).order_by():
+                _adjust_catalog((dimension, row[dimension] or ''), -row['total'])
+        state.counted_from = today
+        state.save(update_fields=['counted_from'])
+
+
+def _grouped(facets, group_by=('dimension', 'value')):
+    rows = facets.values(*group_by).annotate(total=Sum('count')).filter(total__gt=0).order_by('-total', 'value')
+    result = {dimension: [] for dimension in EventFacet.DIMENSIONS}
+    for row in rows:
+        entry = {'value': row['value'] or None, 'count': row['total']}
+        if 'status' in row:
+            entry['status'] = row['status']
+        result[row['dimension']].append(entry)
+    return result
+
+
+def catalog_facets():
+    """Facet counts over published events that have not ended"""
+    today = timezone.localdate()
+    if not CatalogFacetState.objects.filter(pk=CATALOG_STATE, counted_from__gte=today).exists():
+        sweep(today)
+    result = {dimension: [] for dimension in EventFacet.DIMENSIONS}
+    rows = CatalogFacet.objects.filter(count__gt=0).values('dimension', 'value', 'count').order_by('-count', 'value')
+    for row in rows:
+        result[row['dimension']].append({'value': row['value'] or None, 'count': row['count']})
+    return result
+
+
+def promoter_facets(promoter, since=None, until=None):
+    """A promoter's facet counts, optionally for events starting between since and until (inclusive)"""
+    facets = EventFacet.objects.filter(promoter=promoter)
+    if since:
+        facets = facets.filter(start_day__gte=since)
+    if until:
+        facets = facets.filter(start_day__lte=until)
+    result = _grouped(facets)
+    # every event has exactly one category row, so those rows also count events per status
+    result['status'] = [
+        {'value': row['status'], 'count': row['total']}
+        for row in facets.filter(dimension='category').values('status')
+        .annotate(total=Sum('count')).filter(total__gt=0).order_by('status')
+    ]
+    return result
+
+
+def rebuild_catalog(today=None):
+    """Recomputing the catalog rows from the published events that end today or later"""
+    today = today or timezone.localdate()
+    live = Event.objects.filter(status='published', end_date__gte=_midnight(today))
+    counts = {}
+    for dimension in EventFacet.DIMENSIONS:
+        for row in live.values(dimension).annotate(total=Count('id')).order_by():
+            key = (dimension, row[dimension] or '')
+            counts[key] = counts.get(key, 0) + row['total']
+
+    with transaction.atomic():
+        CatalogFacet.objects.all().delete()
+        CatalogFacet.objects.bulk_create([
+            CatalogFacet(dimension=dimension, value=value, count=count)
+            for (dimension, value), count in counts.items()
+        ], batch_size=1000)
+        CatalogFacetState.objects.update_or_create(pk=CATALOG_STATE, defaults={'counted_from': today})
+    return len(counts)
+
+
+def rebuild():
+    """Recomputing every facet row from the events table"""
+    counts = {}
+    for dimension in EventFacet.DIMENSIONS:
+        grouped = Event.objects.annotate(start_day=TruncDate('start_date')).values(
+            'promoter_id', 'status', dimension, 'start_day'
+        ).annotate(total=Count('id')).order_by()
+        for row in grouped:
+            # NULL and blank values share the '' row
+            key = (row['promoter_id'], row['status'], dimension, row[dimension] or '', row['start_day'])
+            counts[key] = counts.get(key, 0) + row['total']
+
+    rows = [
+        EventFacet(promoter_id=promoter_id, status=status, dimension=dimension, value=value, start_day=start_day, count=count)
+        for (promoter_id, status, dimension, value, start_day), count in counts.items()
+    ]
+    with transaction.atomic():
+        EventFacet.objects.all().delete()
+        EventFacet.objects.bulk_create(rows, batch_size=1000)
+    return len(rows) + rebuild_catalog()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promoter', '0004_event_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickettype',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
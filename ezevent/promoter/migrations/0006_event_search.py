@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:10
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+FTS_TABLE = 'promoter_event_fts'
+
+POSTGRES_VECTOR = """
+    setweight(to_tsvector('english', coalesce(title, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(location, '') || ' ' || coalesce(venue, '') || ' ' || coalesce(category, '')), 'B')
+    || setweight(to_tsvector('english', coalesce(description, '')), 'C')
+"""
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f"UPDATE promoter_event SET search_vector = {POSTGRES_VECTOR}")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS promoter_event_search_gin ON promoter_event USING gin (search_vector)"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            "USING fts5(title, location, venue, category, description, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, location, venue, category, description) "
+            "SELECT id, title, location, venue, coalesce(category, ''), description FROM promoter_event"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS promoter_event_search_gin")
+    elif vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promoter', '0005_tickettype_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+DIMENSIONS = ('category', 'venue', 'location')
+
+
+def backfill_facets(apps, schema_editor):
+    Event = apps.get_model('promoter', 'Event')
+    EventFacet = apps.get_model('promoter', 'EventFacet')
+    counts = {}
+    for dimension in DIMENSIONS:
+        grouped = Event.objects.annotate(
+            start_day=TruncDate('start_date'), end_day=TruncDate('end_date')
+        ).values('promoter_id', 'status', dimension, 'start_day', 'end_day').annotate(
+            total=Count('id')
+        ).order_by()
+        for row in grouped:
+            key = (row['promoter_id'], row['status'], dimension, row[dimension] or '', row['start_day'], row['end_day'])
+            counts[key] = counts.get(key, 0) + row['total']
+    EventFacet.objects.bulk_create([
+        EventFacet(
+            promoter_id=promoter_id, status=status, dimension=dimension,
+            value=value, start_day=start_day, end_day=end_day, count=count
+        )
+        for (promoter_id, status, dimension, value, start_day, end_day), count in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promoter', '0006_event_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20)),
+                ('dimension', models.CharField(max_length=20)),
+                ('value', models.CharField(blank=True, max_length=200)),
+                ('start_day', models.DateField()),
+                ('end_day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('promoter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='event_facets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dimension', 'status', 'end_day'], name='event_facet_catalog_idx'), models.Index(fields=['promoter', 'dimension', 'start_day'], name='event_facet_promoter_idx')],
+                'constraints': [models.UniqueConstraint(fields=('promoter', 'status', 'dimension', 'value', 'start_day', 'end_day'), name='event_facet_key')],
+            },
+        ),
+        migrations.RunPython(backfill_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:07
+
+from django.conf import settings
+from django.db import migrations, models
+from ezevent.db_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('promoter', '0007_eventfacet'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='event',
+            index=models.Index(fields=['promoter', 'start_date'], name='event_promoter_start_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='event',
+            index=models.Index(fields=['status', 'end_date'], name='event_status_end_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='tickettype',
+            index=models.Index(fields=['event', 'is_active', 'sale_start_date', 'sale_end_date'], name='tickettype_on_sale_idx'),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+COUNTERS = ('purchased', 'revenue', 'tickets_issued', 'attended', 'exited', 'normal_exits', 'injured_exits')
+INCIDENT_REASONS = ('injured', 'emergency')
+
+
+def backfill_stats(apps, schema_editor):
+    Event = apps.get_model('promoter', 'Event')
+    TicketType = apps.get_model('promoter', 'TicketType')
+    TicketPDF = apps.get_model('client', 'TicketPDF')
+    EventStats = apps.get_model('promoter', 'EventStats')
+    TicketTypeStats = apps.get_model('promoter', 'TicketTypeStats')
+
+    counts = {}
+    purchases = TicketType.objects.values('id', 'event_id').annotate(
+        purchased=Coalesce(Sum('purchases__quantity'), 0),
+        revenue=Coalesce(
+            Sum('purchases__total_amount', filter=Q(purchases__payment_status='completed')),
+            Value(0), output_field=DecimalField()
+        ),
+    ).order_by()
+    for row in purchases:
+        pk = row.pop('id')
+        counts[pk] = {**dict.fromkeys(COUNTERS, 0), **row}
+
+    used = Q(is_used=True)
+    exited = used & Q(exit_time__isnull=False)
+    tickets = TicketPDF.objects.values('purchase__ticket_type_id').annotate(
+        tickets_issued=Count('id'),
+        attended=Count('id', filter=used),
+        exited=Count('id', filter=exited),
+        normal_exits=Count('id', filter=exited & Q(exit_reason='normal')),
+        injured_exits=Count('id', filter=exited & Q(exit_reason__in=INCIDENT_REASONS)),
+    ).order_by()
+    for row in tickets:
+        counts[row.pop('purchase__ticket_type_id')].update(row)
+
+    totals = {pk: dict.fromkeys(COUNTERS, 0) for pk in Event.objects.values_list('pk', flat=True)}
+    for row in counts.values():
+        for name in COUNTERS:
+            totals[row['event_id']][name] += row[name]
+
+    TicketTypeStats.objects.bulk_create(
+        [TicketTypeStats(ticket_type_id=pk, **row) for pk, row in counts.items()], batch_size=1000
+    )
+    EventStats.objects.bulk_create(
+        [EventStats(event_id=pk, **row) for pk, row in totals.items()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promoter', '0008_hot_path_indexes'),
+        ('client', '0012_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventStats',
+            fields=[
+                ('purchased', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('tickets_issued', models.IntegerField(default=0)),
+                ('attended', models.IntegerField(default=0)),
+                ('exited', models.IntegerField(default=0)),
+                ('normal_exits', models.IntegerField(default=0)),
+                ('injured_exits', models.IntegerField(default=0)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='promoter.event')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='TicketTypeStats',
+            fields=[
+                ('purchased', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('tickets_issued', models.IntegerField(default=0)),
+                ('attended', models.IntegerField(default=0)),
+                ('exited', models.IntegerField(default=0)),
+                ('normal_exits', models.IntegerField(default=0)),
+                ('injured_exits', models.IntegerField(default=0)),
+                ('ticket_type', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='promoter.tickettype')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ticket_type_stats', to='promoter.event')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promoter', '0009_eventstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_buckets', to='promoter.event')),
+                ('ticket_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_buckets', to='promoter.tickettype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'hour'], name='sales_bucket_event_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ticket_type', 'hour'), name='sales_bucket_key')],
+            },
+        ),
+    ]
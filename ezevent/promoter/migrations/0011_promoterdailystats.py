@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_stats(apps, schema_editor):
+    Event = apps.get_model('promoter', 'Event')
+    TicketType = apps.get_model('promoter', 'TicketType')
+    PromoterDailyStats = apps.get_model('promoter', 'PromoterDailyStats')
+
+    totals = {}
+    events = Event.objects.annotate(day=TruncDate('start_date')).values('promoter_id', 'day').annotate(
+        events=Count('id')
+    ).order_by()
+    for row in events:
+        totals[(row['promoter_id'], row['day'])] = {'events': row['events'], 'tickets_sold': 0, 'revenue': 0}
+
+    sold = F('quantity') - F('remaining')
+    ticket_types = TicketType.objects.annotate(day=TruncDate('event__start_date')).values(
+        'event__promoter_id', 'day'
+    ).annotate(
+        tickets_sold=Sum(sold), revenue=Sum(sold * F('price'))
+    ).order_by()
+    for row in ticket_types:
+        totals[(row['event__promoter_id'], row['day'])].update(
+            tickets_sold=row['tickets_sold'], revenue=row['revenue']
+        )
+
+    PromoterDailyStats.objects.bulk_create([
+        PromoterDailyStats(promoter_id=promoter_id, day=day, **row)
+        for (promoter_id, day), row in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promoter', '0010_salesbucket'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromoterDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('events', models.IntegerField(default=0)),
+                ('tickets_sold', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('promoter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('promoter', 'day'), name='promoter_daily_stats_key')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+DIMENSIONS = ('category', 'venue', 'location')
+
+
+def rebuild_facets(apps, schema_editor):
+    """Re-keying the promoter rows without their end day, and counting the catalog rows"""
+    Event = apps.get_model('promoter', 'Event')
+    EventFacet = apps.get_model('promoter', 'EventFacet')
+    CatalogFacet = apps.get_model('promoter', 'CatalogFacet')
+    CatalogFacetState = apps.get_model('promoter', 'CatalogFacetState')
+
+    counts = {}
+    for dimension in DIMENSIONS:
+        grouped = Event.objects.annotate(start_day=TruncDate('start_date')).values(
+            'promoter_id', 'status', dimension, 'start_day'
+        ).annotate(total=Count('id')).order_by()
+        for row in grouped:
+            key = (row['promoter_id'], row['status'], dimension, row[dimension] or '', row['start_day'])
+            counts[key] = counts.get(key, 0) + row['total']
+    EventFacet.objects.all().delete()
+    EventFacet.objects.bulk_create([
+        EventFacet(promoter_id=promoter_id, status=status, dimension=dimension, value=value, start_day=start_day, count=count)
+        for (promoter_id, status, dimension, value, start_day), count in counts.items()
+    ], batch_size=1000)
+
+    today = timezone.localdate()
+    live = Event.objects.filter(
+        status='published',
+        end_date__gte=timezone.make_aware(datetime.datetime.combine(today, datetime.time.min))
+    )
+    catalog = {}
+    for dimension in DIMENSIONS:
+        for row in live.values(dimension).annotate(total=Count('id')).order_by():
+            key = (dimension, row[dimension] or '')
+            catalog[key] = catalog.get(key, 0) + row['total']
+    CatalogFacet.objects.bulk_create([
+        CatalogFacet(dimension=dimension, value=value, count=count)
+        for (dimension, value), count in catalog.items()
+    ], batch_size=1000)
+    CatalogFacetState.objects.create(pk=1, counted_from=today)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promoter', '0012_reportjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('value', models.CharField(blank=True, max_length=200)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CatalogFacetState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counted_from', models.DateField()),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name='eventfacet',
+            name='event_facet_key',
+        ),
+        migrations.RemoveIndex(
+            model_name='eventfacet',
+            name='event_facet_catalog_idx',
+        ),
+        migrations.RemoveField(
+            model_name='eventfacet',
+            name='end_day',
+        ),
+        migrations.RunPython(rebuild_facets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='eventfacet',
+            constraint=models.UniqueConstraint(fields=('promoter', 'status', 'dimension', 'value', 'start_day'), name='event_facet_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='catalogfacet',
+            constraint=models.UniqueConstraint(fields=('dimension', 'value'), name='catalog_facet_key'),
+        ),
+    ]
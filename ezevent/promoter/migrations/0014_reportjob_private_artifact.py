@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:26
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promoter', '0013_catalog_facets'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='reportjob',
+            name='artifact_url',
+        ),
+    ]
@@ -1,4 +1,5 @@
 # models.py
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from auths.models import Users
 
@@ -22,13 +23,22 @@ class Event(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     image = models.ImageField(upload_to='event_images/', null=True, blank=True)
+    image_variants = models.JSONField(null=True, blank=True)
     is_featured = models.BooleanField(default=False)
     category = models.CharField(max_length=100, null=True, blank=True)
     max_capacity = models.PositiveIntegerField()
+    # High-demand on-sale: buyers queue through client.waiting_room
+    waiting_room = models.BooleanField(default=False)
+    # Maintained by promoter.search on Postgres (GIN indexed in the migration)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['-start_date']
         app_label = 'promoter'
+        indexes = [
+            models.Index(fields=['promoter', 'start_date'], name='event_promoter_start_idx'),
+            models.Index(fields=['status', 'end_date'], name='event_status_end_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -44,6 +54,16 @@ class TicketType(models.Model):
     sale_end_date = models.DateTimeField()
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped on every save; ETags on event and ticket listings are built from it
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['event', 'is_active', 'sale_start_date', 'sale_end_date'],
+                name='tickettype_on_sale_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.event.title} - {self.name}"
@@ -51,4 +71,147 @@ class TicketType(models.Model):
     def save(self, *args, **kwargs):
         if not self.pk:  # If creating new ticket type
             self.remaining = self.quantity
+            super().save(*args, **kwargs)
+            return
+
+        self.version = models.F('version') + 1
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
         super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
+
+class EventFacet(models.Model):
+    """A promoter's event counts per browsing facet, kept current by promoter.facets on Event save/delete"""
+    DIMENSIONS = ('category', 'venue', 'location')
+
+    promoter = models.ForeignKey(Users, on_delete=models.CASCADE, related_name='event_facets')
+    status = models.CharField(max_length=20)
+    dimension = models.CharField(max_length=20)
+    value = models.CharField(max_length=200, blank=True)
+    start_day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['promoter', 'status', 'dimension', 'value', 'start_day'],
+                name='event_facet_key'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['promoter', 'dimension', 'start_day'], name='event_facet_promoter_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}={self.value} ({self.count})"
+
+class CatalogFacet(models.Model):
+    """Published events per facet value whose end day is on or after CatalogFacetState.counted_from"""
+    dimension = models.CharField(max_length=20)
+    value = models.CharField(max_length=200, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'value'], name='catalog_facet_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}={self.value} ({self.count})"
+
+class CatalogFacetState(models.Model):
+    """The single row recording the day up to which ended events have been taken out of CatalogFacet"""
+    counted_from = models.DateField()
+
+class StatsCounters(models.Model):
+    """Sales and attendance counters kept current by promoter.stats"""
+    purchased = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    tickets_issued = models.IntegerField(default=0)
+    attended = models.IntegerField(default=0)
+    exited = models.IntegerField(default=0)
+    normal_exits = models.IntegerField(default=0)
+    injured_exits = models.IntegerField(default=0)
+
+    COUNTERS = ('purchased', 'revenue', 'tickets_issued', 'attended', 'exited', 'normal_exits', 'injured_exits')
+
+    class Meta:
+        abstract = True
+
+class EventStats(StatsCounters):
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+
+    def __str__(self):
+        return f"Stats for {self.event_id}"
+
+class TicketTypeStats(StatsCounters):
+    ticket_type = models.OneToOneField(TicketType, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='ticket_type_stats')
+
+    def __str__(self):
+        return f"Stats for ticket type {self.ticket_type_id}"
+
+class SalesBucket(models.Model):
+    """Approved sales per ticket type and hour, kept by promoter.sales"""
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='sales_buckets')
+    ticket_type = models.ForeignKey(TicketType, on_delete=models.CASCADE, related_name='sales_buckets')
+    hour = models.DateTimeField()
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ticket_type', 'hour'], name='sales_bucket_key'),
+        ]
+        indexes = [
+            models.Index(fields=['event', 'hour'], name='sales_bucket_event_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ticket_type_id} @ {self.hour}: {self.quantity}"
+
+class PromoterDailyStats(models.Model):
+    """Events, tickets sold and revenue per promoter and event start day, kept by promoter.dashboard"""
+    promoter = models.ForeignKey(Users, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    events = models.IntegerField(default=0)
+    tickets_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['promoter', 'day'], name='promoter_daily_stats_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.promoter_id} on {self.day}"
+
+class ReportJob(models.Model):
+    """An event report rendered off the request by promoter.reports"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    ]
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='report_jobs')
+    requested_by = models.ForeignKey(Users, on_delete=models.SET_NULL, null=True, related_name='report_jobs')
+    # Hash of everything the report shows; a done job is reused while it matches
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Private object in the storage backend; handed out through reports.download_url()
+    artifact_path = models.CharField(max_length=500, null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['event', 'fingerprint'], name='report_job_fingerprint_idx'),
+            models.Index(fields=['status', 'created_at'], name='report_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Report for {self.event_id} ({self.status})"
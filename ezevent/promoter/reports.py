@@ -0,0 +1,357 @@
+"""Event reports: the data behind them, the PDF rendering and report jobs.
+
+build_context() gathers what a report shows; the stats come from the
+promoter.stats rollups. render_pdf() draws it with reportlab.
+
+Large events take too long to render inside a request, so reports are also
+produced as jobs. enqueue() records a ReportJob and hands it to
+ezevent.tasks; run_job() renders the PDF and stores it privately through
+the storage layer, since it names injured attendees; download_url() hands
+the owner a short-lived signed URL to it. A job is keyed by fingerprint(),
+which hashes the event's rollup counters and a few cheap aggregates rather
+than the report itself, and enqueue() hands back the finished job for as
+long as it is unchanged. Jobs lost to a worker restart are picked up again
+by the run_report_jobs command.
+"""
+import json
+import hashlib
+import datetime
+from io import BytesIO
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+from client.models import TicketPDF
+from ezevent.storage import get_storage
+from ezevent.tasks import run_in_background
+from .models import EventStats, ReportJob, StatsCounters, TicketType
+from . import stats
+
+# A pending or running job older than this is assumed to have died with its worker
+STALE_AFTER = datetime.timedelta(minutes=30)
+# Seconds a signed report download URL stays valid
+DOWNLOAD_URL_EXPIRES = 5 * 60
+
+
+def build_context(event, generated_by):
+    """Everything the report shows, as plain data"""
+    event_stats, ticket_type_stats = stats.report_stats(event.id)
+
+    injured_attendees = TicketPDF.objects.filter(
+        purchase__ticket_type__event_id=event.id,
+        is_used=True,
+        exit_time__isnull=False,
+        exit_reason__in=TicketPDF.INCIDENT_REASONS
+    ).select_related('attendee').order_by('exit_time', 'id')
+
+    injured_list = [{
+        'name': f"{ticket.attendee.first_name} {ticket.attendee.last_name}",
+        'email': ticket.attendee.email,
+        'phone': ticket.attendee.phone,
+        'exit_time': ticket.exit_time,
+        'exit_reason': ticket.exit_reason,
+        'notes': ticket.injury_notes or 'No notes provided'
+    } for ticket in injured_attendees]
+
+    return {
+        'event': {
+            'id': event.id,
+            'title': event.title,
+            'venue': event.venue,
+            'location': event.location,
+            'start_date': event.start_date,
+            'end_date': event.end_date,
+        },
+        'stats': event_stats,
+        'ticket_types': ticket_type_stats,
+        'injured_attendees': injured_list,
+        'generated_at': timezone.now(),
+        'generated_by': generated_by
+    }
+
+
+def fingerprint(event):
+    """A hash of the data behind the event's report, from three small queries
+
+    The counters cover sales and scans, the ticket type versions every edit
+    to a ticket type, and the latest incident the injured-attendee list.
+    """
+    counters = EventStats.objects.filter(pk=event.pk).values_list(*StatsCounters.COUNTERS).first()
+    ticket_types = TicketType.objects.filter(event=event).aggregate(count=Count('id'), versions=Sum('version'))
+    incidents = TicketPDF.objects.filter(
+        purchase__ticket_type__event=event,
+        exit_time__isnull=False,
+        exit_reason__in=TicketPDF.INCIDENT_REASONS
+    ).aggregate(last_exit=Max('exit_time'), last_id=Max('id'))
+    data = [event.updated_at, counters, ticket_types, incidents]
+    raw = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def render_pdf(context):
+    """The report as PDF bytes"""
+    event = context['event']
+    event_stats = context['stats']
+    ticket_type_stats = context['ticket_types']
+    injured_list = context['injured_attendees']
+
+    buffer = BytesIO()
+
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+
+    def calc_percentage(part, whole):
+        if whole == 0:
+            return 0
+        return int((part / whole) * 100)
+
+
+    pdf.setFont("Helvetica-Bold", 18)
+    pdf.drawCentredString(width/2, height-50, f"Event Report: {event['title']}")
+
+    pdf.setFont("Helvetica", 12)
+    pdf.drawCentredString(width/2, height-70, 
+        f"{event['start_date'].strftime('%B %d, %Y')} at {event['venue']}, {event['location']}")
+
+
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawString(50, height-120, "Summary")
+
+    pdf.rect(50, height-220, width-100, 80, stroke=1, fill=0)
+
+    box_width = width-100
+    item_width = box_width / 4
+
+
+    summary_data = [
+        ("Tickets Sold", event_stats['total_tickets_sold']),
+        ("Attendees", event_stats['attended_count']),
+        ("Revenue", event_stats['total_revenue']),
+        ("Injuries", event_stats['injured_exits'])
+    ]
+
+    for i, (label, value) in enumerate(summary_data):
+        x_pos = 50 + (i * item_width) + (item_width/2)
+
+        pdf.setFont("Helvetica-Bold", 16)
+        pdf.drawCentredString(x_pos, height-170, str(value))
+
+        pdf.setFont("Helvetica", 10)
+        pdf.drawCentredString(x_pos, height-190, label)
+
+
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawString(50, height-250, "Attendance Statistics")
+
+    header = ["Category", "Count", "Percentage"]
+    header_width = [250, 100, 100]
+    y_position = height-280
+
+    for i, col in enumerate(header):
+        x_start = 50 + sum(header_width[:i])
+        pdf.setFont("Helvetica-Bold", 10)
+        pdf.drawString(x_start, y_position, col)
+
+    pdf.line(50, y_position-5, sum(header_width)+50, y_position-5)
+
+    attendance_data = [
+        ("Total Tickets Sold", event_stats['total_tickets_sold'], "100%"),
+        ("Attendees (Used Tickets)", event_stats['attended_count'], 
+         f"{calc_percentage(event_stats['attended_count'], event_stats['total_tickets_sold'])}%"),
+        ("Normal Exits", event_stats['normal_exits'], 
+         f"{calc_percentage(event_stats['normal_exits'], event_stats['attended_count'])}%"),
+        ("Injury/Emergency Exits", event_stats['injured_exits'], 
+         f"{calc_percentage(event_stats['injured_exits'], event_stats['attended_count'])}%"),
+        ("Still Inside", event_stats['still_inside'], 
+         f"{calc_percentage(event_stats['still_inside'], event_stats['attended_count'])}%"),
+        ("Unused Tickets", event_stats['unused_tickets'], 
+         f"{calc_percentage(event_stats['unused_tickets'], event_stats['total_tickets_sold'])}%")
+    ]
+
+    y_position -= 20
+    for row in attendance_data:
+        for i, col in enumerate(row):
+            x_start = 50 + sum(header_width[:i])
+            pdf.setFont("Helvetica", 10)
+            pdf.drawString(x_start, y_position, str(col))
+        y_position -= 20
+
+    if y_position < 300:
+        pdf.showPage()
+        y_position = height - 50
+        pdf.setFont("Helvetica-Bold", 14)
+        pdf.drawString(50, y_position, "Ticket Type Breakdown")
+        y_position -= 30
+    else:
+        y_position -= 30
+        pdf.setFont("Helvetica-Bold", 14)
+        pdf.drawString(50, y_position, "Ticket Type Breakdown")
+        y_position -= 30
+
+    header = ["Ticket Type", "Price", "Quantity Sold", "Revenue"]
+    header_width = [200, 100, 100, 100]
+
+    for i, col in enumerate(header):
+        x_start = 50 + sum(header_width[:i])
+        pdf.setFont("Helvetica-Bold", 10)
+        pdf.drawString(x_start, y_position, col)
+
+    pdf.line(50, y_position-5, sum(header_width)+50, y_position-5)
+
+    y_position -= 20
+    for tt in ticket_type_stats:
+        row = [tt['name'], f"${tt['price']:.2f}", str(tt['sold']), f"${tt['revenue']:.2f}"]
+        for i, col in enumerate(row):
+            x_start = 50 + sum(header_width[:i])
+            pdf.setFont("Helvetica", 10)
+            pdf.drawString(x_start, y_position, col)
+        y_position -= 20
+
+    if injured_list:
+        if y_position < 200:
+            pdf.showPage()
+            y_position = height - 50
+        else:
+            y_position -= 40
+
+        pdf.setFont("Helvetica-Bold", 14)
+        pdf.drawString(50, y_position, "Injury/Emergency Reports")
+        y_position -= 30
+
+
+        pdf.setFillColorRGB(1, 0.95, 0.8) 
+        pdf.rect(50, y_position-30, width-100, 25, stroke=1, fill=1)
+        pdf.setFillColorRGB(0, 0, 0)  # Back to black
+        pdf.setFont("Helvetica-Bold", 10)
+        pdf.drawString(60, y_position-15, "Note: This section contains sensitive medical information and should be handled with appropriate confidentiality.")
+
+        y_position -= 50
+
+
+        header = ["Attendee", "Contact", "Exit Time", "Exit Reason", "Notes"]
+        header_width = [100, 120, 100, 80, 100]
+
+        for i, col in enumerate(header):
+            x_start = 50 + sum(header_width[:i])
+            pdf.setFont("Helvetica-Bold", 10)
+            pdf.drawString(x_start, y_position, col)
+
+
+        pdf.line(50, y_position-5, sum(header_width)+50, y_position-5)
+
+        y_position -= 20
+        for attendee in injured_list:
+
+            if y_position < 100:
+                pdf.showPage()
+                y_position = height - 50
+
+
+                for i, col in enumerate(header):
+                    x_start = 50 + sum(header_width[:i])
+                    pdf.setFont("Helvetica-Bold", 10)
+                    pdf.drawString(x_start, y_position, col)
+
+                pdf.line(50, y_position-5, sum(header_width)+50, y_position-5)
+                y_position -= 20
+
+            exit_time_str = attendee['exit_time'].strftime('%b %d, %Y %H:%M') if attendee['exit_time'] else "N/A"
+
+
+            columns = [
+                attendee['name'],
+                f"{attendee['email']}\n{attendee['phone']}",
+                exit_time_str,
+                attendee['exit_reason'].title(),
+                attendee['notes'][:30] + ('...' if len(attendee['notes']) > 30 else '')
+            ]
+
+            max_lines = 1
+            for i, col in enumerate(columns):
+                x_start = 50 + sum(header_width[:i])
+                pdf.setFont("Helvetica", 8)
+
+
+                lines = col.split('\n')
+                if len(lines) > max_lines:
+                    max_lines = len(lines)
+
+                for j, line in enumerate(lines):
+                    pdf.drawString(x_start, y_position - (j * 12), line)
+
+            y_position -= (max_lines * 12) + 8  
+
+
+    pdf.showPage() 
+    pdf.setFont("Helvetica", 10)
+    generated_at_str = context['generated_at'].strftime('%B %d, %Y at %H:%M')
+    pdf.drawCentredString(width/2, 50, f"Report generated on {generated_at_str} by {context['generated_by']}")
+    pdf.setFont("Helvetica", 8)
+    pdf.drawCentredString(width/2, 30, "This report is confidential and intended for authorized personnel only.")
+
+    pdf.save()
+    return buffer.getvalue()
+
+
+def artifact_path(job):
+    return f"reports/event_{job.event_id}/{job.fingerprint}.pdf"
+
+
+def download_url(job):
+    """A short-lived signed URL to a finished job's PDF, or None"""
+    if job.status != 'done' or not job.artifact_path:
+        return None
+    return get_storage().signed_download_url(job.artifact_path, DOWNLOAD_URL_EXPIRES)
+
+
+def enqueue(event, user):
+    """A job for the event's current report: a finished or in-flight one with the same data, or a new one"""
+    current = fingerprint(event)
+
+    stale = timezone.now() - STALE_AFTER
+    existing = ReportJob.objects.filter(event=event, fingerprint=current).filter(
+        Q(status='done') | Q(status='pending', created_at__gte=stale) | Q(status='running', started_at__gte=stale)
+    ).order_by('-created_at').first()
+    if existing is not None:
+        return existing
+
+    job = ReportJob.objects.create(event=event, requested_by=user, fingerprint=current)
+    run_in_background(run_job, job.pk)
+    return job
+
+
+def run_job(job_id):
+    """Rendering and storing a pending job's report, unless another worker has claimed it"""
+    claimed = ReportJob.objects.filter(pk=job_id, status='pending').update(
+        status='running', started_at=timezone.now()
+    )
+    if not claimed:
+        return
+    job = ReportJob.objects.select_related('event', 'requested_by').get(pk=job_id)
+
+    try:
+        user = job.requested_by
+        generated_by = f"{user.firstname} {user.lastname}" if user else job.event.promoter.get_full_name()
+        # The data may have moved on since the job was queued. Taken before the context, a change
+        # in between leaves an older fingerprint, so the next request renders again
+        job.fingerprint = fingerprint(job.event)
+        context = build_context(job.event, generated_by)
+        path = artifact_path(job)
+        get_storage().upload_private_bytes(render_pdf(context), path, content_type='application/pdf')
+    except Exception as e:
+        ReportJob.objects.filter(pk=job_id).update(status='failed', error=str(e), finished_at=timezone.now())
+        raise
+
+    ReportJob.objects.filter(pk=job_id).update(
+        status='done', fingerprint=job.fingerprint, artifact_path=path, finished_at=timezone.now()
+    )
+
+
+def recover_jobs():
+    """Running jobs that were queued but never finished, e.g. after a restart; returns how many"""
+    stale = timezone.now() - STALE_AFTER
+    ReportJob.objects.filter(status='running', started_at__lt=stale).update(status='pending')
+    job_ids = list(ReportJob.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True))
+    for job_id in job_ids:
+        run_job(job_id)
+    return len(job_ids)
@@ -0,0 +1,113 @@
+"""Sales time series from hourly buckets.
+
+Every approved purchase adds its quantity and amount to one SalesBucket row,
+keyed by ticket type and the UTC hour it was approved in; record_sale() is
+called from promoter.stats in the approval transaction. series() answers
+range queries at hour, day or week granularity by summing those rows, so
+its cost depends on the range asked for, not on the number of purchases.
+
+backfill() rebuilds the buckets from approved purchases in id-ordered
+chunks; it is run through the backfill_sales_buckets command. The delete and
+the rebuild share one transaction, so readers keep seeing the old buckets
+until the new ones are complete, and a failed run changes nothing.
+"""
+import datetime
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from client.models import Purchase
+from .models import SalesBucket
+
+GRANULARITIES = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+}
+
+
+def parse_moment(value):
+    """An aware datetime from an ISO date or datetime string, or None if it is not one"""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = day and datetime.datetime.combine(day, datetime.time.min)
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def bucket_hour(moment):
+    return moment.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _add(ticket_type_id, event_id, hour, quantity, revenue):
+    rows = SalesBucket.objects.filter(ticket_type_id=ticket_type_id, hour=hour)
+    if rows.update(quantity=F('quantity') + quantity, revenue=F('revenue') + revenue):
+        return
+    try:
+        with transaction.atomic():
+            rows.create(
+                ticket_type_id=ticket_type_id, event_id=event_id, hour=hour,
+                quantity=quantity, revenue=revenue
+            )
+    except IntegrityError:
+        # created concurrently; add to it instead
+        rows.update(quantity=F('quantity') + quantity, revenue=F('revenue') + revenue)
+
+
+def record_sale(ticket_type_id, event_id, approved_at, quantity, revenue):
+    _add(ticket_type_id, event_id, bucket_hour(approved_at), quantity, revenue)
+
+
+def series(event_id, granularity='day', start=None, end=None, ticket_type_id=None):
+    """[{'period', 'quantity', 'revenue'}] for an event's sales in [start, end), oldest first"""
+    buckets = SalesBucket.objects.filter(event_id=event_id)
+    if ticket_type_id:
+        buckets = buckets.filter(ticket_type_id=ticket_type_id)
+    if start:
+        buckets = buckets.filter(hour__gte=start)
+    if end:
+        buckets = buckets.filter(hour__lt=end)
+    return list(
+        buckets.annotate(period=GRANULARITIES[granularity]('hour'))
+        .values('period')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by('period')
+    )
+
+
+def _approved_purchases():
+    return Purchase.objects.filter(is_approved_by_promoter=True, approval_date__isnull=False)
+
+
+def backfill(chunk_size=5000, progress=None):
+    """Rebuilding every bucket from approved purchases, chunk_size purchase ids at a time"""
+    # approvals after this point are recorded live and must not be counted twice
+    cutoff = timezone.now()
+    purchases = _approved_purchases().filter(approval_date__lt=cutoff)
+
+    processed = 0
+    with transaction.atomic():
+        SalesBucket.objects.all().delete()
+        bounds = purchases.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            return 0
+
+        for low in range(bounds['first'], bounds['last'] + 1, chunk_size):
+            chunk = purchases.filter(id__gte=low, id__lt=low + chunk_size)
+            grouped = chunk.annotate(bucket=TruncHour('approval_date', tzinfo=datetime.timezone.utc)).values(
+                'ticket_type_id', 'ticket_type__event_id', 'bucket'
+            ).annotate(
+                sold=Sum('quantity'), amount=Sum('total_amount'), purchases=Count('id')
+            ).order_by()
+            for row in grouped:
+                _add(row['ticket_type_id'], row['ticket_type__event_id'], row['bucket'], row['sold'], row['amount'])
+                processed += row['purchases']
+            if progress:
+                progress(processed)
+    return processed
@@ -0,0 +1,156 @@
+"""Full-text event search.
+
+On Postgres, Event.search_vector holds a weighted tsvector (title, then
+location/venue/category, then description) behind a GIN index. On SQLite,
+the same columns are mirrored into the promoter_event_fts FTS5 table.
+promoter/signals.py keeps either one up to date on save and delete.
+QuerySet.update() and bulk_update() send no signals, so code that changes
+the searched columns that way must call index() itself; rebuild_index()
+(the rebuild_search_index command) re-derives the whole index.
+
+search() filters a queryset to matching events and annotates `rank`
+(higher is better). Every word is matched as a prefix, so "jaz fest"
+finds "Jazz Festival".
+"""
+import re
+from django.db import connection
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'promoter_event_fts'
+FTS_COLUMNS = ('title', 'location', 'venue', 'category', 'description')
+# far below one rank step, so ids only order rows that would otherwise tie
+ID_TIEBREAK = 1e-12
+
+
+def search_terms(text):
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def no_matches(queryset):
+    # still annotated, so callers can order by rank
+    return queryset.annotate(rank=Value(0.0, output_field=FloatField())).none()
+
+
+class PostgresSearchBackend:
+    def search_vector(self):
+        from django.contrib.postgres.search import SearchVector
+        return (
+            SearchVector('title', weight='A', config='english')
+            + SearchVector('location', 'venue', 'category', weight='B', config='english')
+            + SearchVector('description', weight='C', config='english')
+        )
+
+    def index(self, event_ids):
+        from .models import Event
+        Event.objects.filter(pk__in=event_ids).update(search_vector=self.search_vector())
+
+    def remove(self, event_ids):
+        # the vector lives on the event row and goes with it
+        pass
+
+    def rebuild(self):
+        from .models import Event
+        return Event.objects.update(search_vector=self.search_vector())
+
+    def search(self, queryset, terms):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config='english')
+        return queryset.filter(search_vector=query).annotate(rank=SearchRank('search_vector', query))
+
+
+class SQLiteSearchBackend:
+    def index(self, event_ids):
+        from .models import Event
+        self.remove(event_ids)
+        rows = Event.objects.filter(pk__in=event_ids).values_list('pk', *FTS_COLUMNS)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s, %s)",
+                [tuple('' if value is None else value for value in row) for row in rows]
+            )
+
+    def remove(self, event_ids):
+        event_ids = list(event_ids)
+        if not event_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(event_ids))})",
+                event_ids
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+                "SELECT id, title, location, venue, coalesce(category, ''), description FROM promoter_event"
+            )
+            return cursor.rowcount
+
+    def search(self, queryset, terms):
+        # Matching and ranking run inside the queryset's own query, so its filters
+        # apply and only its rows are ranked; the rank lookup seeks by rowid.
+        # Weights follow the Postgres backend: title, then place/category, then description
+        match = ' '.join(f'"{term}"*' for term in terms)
+        opts = queryset.model._meta
+        pk = f"{connection.ops.quote_name(opts.db_table)}.{connection.ops.quote_name(opts.pk.column)}"
+        rank = RawSQL(
+            f"SELECT -bm25({FTS_TABLE}, 10.0, 4.0, 4.0, 4.0, 1.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {pk}",
+            [match],
+            output_field=FloatField()
+        )
+        matches = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        return queryset.filter(pk__in=matches).annotate(rank=rank)
+
+
+class SubstringSearchBackend:
+    """Unindexed fallback for other databases; title hits rank first, then lower ids.
+
+    Ranks are unique, so a cursor on -rank always has a position to seek from
+    instead of counting tied rows with OFFSET.
+    """
+
+    def index(self, event_ids):
+        pass
+
+    def remove(self, event_ids):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def search(self, queryset, terms):
+        title_hits = Value(0.0)
+        for term in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term) | Q(description__icontains=term) | Q(location__icontains=term)
+            )
+            title_hits += Case(When(title__icontains=term, then=Value(1.0)), default=Value(0.0))
+        rank = ExpressionWrapper(title_hits - F('pk') * Value(ID_TIEBREAK), output_field=FloatField())
+        return queryset.annotate(rank=rank)
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_search_backend():
+    return BACKENDS.get(connection.vendor, SubstringSearchBackend)()
+
+
+def search(queryset, text):
+    """Events in queryset matching text, annotated with `rank`"""
+    terms = search_terms(text)
+    if not terms:
+        return no_matches(queryset)
+    return get_search_backend().search(queryset, terms)
+
+
+def rebuild_index():
+    """Re-deriving the search index of every event; returns how many were indexed"""
+    return get_search_backend().rebuild()
@@ -1,11 +1,13 @@
 from rest_framework import serializers
-from .models import Event, TicketType
+from .models import Event, ReportJob, TicketType
+from . import reports
+from ezevent.sparse import SparseFieldsMixin
 
-class TicketTypeSerializer(serializers.ModelSerializer):
+class TicketTypeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = TicketType
         fields = '__all__'
-        read_only_fields = ('remaining',)
+        read_only_fields = ('remaining', 'version')
 
     def validate(self, data):
         if data['sale_start_date'] >= data['sale_end_date']:
@@ -14,12 +16,13 @@ class TicketTypeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Ticket sales must end before event starts")
         return data
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     ticket_types = TicketTypeSerializer(many=True, read_only=True)
     class Meta:
         model = Event
-        fields = '__all__'
-        read_only_fields = ('promoter', 'created_at', 'updated_at')
+        exclude = ('search_vector',)
+        read_only_fields = ('promoter', 'created_at', 'updated_at', 'image_variants')
+        prefetch_related_fields = {'ticket_types': 'ticket_types'}
         extra_kwargs = {
             'image': {'required': False}, 
             'profile_pic': {'required': False}
@@ -29,4 +32,32 @@ class EventSerializer(serializers.ModelSerializer):
         if 'start_date' in data and 'end_date' in data:
             if data['start_date'] >= data['end_date']:
                 raise serializers.ValidationError("End date must be after start date")
-        return data
\ No newline at end of file
+        return data
+
+class TicketTypeSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TicketType
+        fields = ('id', 'name', 'price', 'remaining', 'sale_end_date')
+
+class EventListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Catalog card: just what the event list renders, with the ticket types on sale"""
+    ticket_types = TicketTypeSummarySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Event
+        fields = (
+            'id', 'title', 'location', 'venue', 'start_date', 'end_date', 'category',
+            'is_featured', 'profile_pic', 'image_variants', 'ticket_types'
+        )
+        prefetch_related_fields = {'ticket_types': 'ticket_types'}
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = ('id', 'event', 'status', 'download_url', 'error', 'created_at', 'started_at', 'finished_at')
+        read_only_fields = fields
+
+    def get_download_url(self, job):
+        return reports.download_url(job)
@@ -0,0 +1,117 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from auths.models import Users
+from client import waiting_room
+from ezevent.response_cache import bump_event_versions
+from .models import Event, EventStats, TicketType, TicketTypeStats
+from .search import get_search_backend
+from . import dashboard, facets
+
+
+@receiver([post_save, post_delete], sender=Event)
+def invalidate_event(sender, instance, **kwargs):
+    bump_event_versions(instance.pk)
+    waiting_room.forget_gate(instance.pk)
+
+
+@receiver(post_save, sender=Event)
+def index_event(sender, instance, **kwargs):
+    get_search_backend().index([instance.pk])
+
+
+@receiver(post_delete, sender=Event)
+def unindex_event(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(pre_save, sender=Event)
+def remember_facets(sender, instance, **kwargs):
+    instance._previous_facets = facets.stored_snapshot(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=Event)
+def update_facets(sender, instance, **kwargs):
+    facets.record_change(getattr(instance, '_previous_facets', None), facets.snapshot(instance))
+
+
+@receiver(post_delete, sender=Event)
+def remove_facets(sender, instance, **kwargs):
+    facets.record_change(facets.snapshot(instance), None)
+
+
+@receiver(pre_save, sender=Event)
+def remember_dashboard_event(sender, instance, **kwargs):
+    instance._previous_dashboard = dashboard.event_snapshot(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=Event)
+def update_dashboard_event(sender, instance, **kwargs):
+    dashboard.record_change(getattr(instance, '_previous_dashboard', None), dashboard.event_snapshot(instance.pk))
+
+
+@receiver(post_delete, sender=Event)
+def remove_dashboard_event(sender, instance, **kwargs):
+    dashboard.record_change(dashboard.deleted_event_snapshot(instance), None)
+
+
+# Ticket type fields shown on catalog cards; remaining only matters there once it reaches zero
+CATALOG_TICKET_FIELDS = ('name', 'price', 'is_active', 'sale_start_date', 'sale_end_date')
+
+
+@receiver(pre_save, sender=TicketType)
+def remember_ticket_type(sender, instance, **kwargs):
+    stored = TicketType.objects.filter(pk=instance.pk).values(
+        *dashboard.TICKET_TYPE_FIELDS, *CATALOG_TICKET_FIELDS
+    ).first() if instance.pk else None
+    instance._previous_dashboard = dashboard.ticket_type_snapshot(stored)
+    instance._previous_ticket_type = stored
+
+
+@receiver(post_save, sender=TicketType)
+def update_dashboard_ticket_type(sender, instance, **kwargs):
+    dashboard.record_change(getattr(instance, '_previous_dashboard', None), dashboard.stored_ticket_type(instance.pk))
+
+
+@receiver(post_delete, sender=TicketType)
+def remove_dashboard_ticket_type(sender, instance, **kwargs):
+    dashboard.record_change(dashboard.deleted_ticket_type_snapshot(instance), None)
+
+
+@receiver(post_save, sender=Event)
+def create_event_stats(sender, instance, created, **kwargs):
+    if created:
+        EventStats.objects.get_or_create(event=instance)
+
+
+@receiver(post_save, sender=TicketType)
+def create_ticket_type_stats(sender, instance, created, **kwargs):
+    if created:
+        TicketTypeStats.objects.get_or_create(ticket_type=instance, defaults={'event_id': instance.event_id})
+
+
+def _changes_catalog(previous, ticket_type):
+    if previous is None:
+        return True
+    if (previous['remaining'] > 0) != (ticket_type.remaining > 0):
+        return True
+    return any(previous[field] != getattr(ticket_type, field) for field in CATALOG_TICKET_FIELDS)
+
+
+@receiver(post_save, sender=TicketType)
+def invalidate_ticket_type(sender, instance, **kwargs):
+    catalog = _changes_catalog(getattr(instance, '_previous_ticket_type', None), instance)
+    bump_event_versions(instance.event_id, catalog=catalog)
+
+
+@receiver(post_delete, sender=TicketType)
+def invalidate_deleted_ticket_type(sender, instance, **kwargs):
+    bump_event_versions(instance.event_id)
+
+
+@receiver(post_save, sender=Users)
+def invalidate_promoter_events(sender, instance, update_fields=None, **kwargs):
+    """Promoter contact details are cached per event"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    for event_id in Event.objects.filter(promoter=instance).values_list('id', flat=True):
+        bump_event_versions(event_id)
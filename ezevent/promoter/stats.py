@@ -0,0 +1,206 @@
+"""Per-event statistics for reports, summaries and analytics.
+
+Inventory figures (quantity/remaining per ticket type) are read straight
+from the event's ticket types in one query.
+
+Purchase and attendance figures live in the EventStats and TicketTypeStats
+rollups. The record_*() functions below add to them with F() expressions in
+the same transaction as the write they describe: a purchase, its approval,
+ticket issue, and entry and exit scans. Approvals also go into the hourly
+sales buckets of promoter.sales. Reports therefore read one row per
+event (plus one per ticket type) however many purchases and tickets there
+are.
+
+Writes that bypass those paths (bulk loads, deletes from the admin) are not
+tracked. rebuild() recounts events from the raw rows with conditional
+aggregation, and verify() reports where the stored counters have drifted.
+Both are exposed through the rebuild_event_stats command.
+"""
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from client.models import Purchase, TicketPDF
+from .models import Event, EventStats, StatsCounters, TicketType, TicketTypeStats
+from . import sales
+
+TICKET_TYPE_FIELDS = ('id', 'name', 'price', 'quantity', 'remaining')
+
+
+def ticket_type_stats(event_id):
+    """One row per ticket type, in id order, with sold/revenue from inventory"""
+    rows = TicketType.objects.filter(event_id=event_id).values(*TICKET_TYPE_FIELDS).annotate(
+        sold=F('quantity') - F('remaining'),
+        revenue=(F('quantity') - F('remaining')) * F('price'),
+    )
+    return list(rows.order_by('id'))
+
+
+def inventory_totals(rows):
+    return {
+        'total_tickets': sum(row['quantity'] for row in rows),
+        'tickets_sold': sum(row['sold'] for row in rows),
+        'revenue': sum(row['revenue'] for row in rows),
+    }
+
+
+def report_stats(event_id):
+    """Event totals and per-ticket-type rows for the event report, from the rollups"""
+    counters = EventStats.objects.filter(pk=event_id).values(*StatsCounters.COUNTERS).first()
+    if counters is None:
+        rebuild([event_id])
+        counters = EventStats.objects.filter(pk=event_id).values(*StatsCounters.COUNTERS).first()
+
+    stats = {
+        'total_tickets_sold': counters['purchased'],
+        'total_revenue': counters['revenue'],
+        'total_attendees': counters['tickets_issued'],
+        'attended_count': counters['attended'],
+        'normal_exits': counters['normal_exits'],
+        'injured_exits': counters['injured_exits'],
+        'still_inside': counters['attended'] - counters['exited'],
+        'unused_tickets': counters['tickets_issued'] - counters['attended'],
+    }
+    rows = TicketType.objects.filter(event_id=event_id).values(
+        'name', 'price', 'stats__purchased', 'stats__revenue'
+    ).order_by('id')
+    ticket_types = [{
+        'name': row['name'],
+        'price': float(row['price']),
+        'sold': row['stats__purchased'] or 0,
+        'revenue': float(row['stats__revenue'] or 0),
+    } for row in rows]
+    return stats, ticket_types
+
+
+def _bump(ticket_type_id, **deltas):
+    """Adding to a ticket type's counters and its event's; call inside the transaction that made the change"""
+    updates = {name: F(name) + delta for name, delta in deltas.items()}
+    with transaction.atomic():
+        updated = TicketTypeStats.objects.filter(pk=ticket_type_id).update(**updates)
+        updated = updated and EventStats.objects.filter(event__ticket_types=ticket_type_id).update(**updates)
+        if not updated:
+            # rows that predate the rollup (or were bulk-created); the recount includes this change
+            rebuild(TicketType.objects.filter(pk=ticket_type_id).values_list('event_id', flat=True))
+
+
+def record_purchase(ticket_type_id, quantity):
+    _bump(ticket_type_id, purchased=quantity)
+
+
+def record_approval(purchase_id):
+    purchase = Purchase.objects.filter(pk=purchase_id).values(
+        'ticket_type_id', 'ticket_type__event_id', 'quantity', 'total_amount', 'approval_date'
+    ).get()
+    _bump(purchase['ticket_type_id'], revenue=purchase['total_amount'])
+    sales.record_sale(
+        purchase['ticket_type_id'], purchase['ticket_type__event_id'],
+        purchase['approval_date'], purchase['quantity'], purchase['total_amount']
+    )
+
+
+def record_tickets_issued(ticket_type_id, count):
+    _bump(ticket_type_id, tickets_issued=count)
+
+
+def record_entry(ticket_type_id):
+    _bump(ticket_type_id, attended=1)
+
+
+def record_exit(ticket_type_id, exit_reason):
+    deltas = {'exited': 1}
+    if exit_reason == 'normal':
+        deltas['normal_exits'] = 1
+    elif exit_reason in TicketPDF.INCIDENT_REASONS:
+        deltas['injured_exits'] = 1
+    _bump(ticket_type_id, **deltas)
+
+
+def count_from_rows(events):
+    """Counters per ticket type of the given events, from purchases and tickets"""
+    used = Q(is_used=True)
+    exited = used & Q(exit_time__isnull=False)
+    counts = {}
+
+    purchases = TicketType.objects.filter(event__in=events).values('id', 'event_id').annotate(
+        purchased=Coalesce(Sum('purchases__quantity'), 0),
+        revenue=Coalesce(
+            Sum('purchases__total_amount', filter=Q(purchases__payment_status='completed')),
+            Value(0), output_field=DecimalField()
+        ),
+    ).order_by()
+    for row in purchases:
+        pk = row.pop('id')
+        counts[pk] = {**dict.fromkeys(StatsCounters.COUNTERS, 0), **row}
+
+    tickets = TicketPDF.objects.filter(purchase__ticket_type__event__in=events).values(
+        'purchase__ticket_type_id'
+    ).annotate(
+        tickets_issued=Count('id'),
+        attended=Count('id', filter=used),
+        exited=Count('id', filter=exited),
+        normal_exits=Count('id', filter=exited & Q(exit_reason='normal')),
+        injured_exits=Count('id', filter=exited & Q(exit_reason__in=TicketPDF.INCIDENT_REASONS)),
+    ).order_by()
+    for row in tickets:
+        counts[row.pop('purchase__ticket_type_id')].update(row)
+    return counts
+
+
+def _event_totals(event_ids, counts):
+    totals = {event_id: dict.fromkeys(StatsCounters.COUNTERS, 0) for event_id in event_ids}
+    for row in counts.values():
+        for name in StatsCounters.COUNTERS:
+            totals[row['event_id']][name] += row[name]
+    return totals
+
+
+def _events(event_ids):
+    return Event.objects.all() if event_ids is None else Event.objects.filter(pk__in=list(event_ids))
+
+
+def rebuild(event_ids=None):
+    """Recounting the rollups of the given events (all by default) from raw rows"""
+    events = _events(event_ids)
+    with transaction.atomic():
+        ids = list(events.values_list('pk', flat=True))
+        counts = count_from_rows(events)
+        totals = _event_totals(ids, counts)
+
+        TicketTypeStats.objects.filter(event__in=events).delete()
+        EventStats.objects.filter(event__in=events).delete()
+        TicketTypeStats.objects.bulk_create(
+            [TicketTypeStats(ticket_type_id=pk, **row) for pk, row in counts.items()], batch_size=1000
+        )
+        EventStats.objects.bulk_create(
+            [EventStats(event_id=pk, **row) for pk, row in totals.items()], batch_size=1000
+        )
+    return len(ids)
+
+
+def verify(event_ids=None):
+    """(label, counter, stored, actual) for every rollup value that differs from the raw rows"""
+    events = _events(event_ids)
+    counts = count_from_rows(events)
+    totals = _event_totals(events.values_list('pk', flat=True), counts)
+    missing = dict.fromkeys(StatsCounters.COUNTERS, None)
+
+    stored_types = {
+        row.pop('pk'): row
+        for row in TicketTypeStats.objects.filter(event__in=events).values('pk', *StatsCounters.COUNTERS)
+    }
+    stored_events = {
+        row.pop('pk'): row
+        for row in EventStats.objects.filter(event__in=events).values('pk', *StatsCounters.COUNTERS)
+    }
+
+    mismatches = []
+    for label, actual_rows, stored_rows in (
+        ('event', totals, stored_events),
+        ('ticket type', counts, stored_types),
+    ):
+        for pk, actual in actual_rows.items():
+            stored = stored_rows.get(pk, missing)
+            for name in StatsCounters.COUNTERS:
+                if stored[name] != actual[name]:
+                    mismatches.append((f'{label} {pk}', name, stored[name], actual[name]))
+    return mismatches
@@ -1,3 +1,777 @@
-from django.test import TestCase
+import datetime
+import json
+import os
+import tempfile
+from io import BytesIO
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from openpyxl import load_workbook
+from django.utils import timezone
+from auths.models import Users
+from client.models import Attendee, Purchase, PurchaseAttendee, TicketPDF
+from client.tests import api_client, create_purchases, follow_next
+from ezevent.response_cache import CATALOG, event_scope, get_versions
+from promoter import dashboard, facets, reports, sales, search, stats, tickets
+from promoter.facets import catalog_facets
+from promoter.models import Event, EventFacet, EventStats, PromoterDailyStats, ReportJob, SalesBucket, TicketType
+from uploads.tests import LocalStorageTestCase
 
-# Create your tests here.
+
+class PendingPaymentsQueryCountTests(TestCase):
+    """The pending payments list prefetches attendees, so its query count does not grow with the page"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        cls.buyer = Users.objects.create(email='buyer@example.com', firstname='Buy', lastname='Er')
+        event = Event.objects.create(
+            promoter=cls.promoter, title='Concert', description='Live', location='Kampala', venue='Hall',
+            start_date=now + datetime.timedelta(days=7), end_date=now + datetime.timedelta(days=7, hours=5),
+            status='published', max_capacity=500,
+        )
+        cls.ticket_type = TicketType.objects.create(
+            event=event, name='Regular', price=50000, quantity=500, remaining=500,
+            sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now + datetime.timedelta(days=6),
+        )
+
+    def test_query_count_is_independent_of_purchases(self):
+        client = api_client(self.promoter, 'promoter')
+        create_purchases(self.ticket_type, self.buyer, 1)
+        # two user lookups (middleware and DRF authentication), purchases, attendees
+        with self.assertNumQueries(4):
+            response = client.get('/promoter/pending_payments')
+        self.assertEqual(len(response.json()['results']), 1)
+
+        create_purchases(self.ticket_type, self.buyer, 9)
+        with self.assertNumQueries(4):
+            response = client.get('/promoter/pending_payments')
+        results = response.json()['results']
+        self.assertEqual(len(results), 10)
+        self.assertEqual({len(purchase['attendee_details']) for purchase in results}, {3})
+
+
+class PromoterKeysetPaginationTests(TestCase):
+    """Deep pages of the promoter's listings cost the same queries as the first one"""
+    PURCHASES = 10000
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        event = Event.objects.create(
+            promoter=cls.promoter, title='Festival', description='Live', location='Kampala', venue='Grounds',
+            start_date=now + datetime.timedelta(days=7), end_date=now + datetime.timedelta(days=8),
+            status='published', max_capacity=cls.PURCHASES,
+        )
+        ticket_type = TicketType.objects.create(
+            event=event, name='Regular', price=50000, quantity=cls.PURCHASES, remaining=cls.PURCHASES,
+            sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now + datetime.timedelta(days=6),
+        )
+        purchases = Purchase.objects.bulk_create([
+            Purchase(
+                ticket_type=ticket_type, quantity=1, total_amount=50000, payment_method='mtn',
+                purchaser_email=f'buyer{i}@example.com', purchaser_phone='0700000000',
+                payment_screenshot='https://storage.example.com/screenshot.png',
+            ) for i in range(cls.PURCHASES)
+        ], batch_size=1000)
+        attendees = Attendee.objects.bulk_create([
+            Attendee(first_name='Guest', last_name=str(i), email=f'guest{i}@example.com', phone='0700000000')
+            for i in range(cls.PURCHASES)
+        ], batch_size=1000)
+        PurchaseAttendee.objects.bulk_create([
+            PurchaseAttendee(purchase=purchase, attendee=attendee) for purchase, attendee in zip(purchases, attendees)
+        ], batch_size=1000)
+        TicketPDF.objects.bulk_create([
+            TicketPDF(purchase=purchase, attendee=attendee) for purchase, attendee in zip(purchases, attendees)
+        ], batch_size=1000)
+
+    def setUp(self):
+        self.client = api_client(self.promoter, 'promoter')
+
+    def assertDeepPageQueries(self, url, queries):
+        with self.assertNumQueries(queries):
+            first = self.client.get(url).json()['results']
+        deep = follow_next(self.client, url, 40)
+        with self.assertNumQueries(queries) as captured:
+            page = self.client.get(deep).json()['results']
+        self.assertEqual(len(page), len(first))
+        # the cursor seeks on the ordering columns instead of skipping rows
+        self.assertFalse([query for query in captured.captured_queries if 'OFFSET' in query['sql']])
+        return first, page
+
+    def test_pending_payments(self):
+        # two user lookups, the page, its attendees
+        first, deep = self.assertDeepPageQueries('/promoter/pending_payments?page_size=200', 4)
+        self.assertGreater(first[-1]['id'], deep[0]['id'])
+
+    def test_ticket_details(self):
+        # two user lookups, the page
+        first, deep = self.assertDeepPageQueries('/promoter/tickets_details/?page_size=200', 3)
+        self.assertEqual(deep[0]['ticket_id'] - first[0]['ticket_id'], 40 * 200)
+
+
+class TicketTypeInvalidationTests(TestCase):
+    """A sale invalidates its event's cached responses but leaves the catalog alone until it sells out"""
+
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        self.event = Event.objects.create(
+            promoter=promoter, title='Concert', description='Live', location='Kampala', venue='Hall',
+            start_date=now + datetime.timedelta(days=7), end_date=now + datetime.timedelta(days=7, hours=5),
+            status='published', max_capacity=2,
+        )
+        self.ticket_type = TicketType.objects.create(
+            event=self.event, name='Regular', price=50000, quantity=2, remaining=2,
+            sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now + datetime.timedelta(days=6),
+        )
+
+    def assertBumped(self, change, catalog):
+        before = get_versions([CATALOG, event_scope(self.event.id)])
+        change()
+        after = get_versions([CATALOG, event_scope(self.event.id)])
+        self.assertEqual(after[0] != before[0], catalog)
+        self.assertNotEqual(after[1], before[1])
+
+    def sell(self):
+        self.ticket_type.remaining -= 1
+        self.ticket_type.save()
+
+    def test_sale_keeps_catalog(self):
+        self.assertBumped(self.sell, catalog=False)
+
+    def test_sold_out_bumps_catalog(self):
+        self.sell()
+        self.assertBumped(self.sell, catalog=True)
+
+    def test_price_change_bumps_catalog(self):
+        def change_price():
+            self.ticket_type.price = 60000
+            self.ticket_type.save()
+        self.assertBumped(change_price, catalog=True)
+
+    def sell_one(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(tickets.sell(self.ticket_type, 1))
+
+    def test_sale_bumps_catalog_only_when_sold_out(self):
+        self.assertBumped(self.sell_one, catalog=False)
+        self.assertBumped(self.sell_one, catalog=True)
+
+    def test_sale_never_oversells(self):
+        self.assertFalse(tickets.sell(self.ticket_type, 3))
+        self.sell_one()
+        self.assertFalse(tickets.sell(self.ticket_type, 2))
+        self.ticket_type.refresh_from_db()
+        self.assertEqual((self.ticket_type.remaining, self.ticket_type.version), (1, 2))
+        self.assertEqual(EventStats.objects.get(pk=self.event.pk).purchased, 1)
+
+    def test_recorded_sales_match_rebuilt_dashboard(self):
+        self.sell_one()
+        self.sell_one()
+        recorded = list(PromoterDailyStats.objects.values('day', 'events', 'tickets_sold', 'revenue'))
+        dashboard.rebuild()
+        self.assertEqual(recorded, list(PromoterDailyStats.objects.values('day', 'events', 'tickets_sold', 'revenue')))
+        self.assertEqual(recorded[0]['tickets_sold'], 2)
+
+
+class EventExportTests(TestCase):
+    """Exports keep user-entered text inert and file names safe"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        cls.event = Event.objects.create(
+            promoter=cls.promoter, title='Kampala "Live" Fête', description='Live', location='Kampala',
+            venue='Hall', start_date=now + datetime.timedelta(days=7),
+            end_date=now + datetime.timedelta(days=7, hours=5), status='published', max_capacity=500,
+        )
+        ticket_type = TicketType.objects.create(
+            event=cls.event, name='Regular', price=50000, quantity=500, remaining=500,
+            sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now + datetime.timedelta(days=6),
+        )
+        create_purchases(ticket_type, cls.promoter, 1, attendees=1)
+        Attendee.objects.update(first_name='=HYPERLINK("http://evil.example","x")', last_name='-2+3')
+
+    def setUp(self):
+        self.client = api_client(self.promoter, 'promoter')
+
+    def url(self, export_format):
+        return f'/promoter/events/{self.event.pk}/export/attendees.{export_format}'
+
+    def test_csv_cells_cannot_run_formulas(self):
+        response = self.client.get(self.url('csv'))
+        body = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertIn('"\'=HYPERLINK(""http://evil.example"",""x"")"', body)
+        self.assertIn(",'-2+3,", body)
+
+    def test_xlsx_cells_cannot_run_formulas(self):
+        response = self.client.get(self.url('xlsx'))
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        row = [cell.value for cell in next(sheet.iter_rows(min_row=2, max_row=2))]
+        self.assertEqual(row[1:3], ['\'=HYPERLINK("http://evil.example","x")', "'-2+3"])
+
+    def test_filename_is_slugified(self):
+        disposition = self.client.get(self.url('csv'))['Content-Disposition']
+        self.assertRegex(disposition, r'^attachment; filename="kampala-live-fete_attendees_\d{8}\.csv"$')
+
+    def test_oversized_xlsx_is_refused(self):
+        with mock.patch('promoter.exports.XLSX_MAX_ROWS', 0):
+            response = self.client.get(self.url('xlsx'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(self.url('csv')).status_code, 200)
+
+
+class SearchTests(TestCase):
+    """Ranked search stays inside the queryset it is given"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+
+        def event(title, description, status='published'):
+            return Event.objects.create(
+                promoter=cls.promoter, title=title, description=description, location='Kampala', venue='Hall',
+                start_date=now + datetime.timedelta(days=7), end_date=now + datetime.timedelta(days=7, hours=5),
+                status=status, max_capacity=500,
+            )
+
+        cls.festival = event('Jazz Festival', 'Three stages')
+        cls.brunch = event('Sunday Brunch', 'With a jazz trio')
+        cls.draft = event('Jazz Night', 'Not announced yet', status='draft')
+        cls.comedy = event('Comedy Night', 'Stand-up')
+
+    def test_prefix_terms_rank_title_matches_first(self):
+        results = list(search.search(Event.objects.all(), 'jaz fest'))
+        self.assertEqual(results, [self.festival])
+
+        published = Event.objects.filter(status='published')
+        with self.assertNumQueries(1):
+            results = list(search.search(published, 'jaz').order_by('-rank'))
+        self.assertEqual(results, [self.festival, self.brunch])
+
+    def test_bulk_updates_need_a_rebuild(self):
+        Event.objects.filter(pk=self.comedy.pk).update(title='Reggae Night')
+        self.assertFalse(search.search(Event.objects.all(), 'reggae').exists())
+
+        self.assertEqual(search.rebuild_index(), 4)
+        self.assertEqual(list(search.search(Event.objects.all(), 'reggae')), [self.comedy])
+
+    def test_substring_ranks_are_unique(self):
+        results = list(search.SubstringSearchBackend().search(Event.objects.all(), ['jazz']).order_by('-rank'))
+        self.assertEqual(results, [self.festival, self.draft, self.brunch])
+        self.assertEqual(len({event.rank for event in results}), 3)
+
+    def test_catalog_search_pages_through_every_match(self):
+        client = api_client(self.promoter)
+        response = client.get('/client/events/search', {'q': 'jazz', 'page_size': 1}).json()
+        ids = [event['id'] for event in response['results']]
+        ids += [event['id'] for event in client.get(response['next']).json()['results']]
+        self.assertEqual(ids, [self.festival.pk, self.brunch.pk])
+
+
+class SalesBucketTests(TestCase):
+    """Approvals land in hourly buckets that roll up to days and weeks"""
+    APPROVALS = [
+        datetime.datetime(2026, 3, 2, 10, 15, tzinfo=datetime.timezone.utc),
+        datetime.datetime(2026, 3, 2, 10, 45, tzinfo=datetime.timezone.utc),
+        datetime.datetime(2026, 3, 2, 13, 5, tzinfo=datetime.timezone.utc),
+        datetime.datetime(2026, 3, 10, 9, 0, tzinfo=datetime.timezone.utc),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        cls.buyer = Users.objects.create(email='buyer@example.com', firstname='Buy', lastname='Er')
+        cls.event = Event.objects.create(
+            promoter=cls.promoter, title='Concert', description='Live', location='Kampala', venue='Hall',
+            start_date=now + datetime.timedelta(days=7), end_date=now + datetime.timedelta(days=7, hours=5),
+            status='published', max_capacity=500,
+        )
+        cls.ticket_type = TicketType.objects.create(
+            event=cls.event, name='Regular', price=50000, quantity=500, remaining=500,
+            sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now + datetime.timedelta(days=6),
+        )
+        for purchase, approved_at in zip(create_purchases(cls.ticket_type, cls.buyer, 4, attendees=1), cls.APPROVALS):
+            with mock.patch('django.utils.timezone.now', return_value=approved_at):
+                tickets.approve_purchase(purchase.pk)
+
+    def quantities(self, granularity, **bounds):
+        return [row['quantity'] for row in sales.series(self.event.pk, granularity, **bounds)]
+
+    def buckets(self):
+        return list(SalesBucket.objects.order_by('hour').values_list('hour', 'quantity', 'revenue'))
+
+    def test_granularities(self):
+        self.assertEqual(self.quantities('hour'), [2, 1, 1])
+        self.assertEqual(self.quantities('day'), [3, 1])
+        self.assertEqual(self.quantities('week'), [3, 1])
+        self.assertEqual(sales.series(self.event.pk, 'hour')[0]['revenue'], 100000)
+
+    def test_range_is_end_exclusive(self):
+        # buckets are keyed by the hour they start at
+        start = self.APPROVALS[0].replace(minute=0)
+        self.assertEqual(self.quantities('hour', start=start, end=self.APPROVALS[3]), [2, 1])
+
+    def test_backfill_rebuilds_the_live_buckets_once(self):
+        live = self.buckets()
+        self.assertEqual(sales.backfill(chunk_size=2), 4)
+        self.assertEqual(self.buckets(), live)
+
+    def test_failed_backfill_keeps_the_old_buckets(self):
+        live = self.buckets()
+        with mock.patch('promoter.sales._add', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                sales.backfill()
+        self.assertEqual(self.buckets(), live)
+
+
+class FacetTests(TestCase):
+    """Facet rows follow events as they are saved, end and are deleted"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+
+    def create_event(self, days, **fields):
+        now = timezone.now()
+        values = {
+            'promoter': self.promoter, 'title': 'Concert', 'description': 'Live', 'location': 'Kampala',
+            'venue': 'Hall', 'category': 'Music', 'status': 'published', 'max_capacity': 500,
+            'start_date': now + datetime.timedelta(days=days), 'end_date': now + datetime.timedelta(days=days, hours=5),
+        }
+        return Event.objects.create(**{**values, **fields})
+
+    def counts(self, result, dimension):
+        return {row['value']: row['count'] for row in result[dimension]}
+
+    def assertMatchesRebuild(self):
+        stored = sorted(EventFacet.objects.values_list('status', 'dimension', 'value', 'start_day', 'count'))
+        catalog = catalog_facets()
+        facets.rebuild()
+        self.assertEqual(sorted(EventFacet.objects.values_list('status', 'dimension', 'value', 'start_day', 'count')), stored)
+        self.assertEqual(catalog_facets(), catalog)
+
+    def test_saves_move_counts(self):
+        event = self.create_event(3)
+        self.create_event(4, category='Comedy', status='draft')
+        self.assertEqual(self.counts(facets.promoter_facets(self.promoter), 'category'), {'Music': 1, 'Comedy': 1})
+        self.assertEqual(self.counts(catalog_facets(), 'category'), {'Music': 1})
+
+        event.category = 'Comedy'
+        event.save()
+        self.assertEqual(self.counts(facets.promoter_facets(self.promoter), 'category'), {'Comedy': 2})
+        self.assertEqual(self.counts(catalog_facets(), 'category'), {'Comedy': 1})
+        self.assertMatchesRebuild()
+
+        event.delete()
+        self.assertEqual(self.counts(facets.promoter_facets(self.promoter), 'status'), {'draft': 1})
+        self.assertEqual(catalog_facets()['category'], [])
+        self.assertMatchesRebuild()
+
+    def test_sweep_takes_ended_events_out_of_the_catalog(self):
+        self.create_event(1, venue='Arena')
+        self.create_event(10)
+        self.assertEqual(self.counts(catalog_facets(), 'venue'), {'Arena': 1, 'Hall': 1})
+
+        later = timezone.localdate() + datetime.timedelta(days=5)
+        facets.sweep(later)
+        self.assertEqual(self.counts(catalog_facets(), 'venue'), {'Hall': 1})
+        # the promoter's own facets keep ended events
+        self.assertEqual(self.counts(facets.promoter_facets(self.promoter), 'venue'), {'Arena': 1, 'Hall': 1})
+
+        # sweeping the same day again changes nothing
+        facets.sweep(later)
+        self.assertEqual(self.counts(catalog_facets(), 'venue'), {'Hall': 1})
+
+    def test_start_date_window_and_invalid_start_date(self):
+        self.create_event(3)
+        self.create_event(30, category='Comedy')
+        since = timezone.localdate() + datetime.timedelta(days=10)
+        self.assertEqual(self.counts(facets.promoter_facets(self.promoter, since=since), 'category'), {'Comedy': 1})
+
+        client = api_client(self.promoter, 'promoter')
+        response = client.get('/promoter/event_facets', {'start_date': since.isoformat()})
+        self.assertEqual(self.counts(response.json(), 'category'), {'Comedy': 1})
+        self.assertEqual(client.get('/promoter/event_facets', {'start_date': 'last week'}).status_code, 400)
+
+
+class InjuryReportTests(TestCase):
+    """Polling with ?since= returns each incident once, ties on exit time included"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        buyer = Users.objects.create(email='buyer@example.com', firstname='Buy', lastname='Er')
+        cls.event = Event.objects.create(
+            promoter=cls.promoter, title='Concert', description='Live', location='Kampala', venue='Hall',
+            start_date=now - datetime.timedelta(hours=2), end_date=now + datetime.timedelta(hours=3),
+            status='published', max_capacity=500,
+        )
+        ticket_type = TicketType.objects.create(
+            event=cls.event, name='Regular', price=50000, quantity=500, remaining=500,
+            sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now,
+        )
+        create_purchases(ticket_type, buyer, 2)
+        cls.exit_time = now.replace(microsecond=0) - datetime.timedelta(minutes=30)
+        tickets = list(TicketPDF.objects.order_by('id'))
+        # three incidents share an exit time, one normal exit is never reported
+        for ticket, reason in zip(tickets, ('injured', 'emergency', 'injured', 'normal')):
+            TicketPDF.objects.filter(pk=ticket.pk).update(
+                is_used=True, used_at=cls.event.start_date, exit_time=cls.exit_time, exit_reason=reason,
+            )
+        TicketPDF.objects.filter(pk=tickets[4].pk).update(
+            is_used=True, exit_time=cls.exit_time + datetime.timedelta(minutes=5), exit_reason='injured',
+        )
+
+    def setUp(self):
+        self.client = api_client(self.promoter, 'promoter')
+
+    def poll(self, since, url='/promoter/injury_reports/'):
+        return self.client.get(url, {'since': since})
+
+    def test_polling_walks_ties_without_skipping(self):
+        with mock.patch('promoter.views.InjuryReportsView.poll_limit', 2):
+            first = self.poll((self.exit_time - datetime.timedelta(seconds=1)).isoformat()).json()
+            self.assertEqual(len(first['results']), 2)
+            self.assertTrue(first['has_more'])
+            second = self.poll(first['since']).json()
+        self.assertEqual([row['exit_reason'] for row in first['results'] + second['results']],
+                         ['injured', 'emergency', 'injured', 'injured'])
+        self.assertTrue(second['since'].endswith(f"_{TicketPDF.objects.latest('exit_time').id}"))
+
+        third = self.poll(second['since']).json()
+        self.assertEqual(third['results'], [])
+        self.assertFalse(third['has_more'])
+        self.assertEqual(third['since'], second['since'])
+
+    def test_polling_one_event(self):
+        url = f'/promoter/injury_reports/{self.event.id}/'
+        # a bare timestamp includes incidents at that exact time
+        self.assertEqual(len(self.poll(self.exit_time.isoformat(), url).json()['results']), 4)
+        later = (self.exit_time + datetime.timedelta(minutes=1)).isoformat()
+        self.assertEqual(len(self.poll(later, url).json()['results']), 1)
+        self.assertEqual(self.poll(self.exit_time.isoformat(), '/promoter/injury_reports/999999/').status_code, 404)
+
+    def test_invalid_since(self):
+        for since in ('yesterday', '2026-13-01T00:00:00Z', f'{self.exit_time.isoformat()}_abc'):
+            response = self.poll(since)
+            self.assertEqual(response.status_code, 400, since)
+            self.assertEqual(response.json(), {'error': 'Invalid since cursor'})
+
+
+class DashboardTests(TestCase):
+    """Daily rows kept up by the signal handlers and sales equal the ones rebuild() computes"""
+
+    def setUp(self):
+        self.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        self.other = Users.objects.create(email='other@example.com', firstname='Oth', lastname='Er')
+        self.event = self.create_event(self.promoter, 7)
+        self.regular = self.create_ticket_type(self.event, 'Regular', 50000)
+        self.vip = self.create_ticket_type(self.event, 'VIP', 150000)
+        self.other_event = self.create_event(self.other, 7)
+        self.create_ticket_type(self.other_event, 'Regular', 20000)
+
+    def create_event(self, promoter, days):
+        now = timezone.now()
+        return Event.objects.create(
+            promoter=promoter, title='Concert', description='Live', location='Kampala', venue='Hall',
+            start_date=now + datetime.timedelta(days=days), end_date=now + datetime.timedelta(days=days, hours=5),
+            status='published', max_capacity=500,
+        )
+
+    def create_ticket_type(self, event, name, price):
+        now = timezone.now()
+        return TicketType.objects.create(
+            event=event, name=name, price=price, quantity=100, remaining=100,
+            sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now + datetime.timedelta(days=6),
+        )
+
+    def sell(self, ticket_type, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(tickets.sell(ticket_type, quantity))
+
+    def stored(self):
+        # incremental updates can leave a day at zero where rebuild() has no row
+        return sorted(
+            PromoterDailyStats.objects.exclude(events=0, tickets_sold=0, revenue=0)
+            .values_list('promoter_id', 'day', 'events', 'tickets_sold', 'revenue')
+        )
+
+    def assertMatchesRebuild(self):
+        recorded = self.stored()
+        dashboard.rebuild()
+        self.assertEqual(recorded, self.stored())
+        return recorded
+
+    def test_sales_and_edits(self):
+        self.sell(self.regular, 3)
+        self.sell(self.vip, 1)
+        self.sell(TicketType.objects.get(event=self.other_event), 5)
+        self.assertMatchesRebuild()
+        self.assertEqual(dashboard.summary(self.promoter)['total_revenue'], 3 * 50000 + 150000)
+
+        # a price change revalues the tickets already sold
+        self.regular.refresh_from_db()
+        self.regular.price = 60000
+        self.regular.save()
+        self.assertMatchesRebuild()
+        self.assertEqual(dashboard.summary(self.promoter)['total_revenue'], 3 * 60000 + 150000)
+
+    def test_moving_an_event_moves_its_day(self):
+        self.sell(self.regular, 2)
+        self.event.start_date += datetime.timedelta(days=40)
+        self.event.end_date += datetime.timedelta(days=40)
+        self.event.save()
+        recorded = self.assertMatchesRebuild()
+        self.assertIn((self.promoter.id, timezone.localtime(self.event.start_date).date(), 1, 2, 100000), recorded)
+
+        late = self.create_event(self.promoter, 47)
+        self.create_ticket_type(late, 'Regular', 10000)
+        recorded = self.assertMatchesRebuild()
+        self.assertIn((self.promoter.id, timezone.localtime(self.event.start_date).date(), 2, 2, 100000), recorded)
+
+    def test_deletes(self):
+        self.sell(self.regular, 2)
+        self.sell(self.vip, 1)
+        self.vip.delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(dashboard.summary(self.promoter)['tickets_sold'], 2)
+
+        # the ticket types go first in the cascade, then the event itself
+        self.event.delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(dashboard.summary(self.promoter),
+                         {'total_events': 0, 'tickets_sold': 0, 'total_revenue': 0, 'monthly_events': []})
+        self.assertEqual(dashboard.summary(self.other)['total_events'], 1)
+
+
+@override_settings(BACKGROUND_TASKS={'WORKERS': 1, 'EAGER': True})
+class ReportJobTests(LocalStorageTestCase):
+    """A report is rendered once per state of its data, and lost jobs are picked up again"""
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        self.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        self.event = Event.objects.create(
+            promoter=self.promoter, title='Concert', description='Live', location='Kampala', venue='Hall',
+            start_date=now + datetime.timedelta(days=7), end_date=now + datetime.timedelta(days=7, hours=5),
+            status='published', max_capacity=500,
+        )
+        self.ticket_type = TicketType.objects.create(
+            event=self.event, name='Regular', price=50000, quantity=500, remaining=500,
+            sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now + datetime.timedelta(days=6),
+        )
+        self.client = api_client(self.promoter, 'promoter')
+        self.url = f'/promoter/events/{self.event.id}/report/jobs/'
+
+    def request_report(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url)
+
+    def queue(self, status='pending', started_at=None):
+        return ReportJob.objects.create(
+            event=self.event, requested_by=self.promoter, fingerprint=reports.fingerprint(self.event),
+            status=status, started_at=started_at,
+        )
+
+    def test_unchanged_data_reuses_the_report(self):
+        # the job runs once the request's transaction commits
+        self.assertEqual(self.request_report().status_code, 202)
+        job = ReportJob.objects.get()
+        self.assertEqual(job.status, 'done')
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, 'private', job.artifact_path)))
+
+        with mock.patch('promoter.reports.render_pdf') as render_pdf:
+            again = self.request_report()
+        render_pdf.assert_not_called()
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['id'], job.id)
+
+        status_response = self.client.get(f'/promoter/report_jobs/{job.id}/')
+        self.assertTrue(status_response.json()['download_url'])
+
+    def test_changes_render_a_new_report(self):
+        first = self.request_report().json()['id']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(tickets.sell(self.ticket_type, 2))
+        after_sale = self.request_report().json()['id']
+        self.assertNotEqual(after_sale, first)
+
+        self.ticket_type.refresh_from_db()
+        self.ticket_type.price = 60000
+        self.ticket_type.save()
+        self.assertNotEqual(self.request_report().json()['id'], after_sale)
+        self.assertEqual(ReportJob.objects.filter(status='done').count(), 3)
+
+    def test_in_flight_job_is_reused_until_stale(self):
+        pending = self.queue()
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['id'], pending.id)
+
+        ReportJob.objects.filter(pk=pending.pk).update(created_at=timezone.now() - 2 * reports.STALE_AFTER)
+        self.assertNotEqual(self.request_report().json()['id'], pending.id)
+
+    def test_recover_jobs(self):
+        pending = self.queue()
+        lost = self.queue('running', timezone.now() - 2 * reports.STALE_AFTER)
+        running = self.queue('running', timezone.now())
+
+        self.assertEqual(reports.recover_jobs(), 2)
+        statuses = dict(ReportJob.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {pending.pk: 'done', lost.pk: 'done', running.pk: 'running'})
+        self.assertEqual(reports.recover_jobs(), 0)
+
+    def test_failed_render_is_recorded(self):
+        job = self.queue()
+        with mock.patch('promoter.reports.render_pdf', side_effect=RuntimeError('out of paper')):
+            with self.assertRaises(RuntimeError):
+                reports.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'out of paper'))
+        # a claimed job is never run twice
+        reports.run_job(job.pk)
+        self.assertEqual(ReportJob.objects.get(pk=job.pk).status, 'failed')
+
+
+class TicketDetailsStreamTests(TestCase):
+    """Streamed ticket details come from one query, however many tickets there are"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        cls.other = Users.objects.create(email='other@example.com', firstname='Oth', lastname='Er')
+        buyer = Users.objects.create(email='buyer@example.com', firstname='Buy', lastname='Er')
+        cls.events = []
+        for promoter in (cls.promoter, cls.promoter, cls.other):
+            event = Event.objects.create(
+                promoter=promoter, title='Concert', description='Live', location='Kampala', venue='Hall',
+                start_date=now + datetime.timedelta(days=7), end_date=now + datetime.timedelta(days=7, hours=5),
+                status='published', max_capacity=500,
+            )
+            ticket_type = TicketType.objects.create(
+                event=event, name='Regular', price=50000, quantity=500, remaining=500,
+                sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now + datetime.timedelta(days=6),
+            )
+            create_purchases(ticket_type, buyer, 4)
+            cls.events.append(event)
+
+    def setUp(self):
+        self.client = api_client(self.promoter, 'promoter')
+
+    def read(self, response):
+        # a streaming body runs its query as it is read
+        return b''.join(response.streaming_content)
+
+    def test_json_array(self):
+        response = self.client.get('/promoter/tickets_details/', {'output': 'stream'})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        # the ticket query only; the two user lookups ran with the request
+        with self.assertNumQueries(1):
+            tickets = json.loads(self.read(response))
+        self.assertEqual(len(tickets), 24)
+        self.assertEqual([ticket['ticket_id'] for ticket in tickets], sorted(ticket['ticket_id'] for ticket in tickets))
+        self.assertEqual({ticket['event']['id'] for ticket in tickets}, {self.events[0].id, self.events[1].id})
+
+    def test_ndjson_for_one_event(self):
+        response = self.client.get(
+            '/promoter/tickets_details/', {'event_id': self.events[1].id}, HTTP_ACCEPT='application/x-ndjson'
+        )
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = self.read(response).decode().splitlines()
+        self.assertEqual(len(lines), 12)
+        self.assertEqual({json.loads(line)['event']['id'] for line in lines}, {self.events[1].id})
+
+    def test_event_id_is_checked(self):
+        response = self.client.get('/promoter/tickets_details/', {'event_id': 'abc', 'output': 'stream'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/promoter/tickets_details/', {'event_id': self.events[2].id, 'output': 'stream'})
+        self.assertEqual(response.status_code, 403)
+
+
+class ReportStatsTests(TestCase):
+    """Report figures come from the rollups, in a fixed number of queries, and match the raw rows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        cls.buyer = Users.objects.create(email='buyer@example.com', firstname='Buy', lastname='Er')
+        cls.event = Event.objects.create(
+            promoter=cls.promoter, title='Concert', description='Live', location='Kampala', venue='Hall',
+            start_date=now - datetime.timedelta(hours=1), end_date=now + datetime.timedelta(hours=5),
+            status='published', max_capacity=500,
+        )
+        cls.ticket_types = [TicketType.objects.create(
+            event=cls.event, name=name, price=price, quantity=100, remaining=100,
+            sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now,
+        ) for name, price in (('Regular', 50000), ('VIP', 150000), ('VVIP', 300000))]
+        # two purchases of three tickets per ticket type; the first one is paid
+        for ticket_type in cls.ticket_types:
+            paid, _ = create_purchases(ticket_type, cls.buyer, 2)
+            Purchase.objects.filter(pk=paid.pk).update(payment_status='completed')
+        tickets = list(TicketPDF.objects.order_by('id'))
+        TicketPDF.objects.filter(pk__in=[ticket.pk for ticket in tickets[:5]]).update(
+            is_used=True, used_at=now - datetime.timedelta(minutes=50)
+        )
+        TicketPDF.objects.filter(pk__in=[ticket.pk for ticket in tickets[:2]]).update(exit_time=now)
+        TicketPDF.objects.filter(pk=tickets[2].pk).update(exit_time=now, exit_reason='injured')
+        stats.rebuild([cls.event.id])
+
+    def report(self):
+        client = api_client(self.promoter, 'promoter')
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/promoter/events/{self.event.id}/report/', {'format': 'json'})
+        return response.json(), len(queries)
+
+    def test_report_figures(self):
+        report, _ = self.report()
+        self.assertEqual(report['stats'], {
+            'total_tickets_sold': 18, 'total_revenue': 3 * (50000 + 150000 + 300000), 'total_attendees': 18,
+            'attended_count': 5, 'normal_exits': 2, 'injured_exits': 1, 'still_inside': 2, 'unused_tickets': 13,
+        })
+        self.assertEqual([(row['name'], row['sold'], row['revenue']) for row in report['ticket_types']],
+                         [('Regular', 6, 150000), ('VIP', 6, 450000), ('VVIP', 6, 900000)])
+        self.assertEqual(len(report['injured_attendees']), 1)
+
+    def test_query_count_is_independent_of_ticket_types(self):
+        _, queries = self.report()
+        now = timezone.now()
+        for i in range(5):
+            ticket_type = TicketType.objects.create(
+                event=self.event, name=f'Tier {i}', price=1000, quantity=100, remaining=100,
+                sale_start_date=now - datetime.timedelta(days=1), sale_end_date=now,
+            )
+            create_purchases(ticket_type, self.buyer, 1)
+        stats.rebuild([self.event.id])
+        report, more_queries = self.report()
+        self.assertEqual(len(report['ticket_types']), 8)
+        self.assertEqual(more_queries, queries)
+
+    def test_recorded_changes_match_a_recount(self):
+        ticket = TicketPDF.objects.filter(is_used=False).select_related('purchase').first()
+        TicketPDF.objects.filter(pk=ticket.pk).update(is_used=True, used_at=timezone.now())
+        stats.record_entry(ticket.purchase.ticket_type_id)
+        TicketPDF.objects.filter(pk=ticket.pk).update(exit_time=timezone.now(), exit_reason='emergency')
+        stats.record_exit(ticket.purchase.ticket_type_id, 'emergency')
+
+        purchase = Purchase.objects.filter(payment_status='pending').first()
+        with self.captureOnCommitCallbacks(execute=True), \
+                override_settings(MEDIA_ROOT=tempfile.gettempdir()):
+            self.assertTrue(tickets.approve_purchase(purchase.pk))
+
+        self.assertEqual(stats.verify([self.event.id]), [])
+        self.assertEqual(self.report()[0]['stats']['injured_exits'], 2)
@@ -0,0 +1,340 @@
+"""Ticket issuance shared by promoter approval and mobile-money callbacks.
+
+Approval and issuance are separate steps, since issuing renders and uploads
+a PDF per attendee. A purchase records both: issue_tickets() first claims it
+(tickets_issue_started_at) so only one worker issues at a time, and saves the
+tickets together with tickets_issued_at. An approved purchase whose issuance
+died with its worker is therefore still visible as owed tickets, and
+recover_issues() (the issue_pending_tickets command) issues them again.
+"""
+import datetime
+import logging
+import os
+from io import BytesIO
+import qrcode
+import requests
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.html import format_html
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from client import payments
+from client.models import Purchase, TicketPDF
+from ezevent.response_cache import bump_event_versions
+from ezevent.storage import get_storage
+from .models import TicketType
+from . import dashboard, stats
+
+logger = logging.getLogger(__name__)
+
+# An issuance claimed this long ago without finishing is presumed dead and may be taken over
+ISSUE_STALE_AFTER = datetime.timedelta(minutes=15)
+
+
+def sell(ticket_type, quantity):
+    """Taking tickets off a ticket type's stock, returning False if too few remain.
+
+    A single conditional UPDATE decrements the stock, so concurrent purchases
+    can neither lose a sale nor oversell. It bypasses the save signals, so the
+    purchase rollups, the promoter dashboard and the response caches are all
+    updated here, in the caller's transaction.
+    """
+    with transaction.atomic():
+        sold = TicketType.objects.filter(pk=ticket_type.pk, remaining__gte=quantity).update(
+            remaining=F('remaining') - quantity, version=F('version') + 1
+        ) == 1
+        if not sold:
+            return False
+        ticket_type.remaining, ticket_type.version = TicketType.objects.filter(
+            pk=ticket_type.pk
+        ).values_list('remaining', 'version').get()
+        stats.record_purchase(ticket_type.pk, quantity)
+        dashboard.record_sale(ticket_type, quantity)
+        # a sale only shows on the catalog when it sells the ticket type out; bumping after
+        # commit keeps a concurrent read from caching the old stock under the new version
+        event_id, catalog = ticket_type.event_id, ticket_type.remaining == 0
+        transaction.on_commit(lambda: bump_event_versions(event_id, catalog=catalog))
+    return True
+
+
+def approve_purchase(purchase_id):
+    """Marking a purchase as paid, returning False if it was already approved.
+
+    The conditional UPDATE makes approval idempotent, so a promoter click and
+    a provider callback arriving together only issue tickets once.
+    """
+    with transaction.atomic():
+        approved = Purchase.objects.filter(
+            pk=purchase_id,
+            is_approved_by_promoter=False
+        ).update(
+            is_approved_by_promoter=True,
+            payment_status='completed',
+            approval_date=timezone.now()
+        ) == 1
+        if approved:
+            stats.record_approval(purchase_id)
+    return approved
+
+
+def claim_issue(purchase_id):
+    """Claiming an approved purchase's issuance, returning the claim time or None if done or in progress"""
+    now = timezone.now()
+    claimed = Purchase.objects.filter(
+        pk=purchase_id, is_approved_by_promoter=True, tickets_issued_at__isnull=True
+    ).filter(
+        Q(tickets_issue_started_at__isnull=True) | Q(tickets_issue_started_at__lt=now - ISSUE_STALE_AFTER)
+    ).update(tickets_issue_started_at=now)
+    return now if claimed else None
+
+
+def issue_tickets(purchase, approved_by):
+    """Issuing an approved purchase's tickets once, returning their info or None if that is not ours to do"""
+    claimed_at = claim_issue(purchase.pk)
+    if claimed_at is None:
+        return None
+    try:
+        return _issue_tickets(purchase, approved_by, claimed_at)
+    except Exception:
+        # handing the purchase straight back, rather than after ISSUE_STALE_AFTER
+        Purchase.objects.filter(pk=purchase.pk, tickets_issue_started_at=claimed_at).update(
+            tickets_issue_started_at=None
+        )
+        raise
+
+
+def _issue_tickets(purchase, approved_by, claimed_at):
+    """Generating, storing and emailing a QR-coded PDF ticket per attendee of an approved purchase"""
+    # Creating a temp directory for QR codes
+    temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp')
+    os.makedirs(temp_dir, exist_ok=True)
+    
+    # Get attendees or create a default one if none exist
+    from client.models import PurchaseAttendee, Attendee
+    purchase_attendees = PurchaseAttendee.objects.filter(purchase=purchase)
+    
+    if not purchase_attendees.exists():
+        # If no attendees were specified, create a default one using purchaser info
+        default_attendee = Attendee.objects.create(
+            first_name="Guest",
+            last_name="Attendee",
+            email=purchase.purchaser_email,
+            phone=purchase.purchaser_phone
+        )
+        purchase_attendee = PurchaseAttendee.objects.create(
+            purchase=purchase,
+            attendee=default_attendee
+        )
+        purchase_attendees = [purchase_attendee]
+    
+    # Storing all generated PDFs and their info
+    ticket_pdfs = []
+    
+    # Generating a PDF for each attendee
+    for idx, purchase_attendee in enumerate(purchase_attendees):
+        attendee = purchase_attendee.attendee
+        
+        # Generating QR code with attendee-specific info
+        qr_data = {
+            'purchase_id': purchase.id,
+            'event': purchase.ticket_type.event.title,
+            'ticket_type': purchase.ticket_type.name,
+            'attendee_id': attendee.id,
+            'attendee_name': f"{attendee.first_name} {attendee.last_name}",
+            'attendee_email': attendee.email,
+            'approved_by': approved_by,
+            'approval_date': purchase.approval_date.isoformat(),
+            'used': False  
+        }
+        
+        qr = qrcode.QRCode(
+            version=1,
+            error_correction=qrcode.constants.ERROR_CORRECT_L,
+            box_size=10,
+            border=4,
+        )
+        qr.add_data(str(qr_data))
+        qr.make(fit=True)
+        
+        img = qr.make_image(fill_color="black", back_color="white")
+        
+        # Saving QR code to temp directory
+        temp_qr_path = os.path.join(temp_dir, f'temp_qr_{purchase.id}_{attendee.id}.png')
+        img.save(temp_qr_path)
+        
+        # Generating PDF filename
+        pdf_filename = f'ticket_{purchase.id}_{attendee.id}.pdf'
+        
+        # Generating PDF in memory
+        pdf_buffer = BytesIO()
+        c = canvas.Canvas(pdf_buffer, pagesize=letter)
+
+        c.setFont("Helvetica-Bold", 24)
+        c.drawCentredString(letter[0]/2, 10*inch, purchase.ticket_type.event.title)
+
+        c.setFont("Helvetica", 14)
+        c.drawCentredString(letter[0]/2, 9.5*inch, f"Date: {purchase.ticket_type.event.start_date.strftime('%B %d, %Y')}")
+        c.drawCentredString(letter[0]/2, 9.2*inch, f"Time: {purchase.ticket_type.event.start_date.strftime('%I:%M %p')} - {purchase.ticket_type.event.end_date.strftime('%I:%M %p')}")
+        c.drawCentredString(letter[0]/2, 8.9*inch, f"Location: {purchase.ticket_type.event.location}")
+
+        # Adding ticket information
+        c.setFont("Helvetica-Bold", 16)
+        c.drawCentredString(letter[0]/2, 8*inch, f"Ticket: {purchase.ticket_type.name}")
+
+        c.setFont("Helvetica", 12)
+        c.drawCentredString(letter[0]/2, 7.5*inch, f"Purchase Date: {purchase.purchase_date.strftime('%B %d, %Y')}")
+
+        c.drawImage(temp_qr_path, letter[0]/2 - 2*inch, 3.5*inch, width=4*inch, height=4*inch)
+
+        c.setFont("Helvetica", 10)
+        c.drawCentredString(letter[0]/2, 2.5*inch, "Please present this QR code at the event entrance")
+
+        c.setFont("Helvetica", 8)
+        c.drawCentredString(letter[0]/2, 1*inch, "This ticket is valid only for the named event and date.")
+        c.drawCentredString(letter[0]/2, 0.8*inch, f"This ticket is for one person only and is non-transferable.")
+
+        c.save()
+        
+        pdf_buffer.seek(0)
+        pdf_content = pdf_buffer.getvalue()
+        
+        # Uploading to storage, publicly accessible
+        pdf_url = get_storage().upload_bytes(pdf_content, f'tickets/{pdf_filename}', content_type='application/pdf')
+        
+        ticket_info = {
+            'attendee_id': attendee.id,
+            'attendee_name': f"{attendee.first_name} {attendee.last_name}",
+            'attendee_email': attendee.email,
+            'filename': pdf_filename,
+            'firebase_url': pdf_url
+        }
+        ticket_pdfs.append(ticket_info)
+        
+        # Cleaning up QR code temp file
+        try:
+            os.remove(temp_qr_path)
+        except:
+            pass
+    
+    with transaction.atomic():
+        # a claim taken over as stale may have finished first; its tickets stand
+        finished = Purchase.objects.filter(
+            pk=purchase.pk, tickets_issued_at__isnull=True, tickets_issue_started_at=claimed_at
+        ).update(tickets_issued_at=timezone.now())
+        if not finished:
+            return None
+        for idx, ticket_info in enumerate(ticket_pdfs):
+            TicketPDF.objects.create(
+                purchase_id=purchase.id,
+                attendee_id=ticket_info['attendee_id'],
+                pdf_url=ticket_info['firebase_url'],
+                is_used=False
+            )
+            
+            if idx == 0: 
+                purchase.ticket_pdf_url = ticket_info['firebase_url']
+                Purchase.objects.filter(pk=purchase.pk).update(ticket_pdf_url=purchase.ticket_pdf_url)
+        stats.record_tickets_issued(purchase.ticket_type_id, len(ticket_pdfs))
+
+    send_payment_approval_email(purchase, ticket_pdfs)
+
+    return ticket_pdfs
+
+
+def issue_tickets_for(purchase_id, approved_by):
+    """Background entry point, loading the purchase by id"""
+    purchase = Purchase.objects.select_related('ticket_type__event').get(pk=purchase_id)
+    return issue_tickets(purchase, approved_by)
+
+
+def pending_issues():
+    """Approved purchases still owed their tickets and not being issued right now"""
+    return Purchase.objects.filter(is_approved_by_promoter=True, tickets_issued_at__isnull=True).filter(
+        Q(tickets_issue_started_at__isnull=True)
+        | Q(tickets_issue_started_at__lt=timezone.now() - ISSUE_STALE_AFTER)
+    )
+
+
+def approver_name(purchase):
+    """Who approved a purchase, for its QR code: the provider that was paid, or the promoter"""
+    provider = payments.get_provider(purchase.payment_method) if purchase.transaction_reference else None
+    return provider.display_name if provider else purchase.ticket_type.event.promoter.get_full_name()
+
+
+def recover_issues():
+    """Issuing the tickets of approved purchases that never got them; returns how many were issued"""
+    issued = 0
+    purchases = pending_issues().select_related('ticket_type__event__promoter').order_by('approval_date')
+    for purchase in purchases:
+        try:
+            if issue_tickets(purchase, approver_name(purchase)) is not None:
+                issued += 1
+        except Exception:
+            logger.exception(f"Issuing tickets for purchase {purchase.pk} failed")
+    return issued
+
+
+def send_payment_approval_email(purchase, ticket_pdfs):
+    event = purchase.ticket_type.event
+    subject = f'Payment Approved for {event.title}'
+    
+    attendee_tickets_html = ""
+    for ticket_info in ticket_pdfs:
+        attendee_tickets_html += format_html("""
+            <p><strong>{name}:</strong> <a href="{ticket_url}" 
+            style="display: inline-block; padding: 10px 20px; color: white; background-color: #007bff; 
+            text-decoration: none; border-radius: 5px;">Download Ticket</a></p>
+        """, name=ticket_info['attendee_name'], ticket_url=ticket_info['firebase_url'])
+    
+    message = format_html("""
+        <html>
+        <body>
+            <p>Hello {customer_name},</p>
+            
+            <p>Great news! Your payment for <strong>{event_title}</strong> has been approved. Your tickets are now ready.</p>
+            
+            <h2>Event Details</h2>
+            <p><strong>Event:</strong> {event_title}</p>
+            <p><strong>Date:</strong> {event_date}</p>
+            <p><strong>Time:</strong> {event_time}</p>
+            <p><strong>Location:</strong> {event_location}</p>
+            <p><strong>Ticket Type:</strong> {ticket_type}</p>
+            <p><strong>Number of Tickets:</strong> {ticket_count}</p>
+            
+            <h2>Your Tickets</h2>
+                          
+            <p>You can access your tickets in the attachments section below</p>
+            
+            <p>Please present these tickets (either printed or on your mobile device) at the event entrance.</p>
+            
+            <p>Thank you for your purchase. We look forward to seeing you at the event!</p>
+            <p>If you have any questions, please contact our support team.</p>
+            
+            <p>Best regards,<br>The Ezevent Team</p>
+        </body>
+        </html>
+    """, 
+    customer_name=purchase.purchaser_name if hasattr(purchase, 'purchaser_name') else "Customer",
+    event_title=event.title,
+    event_date=event.start_date.strftime('%B %d, %Y'),
+    event_time=f"{event.start_date.strftime('%I:%M %p')} - {event.end_date.strftime('%I:%M %p')}",
+    event_location=event.location,
+    ticket_type=purchase.ticket_type.name,
+    ticket_count=len(ticket_pdfs),
+    attendee_tickets=attendee_tickets_html)
+    
+    email_message = EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, [purchase.purchaser_email])
+    email_message.content_subtype = 'html'
+    
+    # Attaching PDF tickets to the email
+    for ticket_info in ticket_pdfs:
+        pdf_response = requests.get(ticket_info['firebase_url'])
+        if pdf_response.status_code == 200:
+            filename = f"Ticket - {event.title} - {ticket_info['attendee_name']}.pdf"
+            email_message.attach(filename, pdf_response.content, 'application/pdf')
+    
+    email_message.send(fail_silently=False)
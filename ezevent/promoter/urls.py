@@ -17,9 +17,11 @@ urlpatterns = [
     path('event_summary/<int:event_id>/', views.EventSummaryView.as_view(), name='event_summary'),
 
     path('search_events', views.SearchEventsView.as_view(), name='search_events'),
+    path('event_facets', views.EventFacetsView.as_view(), name='event_facets'),
     path('bulk_create_tickets/<int:event_id>/', views.BulkCreateTicketsView.as_view(), name='bulk_create_tickets'),
     path('event_analytics', views.EventAnalyticsView.as_view(), name='event_analytics'),
     path('event_analytics/<int:event_id>/', views.SingleEventAnalyticsView.as_view(), name='single_event_analytics'),
+    path('event_sales/<int:event_id>/', views.SalesSeriesView.as_view(), name='event_sales'),
 
     path('pending_payments', views.PendingPaymentsListView.as_view(), name='pending_payments'),
     path('purchase/<int:purchase_id>/approve', views.PromoterPaymentApprovalView.as_view(), name='approve_payment'),
@@ -29,6 +31,11 @@ urlpatterns = [
 
     path('tickets_details/', views.TicketDetailsView.as_view(), name='ticket-list'),
     path('tickets_details/<int:ticket_id>/', views.TicketDetailsView.as_view(), name='ticket-detail'),
+    path('injury_reports/', views.InjuryReportsView.as_view(), name='injury-reports'),
+    path('injury_reports/<int:event_id>/', views.InjuryReportsView.as_view(), name='event-injury-reports'),
 
     path('events/<int:event_id>/report/', views.EventReportPDFView.as_view(), name='event-report-pdf'),
+    path('events/<int:event_id>/report/jobs/', views.EventReportJobView.as_view(), name='event-report-jobs'),
+    path('report_jobs/<int:job_id>/', views.ReportJobStatusView.as_view(), name='report-job-status'),
+    path('events/<int:event_id>/export/<slug:dataset>.<slug:export_format>', views.EventExportView.as_view(), name='event-export'),
 ]
\ No newline at end of file
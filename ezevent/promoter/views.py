@@ -2,30 +2,32 @@ from rest_framework.exceptions import NotFound
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Event, TicketType
-from .serializers import EventSerializer, TicketTypeSerializer
-from django.db.models import Q, Count, Sum, F
-from django.db.models.functions import TruncMonth, TruncDay
+from .models import Event, ReportJob, TicketType
+from .serializers import EventSerializer, ReportJobSerializer, TicketTypeSerializer
+from django.db import transaction
+from django.db.models import Q
 from rest_framework.views import APIView
-from datetime import datetime, timedelta
+from datetime import timedelta, timezone as dt_timezone
 from django.conf import settings
 from django.core.files.base import ContentFile
 from client.models import Purchase, TicketPDF
 from client.serializers import PurchaseSerializer
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 import jwt
 import ast
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-import qrcode
-import os
-import uuid
 from io import BytesIO
-from ezevent.firebase_config import bucket
-from django.core.mail import EmailMessage
-from django.utils.html import format_html
-import requests
+from ezevent.storage import get_storage, unique_path
+from ezevent.images import schedule_variants
+from ezevent.pagination import KeysetPagination
+from ezevent.streaming import stream_json, wants_ndjson
+from ezevent.renderers import NDJSONRenderer
+from rest_framework.settings import api_settings
+from ezevent.sparse import SparseFieldsViewMixin
+from ezevent.conditional import ConditionalGetMixin, event_state, ticket_type_state
+from .tickets import approve_purchase, issue_tickets
+from .search import search
+from . import dashboard, exports, facets, reports, sales, stats
 from django.http import HttpResponse
 from django.template.loader import get_template
 from django.utils import timezone
@@ -43,26 +45,16 @@ class CreateEventView(generics.CreateAPIView):
         
         data = request.data.copy()
         
+        image_path = None
         if event_image:
             try:
-                file_content = event_image.read()
-                file_name = event_image.name
-                file_ext = os.path.splitext(file_name)[1]
-
-                timestamp = int(datetime.now().timestamp() * 1000)
-                unique_filename = f"{timestamp}_{uuid.uuid4().hex}{file_ext}"
-
-                firebase_path = f"event_images/{unique_filename}"
-                blob = bucket.blob(firebase_path)
-                
-                blob.upload_from_string(
-                    file_content,
+                image_path = unique_path('event_images', event_image.name)
+                image_url = get_storage().upload_file(
+                    event_image,
+                    image_path,
                     content_type=event_image.content_type
                 )
                 
-                blob.make_public()
-                image_url = blob.public_url
-                
                 data['profile_pic'] = image_url
                 
                 if 'image' in data:
@@ -77,26 +69,44 @@ class CreateEventView(generics.CreateAPIView):
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
+
+        if image_path:
+            schedule_variants(Event, serializer.instance.pk, 'profile_pic', 'image_variants', image_url, image_path)
+
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     def perform_create(self, serializer):
         serializer.save(promoter=self.request.user)
 
-class ListEventsView(generics.ListAPIView):
+class ListEventsView(ConditionalGetMixin, SparseFieldsViewMixin, generics.ListAPIView):
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-start_date', '-id')
+
+    def get_validator_state(self):
+        state = event_state(Event.objects.filter(promoter=self.request.user))
+        tickets = ticket_type_state(TicketType.objects.filter(event__promoter=self.request.user))
+        return {**state, **tickets}, state['last_modified']
 
     def get_queryset(self):
-        return Event.objects.filter(promoter=self.request.user)
+        return self.sparse_queryset(Event.objects.filter(promoter=self.request.user))
 
-class EventDetailView(generics.RetrieveAPIView):
+class EventDetailView(ConditionalGetMixin, SparseFieldsViewMixin, generics.RetrieveAPIView):
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticated]
     lookup_url_kwarg = 'event_id'
 
+    def get_validator_state(self):
+        events = Event.objects.filter(pk=self.kwargs['event_id'], promoter=self.request.user)
+        state = event_state(events)
+        if not state['event_count']:
+            return None, None
+        tickets = ticket_type_state(TicketType.objects.filter(event__in=events))
+        return {**state, **tickets}, state['last_modified']
+
     def get_queryset(self):
-        return Event.objects.filter(promoter=self.request.user)
+        return self.sparse_queryset(Event.objects.filter(promoter=self.request.user))
 
 class UpdateEventView(generics.UpdateAPIView):
     serializer_class = EventSerializer
@@ -113,26 +123,16 @@ class UpdateEventView(generics.UpdateAPIView):
         
         data = request.data.copy()
         
+        image_path = None
         if event_image:
             try:
-                file_content = event_image.read()
-                file_name = event_image.name
-                file_ext = os.path.splitext(file_name)[1]
-
-                timestamp = int(datetime.now().timestamp() * 1000)
-                unique_filename = f"{timestamp}_{uuid.uuid4().hex}{file_ext}"
-
-                firebase_path = f"event_images/{unique_filename}"
-                blob = bucket.blob(firebase_path)
-                
-                blob.upload_from_string(
-                    file_content,
+                image_path = unique_path('event_images', event_image.name)
+                image_url = get_storage().upload_file(
+                    event_image,
+                    image_path,
                     content_type=event_image.content_type
                 )
                 
-                blob.make_public()
-                image_url = blob.public_url
-                
                 data['profile_pic'] = image_url
 
                 if 'image' in data:
@@ -148,6 +148,9 @@ class UpdateEventView(generics.UpdateAPIView):
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
 
+        if image_path:
+            schedule_variants(Event, instance.pk, 'profile_pic', 'image_variants', image_url, image_path)
+
         if getattr(instance, '_prefetched_objects_cache', None):
             instance._prefetched_objects_cache = {}
 
@@ -206,15 +209,16 @@ class CreateTicketView(generics.CreateAPIView):
         except Event.DoesNotExist:
             raise NotFound("Event not found or you don't have permission to add tickets to this event")
 
-class ListTicketsView(generics.ListAPIView):
+class ListTicketsView(SparseFieldsViewMixin, generics.ListAPIView):
     serializer_class = TicketTypeSerializer
     permission_classes = [IsAuthenticated]
+    keyset_ordering = 'id'
 
     def get_queryset(self):
-        return TicketType.objects.filter(
+        return self.sparse_queryset(TicketType.objects.filter(
             event_id=self.kwargs['event_id'],
             event__promoter=self.request.user
-        )
+        ))
 
 class UpdateTicketView(generics.UpdateAPIView):
     serializer_class = TicketTypeSerializer
@@ -237,18 +241,16 @@ class EventSummaryView(generics.RetrieveAPIView):
     def get(self, request, event_id):
         try:
             event = Event.objects.get(id=event_id, promoter=request.user)
-            ticket_types = event.ticket_types.all()
+            ticket_types = stats.ticket_type_stats(event.id)
             
             summary = {
                 'event_name': event.title,
-                'total_tickets': sum(tt.quantity for tt in ticket_types),
-                'tickets_sold': sum(tt.quantity - tt.remaining for tt in ticket_types),
-                'revenue': sum((tt.quantity - tt.remaining) * tt.price for tt in ticket_types),
+                **stats.inventory_totals(ticket_types),
                 'ticket_types': [{
-                    'name': tt.name,
-                    'sold': tt.quantity - tt.remaining,
-                    'remaining': tt.remaining,
-                    'revenue': (tt.quantity - tt.remaining) * tt.price
+                    'name': tt['name'],
+                    'sold': tt['sold'],
+                    'remaining': tt['remaining'],
+                    'revenue': tt['revenue']
                 } for tt in ticket_types]
             }
             
@@ -259,26 +261,28 @@ class EventSummaryView(generics.RetrieveAPIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-class SearchEventsView(generics.ListAPIView):
+class SearchEventsView(SparseFieldsViewMixin, generics.ListAPIView):
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticated]
 
+    @property
+    def keyset_ordering(self):
+        # Ranked by relevance when there is a search term
+        if self.request.query_params.get('search'):
+            return ('-rank', '-id')
+        return ('-start_date', '-id')
+
     def get_queryset(self):
-        queryset = Event.objects.filter(promoter=self.request.user)
+        queryset = self.sparse_queryset(Event.objects.filter(promoter=self.request.user))
         
         # Search parameters
         search_term = self.request.query_params.get('search', None)
         start_date = self.request.query_params.get('start_date', None)
         end_date = self.request.query_params.get('end_date', None)
         status = self.request.query_params.get('status', None)
-        category = self.request.query_params.get('category', None)
         
         if search_term:
-            queryset = queryset.filter(
-                Q(title__icontains=search_term) |
-                Q(description__icontains=search_term) |
-                Q(location__icontains=search_term)
-            )
+            queryset = search(queryset, search_term)
         
         if start_date:
             queryset = queryset.filter(start_date__gte=start_date)
@@ -289,11 +293,27 @@ class SearchEventsView(generics.ListAPIView):
         if status:
             queryset = queryset.filter(status=status)
             
-        if category:
-            queryset = queryset.filter(category=category)
+        for dimension in ('category', 'venue', 'location'):
+            value = self.request.query_params.get(dimension)
+            if value:
+                queryset = queryset.filter(**{dimension: value})
             
         return queryset
 
+class EventFacetsView(APIView):
+    """Counts of the promoter's events per status, category, venue and location"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        since = request.query_params.get('start_date')
+        if since:
+            moment = sales.parse_moment(since)
+            if moment is None:
+                return Response({'error': 'Invalid start_date, expected YYYY-MM-DD'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            since = timezone.localtime(moment).date()
+        return Response(facets.promoter_facets(request.user, since=since))
+
 class BulkCreateTicketsView(generics.CreateAPIView):
     serializer_class = TicketTypeSerializer
     permission_classes = [IsAuthenticated]
@@ -338,43 +358,41 @@ class EventAnalyticsView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        # Get date range from query params or default to last 30 days
-        end_date = datetime.now()
-        start_date = self.request.query_params.get(
-            'start_date', 
-            (end_date - timedelta(days=30)).strftime('%Y-%m-%d')
-        )
-        
-        events = Event.objects.filter(
-            promoter=request.user,
-            start_date__gte=start_date
-        )
+        # Date range of event start days from query params, defaulting to the last 30 days
+        days = {'start_date': timezone.localdate() - timedelta(days=30), 'end_date': None}
+        for name in days:
+            value = request.query_params.get(name)
+            if value:
+                moment = sales.parse_moment(value)
+                if moment is None:
+                    return Response({'error': f'Invalid {name}, expected YYYY-MM-DD'},
+                                    status=status.HTTP_400_BAD_REQUEST)
+                days[name] = timezone.localtime(moment).date()
+        start_date, end_date = days['start_date'], days['end_date']
+
+        upcoming = Event.objects.filter(promoter=request.user, start_date__gt=timezone.now())
+        if start_date > timezone.localdate():
+            upcoming = upcoming.filter(start_date__date__gte=start_date)
+        if end_date:
+            upcoming = upcoming.filter(start_date__date__lte=end_date)
+
+        summary = dashboard.summary(request.user, start_date, end_date)
+        event_facets = facets.promoter_facets(request.user, since=start_date, until=end_date)
 
         analytics = {
-            'total_events': events.count(),
-            'upcoming_events': events.filter(start_date__gt=datetime.now()).count(),
-            'total_revenue': events.annotate(
-                revenue=Sum(F('ticket_types__quantity') - F('ticket_types__remaining')) * 
-                       F('ticket_types__price')
-            ).aggregate(total=Sum('revenue'))['total'] or 0,
-            
-            'tickets_sold': events.annotate(
-                sold=Sum(F('ticket_types__quantity') - F('ticket_types__remaining'))
-            ).aggregate(total=Sum('sold'))['total'] or 0,
-            
-            'monthly_events': events.annotate(
-                month=TruncMonth('start_date')
-            ).values('month').annotate(
-                count=Count('id')
-            ).order_by('month'),
-            
-            'events_by_category': events.values('category').annotate(
-                count=Count('id')
-            ).order_by('-count'),
-            
-            'popular_venues': events.values('venue').annotate(
-                count=Count('id')
-            ).order_by('-count')[:5]
+            'total_events': summary['total_events'],
+            'upcoming_events': upcoming.count(),
+            'total_revenue': summary['total_revenue'],
+            'tickets_sold': summary['tickets_sold'],
+            'monthly_events': summary['monthly_events'],
+            
+            'events_by_category': [
+                {'category': row['value'], 'count': row['count']} for row in event_facets['category']
+            ],
+            
+            'popular_venues': [
+                {'venue': row['value'], 'count': row['count']} for row in event_facets['venue'][:5]
+            ]
         }
         
         return Response(analytics)
@@ -385,15 +403,13 @@ class SingleEventAnalyticsView(APIView):
     def get(self, request, event_id):
         try:
             event = Event.objects.get(id=event_id, promoter=request.user)
-            ticket_types = event.ticket_types.all()
+            ticket_types = stats.ticket_type_stats(event.id)
 
-            daily_sales = TicketType.objects.filter(
-                event=event
-            ).annotate(
-                day=TruncDay('created_at')
-            ).values('day').annotate(
-                sales=Count('id')
-            ).order_by('day')
+            daily_sales = [{
+                'day': row['period'],
+                'sales': row['quantity'],
+                'revenue': row['revenue']
+            } for row in sales.series(event.id, 'day')]
 
             analytics = {
                 'event_details': {
@@ -401,17 +417,13 @@ class SingleEventAnalyticsView(APIView):
                     'start_date': event.start_date,
                     'status': event.status
                 },
-                'ticket_summary': {
-                    'total_tickets': sum(tt.quantity for tt in ticket_types),
-                    'tickets_sold': sum(tt.quantity - tt.remaining for tt in ticket_types),
-                    'revenue': sum((tt.quantity - tt.remaining) * tt.price for tt in ticket_types)
-                },
+                'ticket_summary': stats.inventory_totals(ticket_types),
                 'ticket_types_breakdown': [{
-                    'name': tt.name,
-                    'total': tt.quantity,
-                    'sold': tt.quantity - tt.remaining,
-                    'revenue': (tt.quantity - tt.remaining) * tt.price,
-                    'percentage_sold': ((tt.quantity - tt.remaining) / tt.quantity) * 100 if tt.quantity > 0 else 0
+                    'name': tt['name'],
+                    'total': tt['quantity'],
+                    'sold': tt['sold'],
+                    'revenue': tt['revenue'],
+                    'percentage_sold': (tt['sold'] / tt['quantity']) * 100 if tt['quantity'] > 0 else 0
                 } for tt in ticket_types],
                 'daily_sales': daily_sales
             }
@@ -424,30 +436,60 @@ class SingleEventAnalyticsView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-class PendingPaymentsListView(generics.ListAPIView):
+class SalesSeriesView(APIView):
+    """Approved sales of an event over time
+
+    ?granularity=hour|day|week (default day), optional ?start= and ?end=
+    (ISO dates or datetimes, end exclusive) and ?ticket_type=<id>.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, event_id):
+        if not Event.objects.filter(id=event_id, promoter=request.user).exists():
+            return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in sales.GRANULARITIES:
+            return Response({'error': f"granularity must be one of {', '.join(sales.GRANULARITIES)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        bounds = {}
+        for name in ('start', 'end'):
+            value = request.query_params.get(name)
+            if value:
+                bounds[name] = sales.parse_moment(value)
+                if bounds[name] is None:
+                    return Response({'error': f'Invalid {name} date'}, status=status.HTTP_400_BAD_REQUEST)
+
+        ticket_type_id = request.query_params.get('ticket_type')
+        if ticket_type_id and not ticket_type_id.isdigit():
+            return Response({'error': 'Invalid ticket type'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'granularity': granularity,
+            'series': sales.series(event_id, granularity, ticket_type_id=ticket_type_id, **bounds)
+        })
+
+class PendingPaymentsListView(SparseFieldsViewMixin, generics.ListAPIView):
     """List all purchases with pending payments for the promoter's events"""
     serializer_class = PurchaseSerializer
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-purchase_date', '-id')
     
     def get_queryset(self):
         events = Event.objects.filter(promoter=self.request.user)
         
-        return Purchase.objects.filter(
+        queryset = Purchase.objects.filter(
             ticket_type__event__in=events,
             payment_status='pending',
             payment_screenshot__isnull=False,  
             is_approved_by_promoter=False
-        ).order_by('-purchase_date').select_related('ticket_type', 'ticket_type__event')
-    
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
+        )
         
-        event_id = request.query_params.get('event_id')
+        event_id = self.request.query_params.get('event_id')
         if event_id:
             queryset = queryset.filter(ticket_type__event_id=event_id)
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.sparse_queryset(queryset)
 
 class PromoterPaymentApprovalView(generics.UpdateAPIView):
     """Promoter approves payment and generates PDF ticket with QR code"""
@@ -468,140 +510,22 @@ class PromoterPaymentApprovalView(generics.UpdateAPIView):
                 'message': 'You have chosen not to approve this payment'
             })
         
-        # Approving payment
-        purchase.is_approved_by_promoter = True
-        purchase.payment_status = 'completed'
-        purchase.approval_date = timezone.now()
-        purchase.save()
-        
-        # Creating a temp directory for QR codes
-        temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp')
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Get attendees or create a default one if none exist
-        from client.models import PurchaseAttendee, Attendee
-        purchase_attendees = PurchaseAttendee.objects.filter(purchase=purchase)
-        
-        if not purchase_attendees.exists():
-            # If no attendees were specified, create a default one using purchaser info
-            default_attendee = Attendee.objects.create(
-                first_name="Guest",
-                last_name="Attendee",
-                email=purchase.purchaser_email,
-                phone=purchase.purchaser_phone
-            )
-            purchase_attendee = PurchaseAttendee.objects.create(
-                purchase=purchase,
-                attendee=default_attendee
-            )
-            purchase_attendees = [purchase_attendee]
-        
-        # Storing all generated PDFs and their info
-        ticket_pdfs = []
-        
-        # Generating a PDF for each attendee
-        for idx, purchase_attendee in enumerate(purchase_attendees):
-            attendee = purchase_attendee.attendee
-            
-            # Generating QR code with attendee-specific info
-            qr_data = {
-                'purchase_id': purchase.id,
-                'event': purchase.ticket_type.event.title,
-                'ticket_type': purchase.ticket_type.name,
-                'attendee_id': attendee.id,
-                'attendee_name': f"{attendee.first_name} {attendee.last_name}",
-                'attendee_email': attendee.email,
-                'approved_by': self.request.user.get_full_name(),
-                'approval_date': purchase.approval_date.isoformat(),
-                'used': False  
-            }
-            
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(str(qr_data))
-            qr.make(fit=True)
-            
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Saving QR code to temp directory
-            temp_qr_path = os.path.join(temp_dir, f'temp_qr_{purchase.id}_{attendee.id}.png')
-            img.save(temp_qr_path)
-            
-            # Generating PDF filename
-            pdf_filename = f'ticket_{purchase.id}_{attendee.id}.pdf'
-            
-            # Generating PDF in memory
-            pdf_buffer = BytesIO()
-            c = canvas.Canvas(pdf_buffer, pagesize=letter)
-
-            c.setFont("Helvetica-Bold", 24)
-            c.drawCentredString(letter[0]/2, 10*inch, purchase.ticket_type.event.title)
-
-            c.setFont("Helvetica", 14)
-            c.drawCentredString(letter[0]/2, 9.5*inch, f"Date: {purchase.ticket_type.event.start_date.strftime('%B %d, %Y')}")
-            c.drawCentredString(letter[0]/2, 9.2*inch, f"Time: {purchase.ticket_type.event.start_date.strftime('%I:%M %p')} - {purchase.ticket_type.event.end_date.strftime('%I:%M %p')}")
-            c.drawCentredString(letter[0]/2, 8.9*inch, f"Location: {purchase.ticket_type.event.location}")
-
-            # Adding ticket information
-            c.setFont("Helvetica-Bold", 16)
-            c.drawCentredString(letter[0]/2, 8*inch, f"Ticket: {purchase.ticket_type.name}")
-
-            c.setFont("Helvetica", 12)
-            c.drawCentredString(letter[0]/2, 7.5*inch, f"Purchase Date: {purchase.purchase_date.strftime('%B %d, %Y')}")
-
-            c.drawImage(temp_qr_path, letter[0]/2 - 2*inch, 3.5*inch, width=4*inch, height=4*inch)
-
-            c.setFont("Helvetica", 10)
-            c.drawCentredString(letter[0]/2, 2.5*inch, "Please present this QR code at the event entrance")
-
-            c.setFont("Helvetica", 8)
-            c.drawCentredString(letter[0]/2, 1*inch, "This ticket is valid only for the named event and date.")
-            c.drawCentredString(letter[0]/2, 0.8*inch, f"This ticket is for one person only and is non-transferable.")
+        # Approving payment, once; approving again retries issuance if the tickets never came
+        approve_purchase(purchase.pk)
+        purchase.refresh_from_db()
+        if purchase.tickets_issued_at:
+            return Response({
+                'status': 'Payment already approved',
+                'message': 'Tickets have already been issued for this purchase',
+                'ticket_pdf_url': purchase.ticket_pdf_url
+            })
 
-            c.save()
-            
-            pdf_buffer.seek(0)
-            pdf_content = pdf_buffer.getvalue()
-            
-            # Uploading to Firebase Storage
-            firebase_path = f'tickets/{pdf_filename}'
-            blob = bucket.blob(firebase_path)
-            blob.upload_from_string(pdf_content, content_type='application/pdf')
-            
-            # Making the file publicly accessible
-            blob.make_public()
-            pdf_url = blob.public_url
-            
-            ticket_info = {
-                'attendee_id': attendee.id,
-                'attendee_name': f"{attendee.first_name} {attendee.last_name}",
-                'attendee_email': attendee.email,
-                'filename': pdf_filename,
-                'firebase_url': pdf_url
-            }
-            ticket_pdfs.append(ticket_info)
-            
-            # Cleaning up QR code temp file
-            try:
-                os.remove(temp_qr_path)
-            except:
-                pass
-        
-        for idx, ticket_info in enumerate(ticket_pdfs):
-            TicketPDF.objects.create(
-                purchase_id=purchase.id,
-                attendee_id=ticket_info['attendee_id'],
-                pdf_url=ticket_info['firebase_url'],
-                is_used=False
-            )
-            
-            if idx == 0: 
-                purchase.ticket_pdf_url = ticket_info['firebase_url']
-                purchase.save()
+        ticket_pdfs = issue_tickets(purchase, request.user.get_full_name())
+        if ticket_pdfs is None:
+            return Response({
+                'status': 'Payment approved',
+                'message': 'Tickets for this purchase are already being issued'
+            }, status=status.HTTP_202_ACCEPTED)
         
         # Preparing response with all ticket URLs
         response_data = {
@@ -618,72 +542,9 @@ class PromoterPaymentApprovalView(generics.UpdateAPIView):
                 'ticket_url': ticket_info['firebase_url']
             })
 
-        send_payment_approval_email(purchase, ticket_pdfs)
-
         return Response(response_data)
 
 
-def send_payment_approval_email(purchase, ticket_pdfs):
-    event = purchase.ticket_type.event
-    subject = f'Payment Approved for {event.title}'
-    
-    attendee_tickets_html = ""
-    for ticket_info in ticket_pdfs:
-        attendee_tickets_html += format_html("""
-            <p><strong>{name}:</strong> <a href="{ticket_url}" 
-            style="display: inline-block; padding: 10px 20px; color: white; background-color: #007bff; 
-            text-decoration: none; border-radius: 5px;">Download Ticket</a></p>
-        """, name=ticket_info['attendee_name'], ticket_url=ticket_info['firebase_url'])
-    
-    message = format_html("""
-        <html>
-        <body>
-            <p>Hello {customer_name},</p>
-            
-            <p>Great news! Your payment for <strong>{event_title}</strong> has been approved. Your tickets are now ready.</p>
-            
-            <h2>Event Details</h2>
-            <p><strong>Event:</strong> {event_title}</p>
-            <p><strong>Date:</strong> {event_date}</p>
-            <p><strong>Time:</strong> {event_time}</p>
-            <p><strong>Location:</strong> {event_location}</p>
-            <p><strong>Ticket Type:</strong> {ticket_type}</p>
-            <p><strong>Number of Tickets:</strong> {ticket_count}</p>
-            
-            <h2>Your Tickets</h2>
-                          
-            <p>You can access your tickets in the attachments section below</p>
-            
-            <p>Please present these tickets (either printed or on your mobile device) at the event entrance.</p>
-            
-            <p>Thank you for your purchase. We look forward to seeing you at the event!</p>
-            <p>If you have any questions, please contact our support team.</p>
-            
-            <p>Best regards,<br>The Ezevent Team</p>
-        </body>
-        </html>
-    """, 
-    customer_name=purchase.purchaser_name if hasattr(purchase, 'purchaser_name') else "Customer",
-    event_title=event.title,
-    event_date=event.start_date.strftime('%B %d, %Y'),
-    event_time=f"{event.start_date.strftime('%I:%M %p')} - {event.end_date.strftime('%I:%M %p')}",
-    event_location=event.location,
-    ticket_type=purchase.ticket_type.name,
-    ticket_count=len(ticket_pdfs),
-    attendee_tickets=attendee_tickets_html)
-    
-    email_message = EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, [purchase.purchaser_email])
-    email_message.content_subtype = 'html'
-    
-    # Attaching PDF tickets to the email
-    for ticket_info in ticket_pdfs:
-        pdf_response = requests.get(ticket_info['firebase_url'])
-        if pdf_response.status_code == 200:
-            filename = f"Ticket - {event.title} - {ticket_info['attendee_name']}.pdf"
-            email_message.attach(filename, pdf_response.content, 'application/pdf')
-    
-    email_message.send(fail_silently=False)
-
 def generate_scanner_url(user_id, expiry_hours=24):
     """Generating a JWT-secured URL for ticket scanning that expires after specified hours"""
     import datetime
@@ -771,11 +632,19 @@ class ScanTicketView(APIView):
                     'error': 'Event has already ended'
                 })
             
-            # Marking ticket as used
+            # Marking ticket as used; only the first of two simultaneous scans gets through
             ticket.scanned_by = scanner_id
             ticket.is_used = True
             ticket.used_at = timezone.now()
-            ticket.save()
+            with transaction.atomic():
+                if not TicketPDF.objects.filter(pk=ticket.pk, is_used=False).update(is_used=True, used_at=ticket.used_at):
+                    ticket.refresh_from_db(fields=['used_at'])
+                    return Response({
+                        'valid': False,
+                        'error': 'Ticket has already been used',
+                        'used_at': ticket.used_at
+                    })
+                stats.record_entry(ticket.purchase.ticket_type_id)
             
             # Returning success response
             return Response({
@@ -859,7 +728,22 @@ class ScanTicketExitView(APIView):
             ticket.injury_notes = injury_notes 
             
             ticket.time_spent = ticket.exit_time - ticket.used_at
-            ticket.save()
+            with transaction.atomic():
+                exited = TicketPDF.objects.filter(pk=ticket.pk, exit_time__isnull=True).update(
+                    exit_time=ticket.exit_time,
+                    exit_reason=ticket.exit_reason,
+                    injury_notes=ticket.injury_notes,
+                    time_spent=ticket.time_spent
+                )
+                if not exited:
+                    ticket.refresh_from_db(fields=['exit_time', 'exit_reason'])
+                    return Response({
+                        'valid': False,
+                        'error': 'Ticket has already been used for exit',
+                        'exit_time': ticket.exit_time,
+                        'exit_reason': ticket.exit_reason
+                    })
+                stats.record_exit(ticket.purchase.ticket_type_id, ticket.exit_reason)
             
             hours, remainder = divmod(ticket.time_spent.total_seconds(), 3600)
             minutes, seconds = divmod(remainder, 60)
@@ -893,120 +777,167 @@ class ScanTicketExitView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
 class TicketDetailsView(APIView):
-    """View to get ticket details including entry/exit times"""
+    """View to get ticket details including entry/exit times
+
+    The list is keyset-paged by default. ?output=stream returns every ticket
+    as one chunked JSON array, and ?output=ndjson (or Accept:
+    application/x-ndjson) returns newline-delimited JSON. Both stream from
+    a single joined query without loading the tickets into memory.
+    """
     permission_classes = [IsAuthenticated]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+    keyset_ordering = 'id'
+
+    row_fields = (
+        'id', 'is_used', 'used_at', 'exit_time',
+        'attendee_id', 'attendee__first_name', 'attendee__last_name', 'attendee__email',
+        'purchase__ticket_type__name',
+        'purchase__ticket_type__event_id', 'purchase__ticket_type__event__title',
+    )
     
     def get(self, request, ticket_id=None, format=None):
         user_id = request.user.id
+        tickets = TicketPDF.objects.filter(
+            purchase__ticket_type__event__promoter_id=user_id
+        ).values(*self.row_fields)
         
-        try:
-            promoter_events = Event.objects.filter(promoter_id=user_id).values_list('id', flat=True)
-            
-            if ticket_id:
-                ticket = TicketPDF.objects.get(
-                    id=ticket_id,
-                    purchase__ticket_type__event_id__in=promoter_events
+        if ticket_id:
+            ticket = tickets.filter(id=ticket_id).first()
+            if ticket is None:
+                return Response(
+                    {'error': 'Ticket not found'}, 
+                    status=status.HTTP_404_NOT_FOUND
                 )
-                return Response(self._format_ticket_data(ticket))
-            else:
-                event_id = request.query_params.get('event_id')
-                
-                tickets = TicketPDF.objects.filter(
-                    purchase__ticket_type__event_id__in=promoter_events
+            return Response(self._format_ticket_data(ticket))
+
+        event_id = request.query_params.get('event_id')
+        if event_id:
+            try:
+                event_id = int(event_id)
+            except ValueError:
+                return Response({'error': 'Invalid event id'}, status=status.HTTP_400_BAD_REQUEST)
+            if not Event.objects.filter(id=event_id, promoter_id=user_id).exists():
+                return Response(
+                    {'error': 'You do not have permission to view tickets for this event'},
+                    status=status.HTTP_403_FORBIDDEN
                 )
-                
-                if event_id:
-                    if int(event_id) not in promoter_events:
-                        return Response(
-                            {'error': 'You do not have permission to view tickets for this event'},
-                            status=status.HTTP_403_FORBIDDEN
-                        )
-                    tickets = tickets.filter(purchase__ticket_type__event_id=event_id)
-                
-                result = [self._format_ticket_data(ticket) for ticket in tickets]
-                return Response(result)
-                
-        except TicketPDF.DoesNotExist:
-            return Response(
-                {'error': 'Ticket not found'}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
-        except Exception as e:
-            return Response(
-                {'error': f'Error retrieving ticket data: {str(e)}'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            tickets = tickets.filter(purchase__ticket_type__event_id=event_id)
+
+        if request.query_params.get('output') == 'stream' or wants_ndjson(request):
+            rows = (self._format_ticket_data(row) for row in tickets.order_by('id').iterator(chunk_size=2000))
+            return stream_json(rows, ndjson=wants_ndjson(request))
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(tickets, request, view=self)
+        result = [self._format_ticket_data(row) for row in page]
+        return paginator.get_paginated_response(result)
     
-    def _format_ticket_data(self, ticket):
-        duration = None
+    def _format_ticket_data(self, row):
         duration_str = "N/A"
         
-        if ticket.is_used and ticket.exit_time:
-            duration = ticket.exit_time - ticket.used_at
+        if row['is_used'] and row['exit_time']:
+            duration = row['exit_time'] - row['used_at']
             hours, remainder = divmod(duration.total_seconds(), 3600)
             minutes, seconds = divmod(remainder, 60)
             duration_str = f"{int(hours)}h {int(minutes)}m"
         
-        event = ticket.purchase.ticket_type.event
-        
         return {
-            'ticket_id': ticket.id,
+            'ticket_id': row['id'],
             'attendee': {
-                'id': ticket.attendee.id,
-                'name': f"{ticket.attendee.first_name} {ticket.attendee.last_name}",
-                'email': ticket.attendee.email
+                'id': row['attendee_id'],
+                'name': f"{row['attendee__first_name']} {row['attendee__last_name']}",
+                'email': row['attendee__email']
             },
             'event': {
-                'id': event.id,
-                'title': event.title
+                'id': row['purchase__ticket_type__event_id'],
+                'title': row['purchase__ticket_type__event__title']
             },
-            'ticket_type': ticket.purchase.ticket_type.name,
-            'entry_time': ticket.used_at,
-            'exit_time': ticket.exit_time,
+            'ticket_type': row['purchase__ticket_type__name'],
+            'entry_time': row['used_at'],
+            'exit_time': row['exit_time'],
             'duration': duration_str,
-            'status': 'Completed' if ticket.exit_time else ('Still Inside' if ticket.is_used else 'Not Used')
+            'status': 'Completed' if row['exit_time'] else ('Still Inside' if row['is_used'] else 'Not Used')
         }
     
 class InjuryReportsView(APIView):
+    """Injured and emergency exits across the promoter's events
+
+    Without parameters the reports are keyset-paged, newest first. With
+    ?since=<cursor> only incidents recorded after the cursor are returned,
+    oldest first, together with the cursor for the next poll; any ISO
+    timestamp works as the first cursor.
+    """
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-exit_time', '-id')
+    poll_limit = 200
+
+    row_fields = (
+        'id', 'used_at', 'exit_time', 'exit_reason', 'injury_notes',
+        'attendee__first_name', 'attendee__last_name', 'attendee__email', 'attendee__phone',
+        'purchase__ticket_type__name', 'purchase__ticket_type__event__title',
+    )
     
     def get(self, request, event_id=None):
         user_id = request.user.id
 
+        incidents = TicketPDF.objects.filter(
+            purchase__ticket_type__event__promoter_id=user_id,
+            exit_reason__in=TicketPDF.INCIDENT_REASONS
+        ).values(*self.row_fields)
+
         if event_id:
-            events = Event.objects.filter(id=event_id, promoter_id=user_id)
-            if not events.exists():
+            if not Event.objects.filter(id=event_id, promoter_id=user_id).exists():
                 return Response({'error': 'Event not found or you do not have permission'}, 
                                status=status.HTTP_404_NOT_FOUND)
-        else:
-            events = Event.objects.filter(promoter_id=user_id)
-        
-        injury_data = []
-        
-        for event in events:
-            ticket_types = TicketType.objects.filter(event=event)
-            
-            purchases = Purchase.objects.filter(ticket_type__in=ticket_types)
-            
-            injured_tickets = TicketPDF.objects.filter(
-                purchase__in=purchases,
-                exit_reason__in=['injured', 'emergency']
-            )
-            
-            for ticket in injured_tickets:
-                injury_data.append({
-                    'event': event.title,
-                    'attendee_name': f"{ticket.attendee.first_name} {ticket.attendee.last_name}",
-                    'attendee_email': ticket.attendee.email,
-                    'attendee_phone': ticket.attendee.phone,
-                    'entry_time': ticket.used_at,
-                    'exit_time': ticket.exit_time,
-                    'exit_reason': ticket.exit_reason,
-                    'injury_notes': ticket.injury_notes,
-                    'ticket_type': ticket.purchase.ticket_type.name
-                })
-        
-        return Response(injury_data)
+            incidents = incidents.filter(purchase__ticket_type__event_id=event_id)
+
+        since = request.query_params.get('since')
+        if since:
+            return self._poll(incidents, since)
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(incidents, request, view=self)
+        return paginator.get_paginated_response([self._format_incident(row) for row in page])
+
+    def _poll(self, incidents, since):
+        # The cursor is "<exit time>_<ticket id>", so incidents sharing a timestamp are never skipped
+        exit_time, _, last_id = since.rpartition('_') if '_' in since else (since, '', '0')
+        try:
+            exit_time = parse_datetime(exit_time)
+        except ValueError:
+            # well formed but out of range, e.g. month 13
+            exit_time = None
+        if exit_time is None or not last_id.isdigit():
+            return Response({'error': 'Invalid since cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(exit_time):
+            exit_time = timezone.make_aware(exit_time)
+
+        rows = list(incidents.filter(
+            Q(exit_time__gt=exit_time) | Q(exit_time=exit_time, id__gt=int(last_id))
+        ).order_by('exit_time', 'id')[:self.poll_limit])
+
+        if rows:
+            # 'Z' rather than '+00:00', which would need escaping in a query string
+            last_exit = rows[-1]['exit_time'].astimezone(dt_timezone.utc)
+            since = f"{last_exit.isoformat().replace('+00:00', 'Z')}_{rows[-1]['id']}"
+        return Response({
+            'results': [self._format_incident(row) for row in rows],
+            'since': since,
+            'has_more': len(rows) == self.poll_limit,
+        })
+
+    def _format_incident(self, row):
+        return {
+            'event': row['purchase__ticket_type__event__title'],
+            'attendee_name': f"{row['attendee__first_name']} {row['attendee__last_name']}",
+            'attendee_email': row['attendee__email'],
+            'attendee_phone': row['attendee__phone'],
+            'entry_time': row['used_at'],
+            'exit_time': row['exit_time'],
+            'exit_reason': row['exit_reason'],
+            'injury_notes': row['injury_notes'],
+            'ticket_type': row['purchase__ticket_type__name']
+        }
     
 
 class EventReportPDFView(APIView):
@@ -1024,272 +955,83 @@ class EventReportPDFView(APIView):
                 )
             
             report_format = request.query_params.get('format', 'pdf')
-            
-            ticket_types = TicketType.objects.filter(event=event)
-            purchases = Purchase.objects.filter(ticket_type__in=ticket_types)
-            tickets = TicketPDF.objects.filter(purchase__in=purchases)
-
-            stats = {
-                'total_tickets_sold': purchases.aggregate(Sum('quantity'))['quantity__sum'] or 0,
-                'total_revenue': purchases.filter(payment_status='completed').aggregate(Sum('total_amount'))['total_amount__sum'] or 0,
-                'total_attendees': tickets.count(),
-                'attended_count': tickets.filter(is_used=True).count(),
-                'normal_exits': tickets.filter(is_used=True, exit_time__isnull=False, exit_reason='normal').count(),
-                'injured_exits': tickets.filter(is_used=True, exit_time__isnull=False, exit_reason__in=['injured', 'emergency']).count(),
-                'still_inside': tickets.filter(is_used=True, exit_time__isnull=True).count(),
-                'unused_tickets': tickets.filter(is_used=False).count(),
-            }
-            
-            ticket_type_stats = []
-            for tt in ticket_types:
-                type_purchases = purchases.filter(ticket_type=tt)
-                ticket_type_stats.append({
-                    'name': tt.name,
-                    'price': float(tt.price),
-                    'sold': type_purchases.aggregate(Sum('quantity'))['quantity__sum'] or 0,
-                    'revenue': float(type_purchases.filter(payment_status='completed').aggregate(Sum('total_amount'))['total_amount__sum'] or 0),
-                })
-            
-            injured_attendees = tickets.filter(
-                is_used=True, 
-                exit_time__isnull=False, 
-                exit_reason__in=['injured', 'emergency']
-            ).select_related('attendee')
-            
-            injured_list = [{
-                'name': f"{ticket.attendee.first_name} {ticket.attendee.last_name}",
-                'email': ticket.attendee.email,
-                'phone': ticket.attendee.phone,
-                'exit_time': ticket.exit_time,
-                'exit_reason': ticket.exit_reason,
-                'notes': ticket.injury_notes or 'No notes provided'
-            } for ticket in injured_attendees]
-            
-            context = {
-                'event': {
-                    'id': event.id,
-                    'title': event.title,
-                    'venue': event.venue,
-                    'location': event.location,
-                    'start_date': event.start_date,
-                    'end_date': event.end_date,
-                },
-                'stats': stats,
-                'ticket_types': ticket_type_stats,
-                'injured_attendees': injured_list,
-                'generated_at': timezone.now(),
-                'generated_by': f"{request.user.firstname} {request.user.lastname}"
-            }
+            context = reports.build_context(event, f"{request.user.firstname} {request.user.lastname}")
             
             if report_format.lower() == 'json':
                 return Response(context)
             
-            buffer = BytesIO()
-
-            pdf = canvas.Canvas(buffer, pagesize=letter)
-            width, height = letter
-
-            def calc_percentage(part, whole):
-                if whole == 0:
-                    return 0
-                return int((part / whole) * 100)
-            
-
-            pdf.setFont("Helvetica-Bold", 18)
-            pdf.drawCentredString(width/2, height-50, f"Event Report: {event.title}")
+            buffer = BytesIO(reports.render_pdf(context))
+            buffer.seek(0)
+            filename = f"event_report_{event.title.replace(' ', '_')}_{timezone.now().strftime('%Y%m%d')}.pdf"
+            response = HttpResponse(buffer, content_type='application/pdf')
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
             
-            pdf.setFont("Helvetica", 12)
-            pdf.drawCentredString(width/2, height-70, 
-                f"{event.start_date.strftime('%B %d, %Y')} at {event.venue}, {event.location}")
+            return response
             
+        except Exception as e:
+            return Response(
+                {'error': f'Error generating report: {str(e)}'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-            pdf.setFont("Helvetica-Bold", 14)
-            pdf.drawString(50, height-120, "Summary")
+class EventExportView(APIView):
+    """Download attendees, purchases or entry/exit scans of an event as CSV or XLSX
 
-            pdf.rect(50, height-220, width-100, 80, stroke=1, fill=0)
+    CSV rows are streamed from the database, so large events neither buffer
+    in memory nor wait for the whole file before the download starts. XLSX
+    is assembled in a temporary file first and capped in size.
+    """
+    permission_classes = [IsAuthenticated]
 
-            box_width = width-100
-            item_width = box_width / 4
-            
+    def perform_content_negotiation(self, request, force=False):
+        # clients ask for text/csv or the spreadsheet type, which no renderer offers; errors still go out as JSON
+        return super().perform_content_negotiation(request, force=True)
 
-            summary_data = [
-                ("Tickets Sold", stats['total_tickets_sold']),
-                ("Attendees", stats['attended_count']),
-                ("Revenue", stats['total_revenue']),
-                ("Injuries", stats['injured_exits'])
-            ]
-            
-            for i, (label, value) in enumerate(summary_data):
-                x_pos = 50 + (i * item_width) + (item_width/2)
-                
-                pdf.setFont("Helvetica-Bold", 16)
-                pdf.drawCentredString(x_pos, height-170, str(value))
-                
-                pdf.setFont("Helvetica", 10)
-                pdf.drawCentredString(x_pos, height-190, label)
-            
+    def get(self, request, event_id, dataset, export_format):
+        if dataset not in exports.DATASETS or export_format not in exports.FORMATS:
+            return Response({'error': 'Unknown export'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            event = Event.objects.get(id=event_id, promoter=request.user)
+        except Event.DoesNotExist:
+            return Response(
+                {'error': 'Event not found or you do not have permission'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        try:
+            return exports.export(event, dataset, export_format)
+        except exports.ExportTooLarge as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            pdf.setFont("Helvetica-Bold", 14)
-            pdf.drawString(50, height-250, "Attendance Statistics")
+class EventReportJobView(APIView):
+    """Queue the event report for rendering in the background
 
-            header = ["Category", "Count", "Percentage"]
-            header_width = [250, 100, 100]
-            y_position = height-280
-            
-            for i, col in enumerate(header):
-                x_start = 50 + sum(header_width[:i])
-                pdf.setFont("Helvetica-Bold", 10)
-                pdf.drawString(x_start, y_position, col)
-
-            pdf.line(50, y_position-5, sum(header_width)+50, y_position-5)
-
-            attendance_data = [
-                ("Total Tickets Sold", stats['total_tickets_sold'], "100%"),
-                ("Attendees (Used Tickets)", stats['attended_count'], 
-                 f"{calc_percentage(stats['attended_count'], stats['total_tickets_sold'])}%"),
-                ("Normal Exits", stats['normal_exits'], 
-                 f"{calc_percentage(stats['normal_exits'], stats['attended_count'])}%"),
-                ("Injury/Emergency Exits", stats['injured_exits'], 
-                 f"{calc_percentage(stats['injured_exits'], stats['attended_count'])}%"),
-                ("Still Inside", stats['still_inside'], 
-                 f"{calc_percentage(stats['still_inside'], stats['attended_count'])}%"),
-                ("Unused Tickets", stats['unused_tickets'], 
-                 f"{calc_percentage(stats['unused_tickets'], stats['total_tickets_sold'])}%")
-            ]
-            
-            y_position -= 20
-            for row in attendance_data:
-                for i, col in enumerate(row):
-                    x_start = 50 + sum(header_width[:i])
-                    pdf.setFont("Helvetica", 10)
-                    pdf.drawString(x_start, y_position, str(col))
-                y_position -= 20
-            
-            if y_position < 300:
-                pdf.showPage()
-                y_position = height - 50
-                pdf.setFont("Helvetica-Bold", 14)
-                pdf.drawString(50, y_position, "Ticket Type Breakdown")
-                y_position -= 30
-            else:
-                y_position -= 30
-                pdf.setFont("Helvetica-Bold", 14)
-                pdf.drawString(50, y_position, "Ticket Type Breakdown")
-                y_position -= 30
-            
-            header = ["Ticket Type", "Price", "Quantity Sold", "Revenue"]
-            header_width = [200, 100, 100, 100]
-            
-            for i, col in enumerate(header):
-                x_start = 50 + sum(header_width[:i])
-                pdf.setFont("Helvetica-Bold", 10)
-                pdf.drawString(x_start, y_position, col)
-            
-            pdf.line(50, y_position-5, sum(header_width)+50, y_position-5)
-            
-            y_position -= 20
-            for tt in ticket_type_stats:
-                row = [tt['name'], f"${tt['price']:.2f}", str(tt['sold']), f"${tt['revenue']:.2f}"]
-                for i, col in enumerate(row):
-                    x_start = 50 + sum(header_width[:i])
-                    pdf.setFont("Helvetica", 10)
-                    pdf.drawString(x_start, y_position, col)
-                y_position -= 20
-            
-            if injured_list:
-                if y_position < 200:
-                    pdf.showPage()
-                    y_position = height - 50
-                else:
-                    y_position -= 40
-                
-                pdf.setFont("Helvetica-Bold", 14)
-                pdf.drawString(50, y_position, "Injury/Emergency Reports")
-                y_position -= 30
-                
+    Answers 200 when a finished report of the same data is already stored,
+    and 202 while the job (new or already in flight) is still to finish.
+    """
+    permission_classes = [IsAuthenticated]
 
-                pdf.setFillColorRGB(1, 0.95, 0.8) 
-                pdf.rect(50, y_position-30, width-100, 25, stroke=1, fill=1)
-                pdf.setFillColorRGB(0, 0, 0)  # Back to black
-                pdf.setFont("Helvetica-Bold", 10)
-                pdf.drawString(60, y_position-15, "Note: This section contains sensitive medical information and should be handled with appropriate confidentiality.")
-                
-                y_position -= 50
-                
+    def post(self, request, event_id):
+        try:
+            event = Event.objects.get(id=event_id, promoter=request.user)
+        except Event.DoesNotExist:
+            return Response(
+                {'error': 'Event not found or you do not have permission'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
 
-                header = ["Attendee", "Contact", "Exit Time", "Exit Reason", "Notes"]
-                header_width = [100, 120, 100, 80, 100]
-                
-                for i, col in enumerate(header):
-                    x_start = 50 + sum(header_width[:i])
-                    pdf.setFont("Helvetica-Bold", 10)
-                    pdf.drawString(x_start, y_position, col)
-                
+        job = reports.enqueue(event, request.user)
+        # eager mode may already have run it
+        job.refresh_from_db()
+        return Response(
+            ReportJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED if job.status in ('pending', 'running') else status.HTTP_200_OK
+        )
 
-                pdf.line(50, y_position-5, sum(header_width)+50, y_position-5)
-                
-                y_position -= 20
-                for attendee in injured_list:
-
-                    if y_position < 100:
-                        pdf.showPage()
-                        y_position = height - 50
-                        
-
-                        for i, col in enumerate(header):
-                            x_start = 50 + sum(header_width[:i])
-                            pdf.setFont("Helvetica-Bold", 10)
-                            pdf.drawString(x_start, y_position, col)
-                        
-                        pdf.line(50, y_position-5, sum(header_width)+50, y_position-5)
-                        y_position -= 20
-                    
-                    exit_time_str = attendee['exit_time'].strftime('%b %d, %Y %H:%M') if attendee['exit_time'] else "N/A"
-                    
-
-                    columns = [
-                        attendee['name'],
-                        f"{attendee['email']}\n{attendee['phone']}",
-                        exit_time_str,
-                        attendee['exit_reason'].title(),
-                        attendee['notes'][:30] + ('...' if len(attendee['notes']) > 30 else '')
-                    ]
-                    
-                    max_lines = 1
-                    for i, col in enumerate(columns):
-                        x_start = 50 + sum(header_width[:i])
-                        pdf.setFont("Helvetica", 8)
-                        
-
-                        lines = col.split('\n')
-                        if len(lines) > max_lines:
-                            max_lines = len(lines)
-                        
-                        for j, line in enumerate(lines):
-                            pdf.drawString(x_start, y_position - (j * 12), line)
-                    
-                    y_position -= (max_lines * 12) + 8  
-            
+class ReportJobStatusView(generics.RetrieveAPIView):
+    """Poll a report job; download_url is a short-lived link to the PDF once it is done"""
+    serializer_class = ReportJobSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_url_kwarg = 'job_id'
 
-            pdf.showPage() 
-            pdf.setFont("Helvetica", 10)
-            generated_at_str = context['generated_at'].strftime('%B %d, %Y at %H:%M')
-            pdf.drawCentredString(width/2, 50, f"Report generated on {generated_at_str} by {context['generated_by']}")
-            pdf.setFont("Helvetica", 8)
-            pdf.drawCentredString(width/2, 30, "This report is confidential and intended for authorized personnel only.")
-            
-            # Save PDF
-            pdf.save()
-            
-            buffer.seek(0)
-            filename = f"event_report_{event.title.replace(' ', '_')}_{timezone.now().strftime('%Y%m%d')}.pdf"
-            response = HttpResponse(buffer, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            return response
-            
-        except Exception as e:
-            return Response(
-                {'error': f'Error generating report: {str(e)}'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+    def get_queryset(self):
+        return ReportJob.objects.filter(event__promoter=self.request.user)
@@ -0,0 +1,160 @@
+import datetime
+import os
+import tempfile
+import time
+from io import BytesIO
+from unittest import mock
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from auths.models import Users
+from ezevent import images
+from ezevent.storage import get_storage
+from promoter.models import Event
+
+
+def jpeg_with_exif(size=(2000, 1000)):
+    """A JPEG carrying camera and GPS metadata, like a phone photo"""
+    exif = Image.Exif()
+    exif[0x010F] = 'PhoneMaker'
+    exif.get_ifd(0x8825)[2] = (0.0, 20.0, 1.5)
+    buffer = BytesIO()
+    Image.new('RGB', size, 'orange').save(buffer, format='JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class LocalStorageTestCase(TestCase):
+    """Runs against the local backend in a throwaway MEDIA_ROOT"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(
+            STORAGE_BACKEND='local', MEDIA_ROOT=media_root.name,
+            PRIVATE_MEDIA_ROOT=os.path.join(media_root.name, 'private'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        get_storage.cache_clear()
+        self.addCleanup(get_storage.cache_clear)
+        self.storage = get_storage()
+        self.media_root = media_root.name
+
+
+class LocalUploadTests(LocalStorageTestCase):
+    """The local backend honours the same rules as a signed storage URL"""
+
+    def upload_url(self, path='event_images/photo.png', content_type='image/png'):
+        target = self.storage.create_upload_target(path, content_type, 60)
+        return target['url'].removeprefix(settings.BASE_BACKEND_URL)
+
+    def put(self, url, body=b'png', content_type='image/png'):
+        return self.client.generic('PUT', url, body, content_type=content_type)
+
+    def test_upload_is_stored_with_its_type(self):
+        self.assertEqual(self.put(self.upload_url()).status_code, 201)
+        self.assertEqual(self.storage.stat('event_images/photo.png'), {'size': 3, 'content_type': 'image/png'})
+
+    def test_other_content_type_is_refused(self):
+        response = self.put(self.upload_url(), b'<svg/>', content_type='image/svg+xml')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(self.storage.exists('event_images/photo.png'))
+
+    def test_url_is_single_use(self):
+        url = self.upload_url()
+        self.assertEqual(self.put(url).status_code, 201)
+
+        response = self.put(url, b'replaced')
+        self.assertEqual(response.status_code, 403)
+        with self.storage.open('event_images/photo.png') as stored:
+            self.assertEqual(stored.read(), b'png')
+
+    @override_settings(UPLOAD_SESSIONS={**settings.UPLOAD_SESSIONS, 'MAX_SIZE': 2})
+    def test_oversized_upload_is_not_kept(self):
+        self.assertEqual(self.put(self.upload_url()).status_code, 413)
+        self.assertIsNone(self.storage.stat('event_images/photo.png'))
+
+    def test_expired_url_is_refused(self):
+        url = self.upload_url()
+        later = time.time() + settings.UPLOAD_SESSIONS['EXPIRES_IN'] + 1
+        with mock.patch('django.core.signing.time.time', return_value=later):
+            self.assertEqual(self.put(url).status_code, 403)
+
+    def test_paths_cannot_escape_the_media_root(self):
+        with self.assertRaises(ValueError):
+            self.storage.upload_bytes(b'x', '../outside.txt')
+
+    def test_private_file_is_served_only_through_a_fresh_signed_url(self):
+        self.storage.upload_private_bytes(b'%PDF', 'reports/report.pdf', content_type='application/pdf')
+        self.assertFalse(self.storage.exists('reports/report.pdf'))
+
+        url = self.storage.signed_download_url('reports/report.pdf', 60).removeprefix(settings.BASE_BACKEND_URL)
+        response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF')
+
+        with mock.patch('ezevent.storage.time.time', return_value=time.time() + 61):
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class ImageVariantTests(LocalStorageTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.promoter = Users.objects.create(email='promoter@example.com', firstname='Pro', lastname='Moter')
+        cls.event = Event.objects.create(
+            promoter=cls.promoter, title='Concert', description='Live', location='Kampala', venue='Hall',
+            start_date=now + datetime.timedelta(days=7), end_date=now + datetime.timedelta(days=7, hours=5),
+            status='published', max_capacity=500,
+        )
+
+    def store_original(self):
+        url = self.storage.upload_bytes(jpeg_with_exif(), 'event_images/photo.jpg', content_type='image/jpeg')
+        Event.objects.filter(pk=self.event.pk).update(profile_pic=url)
+        return url
+
+    def test_original_is_replaced_by_a_metadata_free_variant(self):
+        url = self.store_original()
+        with self.storage.open('event_images/photo.jpg') as original:
+            with Image.open(original) as image:
+                self.assertIn(0x8825, image.getexif())
+
+        images.process_image('promoter.Event', self.event.pk, 'profile_pic', 'image_variants', url, 'event_images/photo.jpg')
+
+        self.event.refresh_from_db()
+        self.assertEqual(set(self.event.image_variants), set(images.VARIANT_SIZES))
+        self.assertEqual(self.event.profile_pic, self.event.image_variants['full'])
+        self.assertFalse(self.storage.exists('event_images/photo.jpg'))
+        with self.storage.open(self.storage.path_for(self.event.profile_pic)) as full:
+            with Image.open(full) as image:
+                self.assertEqual(max(image.size), images.VARIANT_SIZES['full'])
+                self.assertEqual(len(image.getexif()), 0)
+
+    def test_replaced_picture_is_left_alone(self):
+        url = self.store_original()
+        Event.objects.filter(pk=self.event.pk).update(profile_pic='https://example.com/newer.png')
+
+        images.process_image('promoter.Event', self.event.pk, 'profile_pic', 'image_variants', url, 'event_images/photo.jpg')
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.profile_pic, 'https://example.com/newer.png')
+        self.assertIsNone(self.event.image_variants)
+        self.assertFalse(self.storage.exists('event_images/photo.jpg'))
+
+    def test_reprocessing_picks_up_lost_jobs_once(self):
+        self.store_original()
+
+        # the promoter's default profile picture is not ours to process
+        self.assertEqual(images.reprocess_missing_variants(), 1)
+        self.assertEqual(images.reprocess_missing_variants(), 0)
+
+        self.event.refresh_from_db()
+        self.assertIsNotNone(self.event.image_variants)
+        self.promoter.refresh_from_db()
+        self.assertIsNone(self.promoter.profile_pic_variants)
+
+    def test_failed_picture_does_not_stop_the_others(self):
+        Event.objects.filter(pk=self.event.pk).update(profile_pic=self.storage.url('event_images/missing.jpg'))
+        with self.assertLogs('ezevent.images', 'ERROR'):
+            self.assertEqual(images.reprocess_missing_variants(), 0)
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('sessions', views.CreateUploadSessionView.as_view(), name='create_upload_session'),
+    path('sessions/finalize', views.FinalizeUploadView.as_view(), name='finalize_upload'),
+    path('local/<str:token>', views.local_upload, name='local_upload'),
+    path('local/private/<str:token>', views.local_download, name='local_download'),
+]
@@ -0,0 +1,195 @@
+import mimetypes
+from datetime import timedelta
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.http import FileResponse, JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from auths.models import Users
+from client.models import Purchase
+from ezevent.images import schedule_variants
+from ezevent.response_cache import bump_event_versions
+from ezevent.storage import get_storage, unique_path
+from promoter.models import Event
+
+SESSION_SALT = 'uploads.session'
+
+# purpose -> (target model, storage prefix, field the finalized URL is written to)
+PURPOSES = {
+    'payment_screenshot': (Purchase, 'payment_screenshots', 'payment_screenshot'),
+    'event_image': (Event, 'event_images', 'profile_pic'),
+    'profile_pic': (Users, 'profilePics', 'profile_pic'),
+}
+
+
+# purposes whose uploads get resized variants, and the field those land in
+VARIANT_FIELDS = {
+    'event_image': 'image_variants',
+    'profile_pic': 'profile_pic_variants',
+}
+
+
+def target_queryset(purpose, user):
+    """Objects the user may attach an upload of this purpose to"""
+    if purpose == 'payment_screenshot':
+        return Purchase.objects.filter(Q(user=user) | Q(purchaser_email=user.email))
+    if purpose == 'event_image':
+        return Event.objects.filter(promoter=user)
+    return Users.objects.filter(pk=user.pk)
+
+
+def attach_upload(purpose, target_id, url):
+    """Writing the finalized URL onto its target with a single UPDATE"""
+    model, prefix, field = PURPOSES[purpose]
+    values = {field: url}
+    if model is Event:
+        # update() skips auto_now, and catalog freshness keys off updated_at
+        values['updated_at'] = timezone.now()
+    model.objects.filter(pk=target_id).update(**values)
+    if model is Event:
+        # update() sends no signals, so the cached catalog is invalidated here
+        bump_event_versions(target_id)
+
+
+class CreateUploadSessionView(APIView):
+    """Issuing a signed upload target so file bytes go straight to storage"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        purpose = request.data.get('purpose')
+        filename = request.data.get('filename', '')
+        content_type = request.data.get('content_type')
+        size = request.data.get('size')
+
+        if purpose not in PURPOSES:
+            return Response(
+                {'error': f"Invalid purpose, expected one of: {', '.join(PURPOSES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if content_type not in settings.UPLOAD_SESSIONS['CONTENT_TYPES']:
+            return Response({'error': 'Unsupported content type'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            size = int(size)
+        except (TypeError, ValueError):
+            return Response({'error': 'File size is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if size <= 0 or size > settings.UPLOAD_SESSIONS['MAX_SIZE']:
+            return Response({'error': 'File is too large'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            target_id = request.user.pk if purpose == 'profile_pic' else int(request.data.get('target_id'))
+        except (TypeError, ValueError):
+            return Response({'error': 'Upload target is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if not target_queryset(purpose, request.user).filter(pk=target_id).exists():
+            return Response(
+                {'error': 'Upload target not found or you do not have permission'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        prefix = PURPOSES[purpose][1]
+        path = unique_path(prefix, filename)
+        expires_in = settings.UPLOAD_SESSIONS['EXPIRES_IN']
+        upload = get_storage().create_upload_target(path, content_type, expires_in)
+
+        session = signing.dumps({
+            'purpose': purpose,
+            'target_id': target_id,
+            'path': path,
+            'content_type': content_type,
+            'user_id': request.user.pk,
+        }, salt=SESSION_SALT)
+
+        return Response({
+            'session': session,
+            'upload': upload,
+            'expires_at': timezone.now() + timedelta(seconds=expires_in),
+        }, status=status.HTTP_201_CREATED)
+
+
+class FinalizeUploadView(APIView):
+    """Verifying an uploaded object and attaching its URL to the target"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            session = signing.loads(
+                request.data.get('session', ''),
+                salt=SESSION_SALT,
+                max_age=settings.UPLOAD_SESSIONS['FINALIZE_MAX_AGE']
+            )
+        except signing.BadSignature:
+            return Response({'error': 'Invalid or expired upload session'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if session['user_id'] != request.user.pk:
+            return Response({'error': 'Upload session belongs to another user'}, status=status.HTTP_403_FORBIDDEN)
+
+        storage = get_storage()
+        stored = storage.stat(session['path'])
+        if stored is None:
+            return Response({'error': 'Uploaded file not found'}, status=status.HTTP_400_BAD_REQUEST)
+        if stored['size'] > settings.UPLOAD_SESSIONS['MAX_SIZE']:
+            return Response({'error': 'File is too large'}, status=status.HTTP_400_BAD_REQUEST)
+        if stored['content_type'] != session['content_type']:
+            return Response({'error': 'Uploaded file type does not match the session'}, status=status.HTTP_400_BAD_REQUEST)
+
+        url = storage.publish(session['path'])
+        attach_upload(session['purpose'], session['target_id'], url)
+
+        if session['purpose'] in VARIANT_FIELDS:
+            model, prefix, url_field = PURPOSES[session['purpose']]
+            schedule_variants(
+                model,
+                session['target_id'],
+                url_field,
+                VARIANT_FIELDS[session['purpose']],
+                url,
+                session['path']
+            )
+
+        return Response({
+            'status': 'success',
+            'purpose': session['purpose'],
+            'target_id': session['target_id'],
+            'url': url,
+        })
+
+
+@csrf_exempt
+@require_http_methods(['PUT'])
+def local_upload(request, token):
+    """Receiving a signed upload when STORAGE_BACKEND is 'local'"""
+    storage = get_storage()
+    if not hasattr(storage, 'receive_upload'):
+        return JsonResponse({'error': 'Direct uploads go to the storage provider'}, status=404)
+
+    try:
+        accepted = storage.receive_upload(token, request, settings.UPLOAD_SESSIONS['MAX_SIZE'], request.content_type)
+    except signing.BadSignature:
+        return JsonResponse({'error': 'Invalid or expired upload URL, or the wrong Content-Type'}, status=403)
+    except FileExistsError:
+        return JsonResponse({'error': 'Upload URL has already been used'}, status=403)
+
+    if not accepted:
+        return JsonResponse({'error': 'File is too large'}, status=413)
+    return JsonResponse({'status': 'uploaded'}, status=201)
+
+
+@require_http_methods(['GET'])
+def local_download(request, token):
+    """Serving a private file through a signed URL when STORAGE_BACKEND is 'local'"""
+    storage = get_storage()
+    if not hasattr(storage, 'open_download'):
+        return JsonResponse({'error': 'Downloads come from the storage provider'}, status=404)
+
+    try:
+        file_obj = storage.open_download(token)
+    except signing.BadSignature:
+        return JsonResponse({'error': 'Invalid or expired download URL'}, status=403)
+    except FileNotFoundError:
+        return JsonResponse({'error': 'File not found'}, status=404)
+    return FileResponse(file_obj, content_type=mimetypes.guess_type(file_obj.name)[0])